@@ -1,13 +1,16 @@
 import json
-import boto3
 
-# Initialize AWS Lex client
-lex = boto3.client("lexv2-runtime")
+from aws_clients import lazy_client
+from tracing import phase, traced_handler
+
+# Initialize AWS Lex client (built on first use)
+lex = lazy_client("lexv2-runtime")
 
 # Lex Bot Details
 LEX_BOT_ID = "2C5KLYWSCK"
 LEX_ALIAS_ID = "TSTALIASID"
 
+@traced_handler("APIToLexHandler")
 def lambda_handler(event, context):
     try:
         print("Event received: ", json.dumps(event))
@@ -17,14 +20,15 @@ def lambda_handler(event, context):
         sessionId=body.get("sessionId", "")
 
         # Send user input to Lex
-        lex_response = lex.recognize_text(
-            botId=LEX_BOT_ID,
-            botAliasId=LEX_ALIAS_ID,
-            localeId="en_US",
-            #sessionId="user-session",
-            sessionId=sessionId,
-            text=user_message
-        )
+        with phase("recognize_text"):
+            lex_response = lex.recognize_text(
+                botId=LEX_BOT_ID,
+                botAliasId=LEX_ALIAS_ID,
+                localeId="en_US",
+                #sessionId="user-session",
+                sessionId=sessionId,
+                text=user_message
+            )
 
         # Return Lex's response back to API Gateway
         return {
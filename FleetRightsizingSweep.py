@@ -0,0 +1,113 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_clients import batch_put, lazy_client
+from ec2_metrics import MAX_QUERIES_PER_REQUEST, METRIC_KEYS, fetch_instance_metrics, to_feature_vector
+from LambdaSagemakerInvocation import (
+    RECOMMENDATIONS_TABLE_NAME,
+    RECOMMENDATION_MAX_AGE_SECONDS,
+    build_recommendation,
+    predict_instance_types,
+)
+from tracing import phase, submit_in_context, traced_handler
+
+# AWS clients (low-level clients are safe to share across worker threads; built on first use)
+ec2_client = lazy_client("ec2")
+cloudwatch = lazy_client("cloudwatch")
+ddb_client = lazy_client("dynamodb")
+
+# One chunk fills a single GetMetricData request and a single endpoint invocation
+CHUNK_SIZE = MAX_QUERIES_PER_REQUEST // len(METRIC_KEYS)
+MAX_CONCURRENCY = 8
+
+def list_running_instances():
+    """Returns {instance_id: instance_type} for every running instance in the region."""
+    instances = {}
+    paginator = ec2_client.get_paginator("describe_instances")
+    pages = paginator.paginate(Filters=[{"Name": "instance-state-name", "Values": ["running"]}])
+
+    for page in pages:
+        for reservation in page.get("Reservations", []):
+            for instance in reservation.get("Instances", []):
+                instances[instance["InstanceId"]] = instance.get("InstanceType", "unknown")
+
+    return instances
+
+def write_recommendations(items):
+    """Batch-writes recommendation items, retrying anything DynamoDB leaves unprocessed."""
+    batch_put(ddb_client, RECOMMENDATIONS_TABLE_NAME, items)
+
+def process_chunk(instance_types, swept_at):
+    """Scores one chunk of instances: one metrics fetch, one endpoint call, batched writes."""
+    instance_ids = list(instance_types)
+    with phase("fetch_metrics"):
+        metrics = fetch_instance_metrics(cloudwatch, instance_ids)
+    rows = [to_feature_vector(metrics[instance_id]) for instance_id in instance_ids]
+    with phase("predict"):
+        predictions = predict_instance_types(rows)
+
+    items = []
+    for instance_id, row, predicted_type in zip(instance_ids, rows, predictions):
+        cpu = metrics[instance_id]["CPUUtilization"]
+        items.append({
+            "instance_id": {"S": instance_id},
+            "current_type": {"S": instance_types[instance_id]},
+            "predicted_type": {"S": str(predicted_type)},
+            "metrics": {"S": json.dumps(dict(zip(METRIC_KEYS, row)))},
+            "response": {"S": build_recommendation(cpu, predicted_type)},
+            "swept_at": {"N": str(swept_at)},
+            # Let DynamoDB TTL drop rows the chat path would ignore anyway
+            "expires_at": {"N": str(swept_at + 4 * RECOMMENDATION_MAX_AGE_SECONDS)}
+        })
+
+    with phase("write"):
+        write_recommendations(items)
+    return len(items)
+
+@traced_handler("FleetRightsizingSweep")
+def lambda_handler(event, context):
+    """Scheduled entry point: precomputes recommendations for every running instance."""
+    event = event or {}
+    # Clamped so a bad override can neither exceed one GetMetricData request nor stall the sweep
+    chunk_size = max(1, min(int(event.get("chunk_size", CHUNK_SIZE)), CHUNK_SIZE))
+    max_concurrency = max(1, int(event.get("max_concurrency", MAX_CONCURRENCY)))
+
+    started = time.perf_counter()
+    swept_at = int(time.time())
+
+    with phase("list_instances"):
+        instances = list_running_instances()
+    instance_ids = list(instances)
+    chunks = [
+        {instance_id: instances[instance_id] for instance_id in instance_ids[start:start + chunk_size]}
+        for start in range(0, len(instance_ids), chunk_size)
+    ]
+
+    processed = 0
+    failed_chunks = 0
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [submit_in_context(executor, process_chunk, chunk, swept_at) for chunk in chunks]
+        for future in futures:
+            try:
+                processed += future.result()
+            except Exception as e:
+                failed_chunks += 1
+                print(f"Sweep chunk failed: {str(e)}")
+
+    elapsed = time.perf_counter() - started
+    rows_per_sec = processed / elapsed if elapsed > 0 else 0.0
+    summary = {
+        "instances": len(instance_ids),
+        "processed": processed,
+        "chunks": len(chunks),
+        "failed_chunks": failed_chunks,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_per_sec, 1)
+    }
+    print(f"Rightsizing sweep finished: {json.dumps(summary)}")
+
+    return {
+        "statusCode": 200 if not failed_chunks else 207,
+        "body": json.dumps(summary)
+    }
@@ -1,51 +1,100 @@
 import json
-import boto3
-from datetime import datetime, timedelta
-
-# AWS clients
-cloudwatch = boto3.client("cloudwatch")
-sagemaker_runtime = boto3.client("sagemaker-runtime")
-dynamodb = boto3.resource("dynamodb")
+import os
+import time
+
+from aws_clients import batch_put, lazy_client
+from ec2_metrics import METRIC_MAP, fetch_instance_metrics
+from inference_backends import get_backend
+from result_cache import DynamoDBResultStore, ResultCache, prediction_key
+from single_flight import DynamoDBFlightStore, SingleFlight
+from tracing import count, phase, traced_handler
+
+# AWS clients (built on first use); low-level clients only, since direct routing runs this handler on
+# worker threads and boto3 resources are not thread-safe
+cloudwatch = lazy_client("cloudwatch")
+sagemaker_runtime = lazy_client("sagemaker-runtime")
+ddb_client = lazy_client("dynamodb")
 
 # Replace with your actual SageMaker endpoint and DynamoDB table name
 ENDPOINT_NAME = "RF-custom-model-2025-04-18-23-40-47"
 TABLE_NAME = "CloudCostUtilizationResponse"
 
-# CloudWatch metrics to fetch
-METRIC_MAP = {
-    "CPUUtilization": {"Namespace": "AWS/EC2", "Metric": "CPUUtilization", "Stat": "Average"},
-    "DiskReadOps": {"Namespace": "AWS/EC2", "Metric": "DiskReadOps", "Stat": "Sum"},
-    "DiskWriteOps": {"Namespace": "AWS/EC2", "Metric": "DiskWriteOps", "Stat": "Sum"},
-    "NetworkIn": {"Namespace": "AWS/EC2", "Metric": "NetworkIn", "Stat": "Sum"},
-    "NetworkOut": {"Namespace": "AWS/EC2", "Metric": "NetworkOut", "Stat": "Sum"}
-}
+# "sagemaker" calls the endpoint; "local" scores in-process from the artifacts in MODEL_DIR
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "sagemaker")
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model"))
 
-def get_instance_metrics(instance_id):
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(minutes=5)
-    metrics_data = {}
-
-    for key, metric in METRIC_MAP.items():
-        response = cloudwatch.get_metric_statistics(
-            Namespace=metric["Namespace"],
-            MetricName=metric["Metric"],
-            Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=300,
-            Statistics=[metric["Stat"]],
-            Unit="Percent" if key == "CPUUtilization" else "Count"
-        )
-
-        datapoints = response.get("Datapoints", [])
-        if datapoints:
-            latest_value = sorted(datapoints, key=lambda x: x["Timestamp"], reverse=True)[0][metric["Stat"]]
-            metrics_data[key] = latest_value
-        else:
-            metrics_data[key] = 0
-
-    return metrics_data
+# Recommendations precomputed by FleetRightsizingSweep, keyed by instance_id
+RECOMMENDATIONS_TABLE_NAME = "CloudCostRightsizingRecommendations"
+RECOMMENDATION_MAX_AGE_SECONDS = 900
+
+# Answers per instance and 5-minute metric period: in memory across warm invocations, then CloudCostResultCache
+prediction_cache = ResultCache(DynamoDBResultStore(ddb_client))
+
+def deliver_to_waiters(waiters, full_response):
+    """Writes the answer into the response row of every session that waited on this instance."""
+    batch_put(ddb_client, TABLE_NAME, [{
+        "session_id": {"S": waiter["session_id"]},
+        "request_id": {"S": waiter["request_id"]},
+        "request": {"S": waiter["request"]},
+        "response": {"S": full_response},
+        "status": {"S": "ready"}
+    } for waiter in waiters])
 
+# Concurrent questions about the same instance share one CloudWatch + SageMaker round trip
+single_flight = SingleFlight(DynamoDBFlightStore(ddb_client), deliver_to_waiters)
+
+def get_instance_metrics(instance_id):
+    # One GetMetricData request covers every metric in METRIC_MAP
+    return fetch_instance_metrics(cloudwatch, [instance_id])[instance_id]
+
+def get_inference_backend():
+    return get_backend(
+        INFERENCE_BACKEND,
+        sagemaker_client=sagemaker_runtime,
+        endpoint_name=ENDPOINT_NAME,
+        model_dir=MODEL_DIR
+    )
+
+def predict_instance_types(rows):
+    """Scores one or more feature rows in a single backend call."""
+    return get_inference_backend().predict(rows)
+
+def build_recommendation(cpu, predicted_type):
+    if cpu < 20:
+        recommendation = "Scale down to a smaller instance to reduce costs."
+    elif cpu > 80:
+        recommendation = "Scale up to a larger instance type for better performance."
+    else:
+        recommendation = "CPU utilization is within an optimal range. No action needed."
+
+    return f"{recommendation} Suggested type: {predicted_type}"
+
+def get_cached_recommendation(instance_id):
+    """Returns (cache_key, expires_at, response); response is None when this period has no answer yet."""
+    key, expires_at = prediction_key(instance_id)
+    response, level = prediction_cache.get(key)
+    count(f"PredictionCache.{level.upper()}Hit" if level else "PredictionCache.Miss")
+    return key, expires_at, response
+
+def get_precomputed_recommendation(instance_id):
+    """Returns the sweep's recommendation for the instance if it is still fresh."""
+    try:
+        item = ddb_client.get_item(
+            TableName=RECOMMENDATIONS_TABLE_NAME,
+            Key={"instance_id": {"S": instance_id}}
+        ).get("Item")
+    except Exception as e:
+        # The sweep table is an optimization; fall through to the live path
+        count("Precomputed.LookupFailed")
+        print(f"Precomputed recommendation lookup failed: {str(e)}")
+        return None
+    if not item:
+        return None
+    if time.time() - float(item.get("swept_at", {}).get("N", 0)) > RECOMMENDATION_MAX_AGE_SECONDS:
+        return None
+    return item["response"]["S"]
+
+@traced_handler("LambdaSagemakerInvocation")
 def lambda_handler(event, context):
     try:
         # Extract required parameters from Step Function event
@@ -60,46 +109,51 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "Missing required fields in Step Function input."})
             }
 
-        # Fetch metrics
-        metrics = get_instance_metrics(instance_id)
-        payload = json.dumps([list(metrics.values())])
-
-        # Invoke SageMaker
-        response = sagemaker_runtime.invoke_endpoint(
-            EndpointName=ENDPOINT_NAME,
-            ContentType="application/json",
-            Body=payload
-        )
-        result = json.loads(response["Body"].read().decode())
-
-        # Parse prediction
-        if isinstance(result, list):
-            predicted_type = result[0]
-        elif isinstance(result, dict):
-            predicted_type = result.get("predicted_instance_type") or result.get("prediction") or list(result.values())[0]
-        else:
-            predicted_type = str(result)
-
-        # Generate recommendation
-        cpu = metrics["CPUUtilization"]
-        if cpu < 20:
-            recommendation = "Scale down to a smaller instance to reduce costs."
-        elif cpu > 80:
-            recommendation = "Scale up to a larger instance type for better performance."
-        else:
-            recommendation = "CPU utilization is within an optimal range. No action needed."
-
-        full_response = f"{recommendation} Suggested type: {predicted_type}"
+        # An answer computed earlier in this metric period skips CloudWatch and SageMaker entirely
+        with phase("cache_lookup"):
+            cache_key, cache_expires_at, full_response = get_cached_recommendation(instance_id)
+
+        # Otherwise serve the fleet sweep's answer when there is a fresh one
+        if full_response is None:
+            with phase("precomputed_lookup"):
+                full_response = get_precomputed_recommendation(instance_id)
+
+        def compute_recommendation():
+            # Fetch metrics and score them on the endpoint
+            with phase("fetch_metrics"):
+                metrics = get_instance_metrics(instance_id)
+            with phase("predict"):
+                predicted_type = predict_instance_types([list(metrics.values())])[0]
+
+            # Generate recommendation
+            recommendation = build_recommendation(metrics["CPUUtilization"], predicted_type)
+            prediction_cache.put(cache_key, recommendation, cache_expires_at)
+            return recommendation
+
+        # A follower's response row is written by the leader of its flight
+        role = None
+        if full_response is None:
+            with phase("single_flight"):
+                waiter = {"session_id": session_id, "request_id": request_id, "request": user_query}
+                full_response, role = single_flight.run(cache_key, waiter, compute_recommendation)
+            count(f"SingleFlight.{role.capitalize()}")
 
         # Write to DynamoDB
-        table = dynamodb.Table(TABLE_NAME)
-        table.put_item(Item={
-            "session_id": session_id,
-            "request_id": request_id,
-            "request": user_query,
-            "response": full_response,
-            "status": "ready"
-        })
+        if role != "follower":
+            with phase("store"):
+                ddb_client.put_item(
+                    TableName=TABLE_NAME,
+                    Item={
+                        "session_id": {"S": session_id},
+                        "request_id": {"S": request_id},
+                        "request": {"S": user_query},
+                        "response": {"S": full_response},
+                        "status": {"S": "ready"}
+                    }
+                )
+
+        cache_metrics = dict(prediction_cache.metrics, hit_rate=round(prediction_cache.hit_rate(), 4))
+        print(f"Prediction cache metrics: {json.dumps(cache_metrics)}")
 
         return {
             "statusCode": 200,
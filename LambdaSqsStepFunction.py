@@ -1,33 +1,158 @@
 import json
-import boto3
+import os
+import time
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize the Step Functions client
-sfn_client = boto3.client('stepfunctions')
+from aws_clients import lazy_client
+from idempotency import COMPLETED_TTL_SECONDS, PROCESSING_LEASE_SECONDS, DynamoDBClaimStore, message_key
+from tracing import count, phase, set_request_id, submit_in_context, traced_handler
 
-def lambda_handler(event, context):
-    # Extract the SQS message from the event
-    # This assumes the Lambda is triggered by an SQS event
-    sqs_message = event['Records'][0]['body']
+# Initialize the Step Functions client (built on first use)
+sfn_client = lazy_client('stepfunctions')
+ddb_client = lazy_client('dynamodb')
+
+# Define the Step Function ARN
+step_function_arn = 'arn:aws:states:us-east-1:324037300355:stateMachine:InvokeCloudUtilizationStepFucntion'
+
+# Upper bound on records processed at once from a single SQS batch
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', '10'))
+
+# "stepfunctions" starts an execution per message; "direct" applies the state machine's
+# Choice in-process and calls the handler functions without a Step Functions hop
+ROUTING_MODE = os.environ.get('ROUTING_MODE', 'stepfunctions')
+
+# Handler module and input fields per branch, mirroring InvokeCloudUtilizationStepFunction.json
+EC2_ROUTE = ('LambdaSagemakerInvocation', ("request_id", "session_id", "user_query", "intent_name", "instance_id"))
+OTHER_SERVICES_ROUTE = ('OtherServicesUtilization', ("request_id", "session_id", "user_query", "intent_name", "service_name", "from_date", "to_date"))
+
+# One claim per request_id, so SQS redeliveries and duplicate messages are dropped before any work
+claim_store = DynamoDBClaimStore(ddb_client)
+
+# Handler functions imported on first use, so Step Functions mode never loads them
+_handler_cache = {}
+
+def get_handler(module_name):
+    handler = _handler_cache.get(module_name)
+    if handler is None:
+        handler = importlib.import_module(module_name).lambda_handler
+        _handler_cache[module_name] = handler
+    return handler
+
+def route_message(message, context=None):
+    # ParseMessage + CheckIntentName: CheckInstanceSize goes to EC2, everything else to OtherServices
+    parsed = json.loads(message)
+    module_name, fields = EC2_ROUTE if parsed.get("intent_name") == "CheckInstanceSize" else OTHER_SERVICES_ROUTE
+
+    # Missing fields are passed as None; the handlers reject incomplete input themselves
+    handler_input = {field: parsed.get(field) for field in fields}
+    result = get_handler(module_name)(handler_input, context)
+
+    # Server-side failures are raised so the message is reported as a batch item failure and retried
+    if isinstance(result, dict) and int(result.get("statusCode", 200)) >= 500:
+        raise RuntimeError(f"{module_name} failed: {result.get('body')}")
+    return result
 
-    # Define the Step Function ARN
-    step_function_arn = 'arn:aws:states:us-east-1:324037300355:stateMachine:InvokeCloudUtilizationStepFucntion'
+def claim_message(request_id, message_id):
+    """True if this delivery should be processed; False if the request was already processed.
+
+    A redelivery of the same message retakes its own claim. A request in flight under another message
+    raises, so this delivery is reported as a batch item failure and retried instead of being acked.
+    """
+    try:
+        claimed, owner, status = claim_store.claim(message_key(request_id), message_id,
+                                                   time.time() + PROCESSING_LEASE_SECONDS)
+    except Exception as e:
+        # Losing deduplication is better than losing the message
+        print(f"Idempotency claim failed for request {request_id}: {str(e)}")
+        return True
+    if claimed:
+        return True
+    if status == 'done':
+        count('Idempotency.DuplicateMessage')
+        print(f"Duplicate delivery of request {request_id} dropped (processed by message {owner})")
+        return False
+    count('Idempotency.InFlightElsewhere')
+    raise RuntimeError(f"Request {request_id} is in flight under message {owner}; retrying later")
+
+def dispatch_record(record, request_id, context=None):
+    if ROUTING_MODE == 'direct':
+        with phase('route'):
+            return route_message(record['body'], context)
 
     # Create the input for the Step Function execution
     input_data = {
-        "message": sqs_message
+        "message": record['body']
     }
 
+    # Naming the execution after the request makes Step Functions reject a second one for it
+    execution_options = {'name': request_id} if request_id else {}
+
     # Start the Step Function execution
-    response = sfn_client.start_execution(
-        stateMachineArn=step_function_arn,
-        input=json.dumps(input_data)
-    )
+    try:
+        with phase('start_execution'):
+            response = sfn_client.start_execution(
+                stateMachineArn=step_function_arn,
+                input=json.dumps(input_data),
+                **execution_options
+            )
+    except sfn_client.exceptions.ExecutionAlreadyExists:
+        count('Idempotency.DuplicateExecution')
+        print(f"Step Function execution for request {request_id} already exists")
+        return None
 
     # Log the execution ARN (for debugging purposes)
     print(f"Step Function started with execution ARN: {response['executionArn']}")
+    return response
+
+def process_record(record, context=None):
+    try:
+        request_id = json.loads(record['body']).get('request_id')
+    except (ValueError, AttributeError):
+        request_id = None
+    set_request_id(request_id)
+
+    if not request_id:
+        return dispatch_record(record, request_id, context)
+    if not claim_message(request_id, record['messageId']):
+        return None
+
+    try:
+        result = dispatch_record(record, request_id, context)
+    except Exception:
+        # Free the request for the redelivery SQS makes after this failure
+        claim_store.release(message_key(request_id))
+        raise
+    try:
+        claim_store.complete(message_key(request_id), record['messageId'], time.time() + COMPLETED_TTL_SECONDS)
+    except Exception as e:
+        # The work is done; a redelivery within the lease is still dropped
+        print(f"Failed to mark request {request_id} complete: {str(e)}")
+    return result
+
+@traced_handler('LambdaSqsStepFunction')
+def lambda_handler(event, context):
+    # Process every SQS message in the batch, not just the first one.
+    # Requires ReportBatchItemFailures on the event source mapping so only failed messages are retried.
+    records = event.get('Records', [])
+    started = time.perf_counter()
+
+    batch_item_failures = []
+    if records:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(records))) as executor:
+            futures = [(record, submit_in_context(executor, process_record, record, context)) for record in records]
+            for record, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Failed to process message {record.get('messageId')}: {str(e)}")
+                    batch_item_failures.append({"itemIdentifier": record['messageId']})
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Processed batch of {len(records)} messages ({len(batch_item_failures)} failed) in {elapsed_ms:.1f} ms")
 
     return {
         'statusCode': 200,
-        'body': json.dumps('Message processed successfully.')
+        'body': json.dumps(f'Processed {len(records) - len(batch_item_failures)} of {len(records)} messages.'),
+        'batchItemFailures': batch_item_failures
     }
-
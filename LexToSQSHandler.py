@@ -1,20 +1,150 @@
 import json
-import boto3
 import uuid
 import re
+import time
 
-# Initialize AWS SQS client
-sqs_client = boto3.client('sqs')
+from aws_clients import lazy_client
+from idempotency import DynamoDBClaimStore, IDEMPOTENCY_WINDOW_SECONDS, intake_key
+from result_cache import DynamoDBResultStore, ResultCache, prediction_key, usage_key
+from tracing import count, phase, set_request_id, traced_handler
+
+# Initialize AWS SQS client (built on first use)
+sqs_client = lazy_client('sqs')
+ddb_client = lazy_client('dynamodb')
 
 # Replace with your actual SQS Queue URL
 QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/324037300355/LexOutputQueue"
 
+# Table the pipeline writes finished answers to; fetch_response reads it
+RESPONSE_TABLE_NAME = "CloudCostUtilizationResponse"
+
+# Rows are written the way the intent's own handler writes them, so an answer reads the same whichever
+# path served it: OtherServicesUtilization stores request and response JSON-encoded,
+# LambdaSagemakerInvocation as plain text
+JSON_ENCODED_INTENTS = {"CheckAWSUsage"}
+
+# Answers already computed by LambdaSagemakerInvocation / OtherServicesUtilization
+result_cache = ResultCache(DynamoDBResultStore(ddb_client))
+
+# One claim per (session, question, time bucket): retries of a question reuse the first request ID
+claim_store = DynamoDBClaimStore(ddb_client)
+
+def claim_intake(session_id, user_query, request_id):
+    """Returns (key, request_id to report); the request ID is the first caller's when this is a repeat."""
+    key = intake_key(session_id, user_query)
+    try:
+        claimed, owner, _ = claim_store.claim(key, request_id, time.time() + 2 * IDEMPOTENCY_WINDOW_SECONDS)
+    except Exception as e:
+        # Losing deduplication is better than losing the request
+        print(f"Idempotency claim failed: {str(e)}")
+        return key, request_id
+    if not claimed and owner:
+        count("Idempotency.DuplicateIntake")
+        print(f"Duplicate of request {owner} suppressed")
+        return key, owner
+    return key, request_id
+
+def received_response(intent_name, request_id):
+    # Return Lex-compatible response **(without sessionAttributes)**
+    return {
+        "sessionState": {
+            "dialogAction": {"type": "Close"},
+            "intent": {
+                "name": intent_name,
+                "state": "Fulfilled"
+            }
+        },
+        "messages": [{
+            "contentType": "PlainText",
+            "content": f"Your request has been received. Use request ID: {request_id} to track its status."
+        }, {
+            # Lets the client long-poll fetch_response for this request's own row (requestId)
+            "contentType": "CustomPayload",
+            "content": json.dumps({"request_id": request_id, "status": "queued"})
+        }]
+    }
+
+def answered_response(intent_name, request_id, answer):
+    return {
+        "sessionState": {
+            "dialogAction": {"type": "Close"},
+            "intent": {
+                "name": intent_name,
+                "state": "Fulfilled"
+            }
+        },
+        "messages": [{
+            "contentType": "PlainText",
+            "content": answer
+        }, {
+            # Lets the client show the answer without polling fetch_response for it
+            "contentType": "CustomPayload",
+            "content": json.dumps({"request_id": request_id, "status": "ready"})
+        }]
+    }
+
+def encode_field(intent_name, value):
+    return json.dumps(value) if intent_name in JSON_ENCODED_INTENTS else value
+
+def decode_field(intent_name, value):
+    return json.loads(value) if intent_name in JSON_ENCODED_INTENTS else value
+
+def store_ready_answer(intent_name, session_id, request_id, user_query, answer):
+    """Records an answer given directly in the Lex response as a ready result of this request."""
+    ddb_client.put_item(
+        TableName=RESPONSE_TABLE_NAME,
+        Item={
+            "session_id": {"S": session_id},
+            "request_id": {"S": request_id},
+            "request": {"S": encode_field(intent_name, user_query)},
+            "response": {"S": encode_field(intent_name, answer)},
+            "status": {"S": "ready"}
+        }
+    )
+
+def get_ready_answer(intent_name, session_id, request_id):
+    """The stored answer of an earlier request of the session, or None while it is still being computed."""
+    try:
+        item = ddb_client.get_item(
+            TableName=RESPONSE_TABLE_NAME,
+            Key={"session_id": {"S": session_id}, "request_id": {"S": request_id}}
+        ).get("Item")
+    except Exception as e:
+        print(f"Response lookup failed: {str(e)}")
+        return None
+    if not item or item.get("status", {}).get("S") != "ready":
+        return None
+    return decode_field(intent_name, item["response"]["S"])
+
+def get_cached_answer(message_body):
+    """A finished answer for the request from the shared result cache, or None when it must be computed."""
+    intent_name = message_body["intent_name"]
+    if intent_name == "CheckInstanceSize" and message_body.get("instance_id") != "unknown":
+        key, _ = prediction_key(message_body["instance_id"])
+    elif intent_name == "CheckAWSUsage":
+        key, _ = usage_key(message_body["service_name"], message_body["from_date"], message_body["to_date"])
+    else:
+        key = None
+    if key is None:
+        return None
+
+    try:
+        answer, level = result_cache.get(key)
+    except Exception as e:
+        # The cache is an optimization; fall back to the queue
+        print(f"Result cache lookup failed: {str(e)}")
+        return None
+    count(f"FastPath.{level.upper()}Hit" if level else "FastPath.Miss")
+    return answer
+
+@traced_handler("LexToSQSHandler")
 def lambda_handler(event, context):
     try:
         print("Event received: ", json.dumps(event))
 
-        # Generate a unique request ID
-        request_id = str(uuid.uuid4())
+        # Generate a unique request ID; the millisecond prefix lets later stages report the request's age
+        request_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4()}"
+        set_request_id(request_id)
 
         # Check if Lex detected an intent
         interpretations = event.get('interpretations', [])
@@ -79,26 +209,55 @@ def lambda_handler(event, context):
                 "instance_id": slots.get("instance_id", {}).get("value", {}).get("interpretedValue", "unknown")
             })
 
+        # Fast path: answer from the cache in this response and record it as ready, skipping the queue
+        with phase("cache_lookup"):
+            cached_answer = get_cached_answer(message_body)
+
+        if cached_answer is not None:
+            try:
+                with phase("store"):
+                    store_ready_answer(intent_name, SessionId, request_id, user_query, cached_answer)
+            except Exception as e:
+                # Without the ready record the answer is not in the session's history; queue it as usual
+                print(f"Storing cached answer failed: {str(e)}")
+                count("FastPath.StoreFailed")
+            else:
+                return answered_response(intent_name, request_id, cached_answer)
+
+        # A repeat of a question still in flight points the caller at the original request instead of
+        # queueing again; once the original is answered, the repeat gets that answer as a new result
+        with phase("claim"):
+            idempotency_key, claimed_request_id = claim_intake(SessionId, user_query, request_id)
+        if claimed_request_id != request_id:
+            with phase("duplicate_lookup"):
+                answer = get_ready_answer(intent_name, SessionId, claimed_request_id)
+            if answer is None:
+                return received_response(intent_name, claimed_request_id)
+            count("Idempotency.AnsweredDuplicate")
+            with phase("store"):
+                store_ready_answer(intent_name, SessionId, request_id, user_query, answer)
+            return answered_response(intent_name, request_id, answer)
+
+        send_options = {}
+        if QUEUE_URL.endswith(".fifo"):
+            # FIFO queues also drop a message whose deduplication ID was seen in the last 5 minutes
+            send_options = {"MessageGroupId": SessionId, "MessageDeduplicationId": idempotency_key[len("intake#"):]}
+
         # Send message to SQS and capture response
-        sqs_response = sqs_client.send_message(
-            QueueUrl=QUEUE_URL,
-            MessageBody=json.dumps(message_body)
-        )
+        # request_id travels in the body to every later stage, which traces under it
+        try:
+            with phase("enqueue"):
+                sqs_response = sqs_client.send_message(
+                    QueueUrl=QUEUE_URL,
+                    MessageBody=json.dumps(message_body),
+                    **send_options
+                )
+        except Exception:
+            # Nothing was queued under the claimed request ID; let the retry queue it
+            claim_store.release(idempotency_key)
+            raise
 
-        # Return Lex-compatible response **(without sessionAttributes)**
-        return {
-            "sessionState": {
-                "dialogAction": {"type": "Close"},
-                "intent": {
-                    "name": intent_name,
-                    "state": "Fulfilled"
-                }
-            },
-            "messages": [{
-                "contentType": "PlainText",
-                "content": f"Your request has been received. Use request ID: {request_id} to track its status."
-            }]
-        }
+        return received_response(intent_name, request_id)
 
     except Exception as e:
         return {
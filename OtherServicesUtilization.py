@@ -1,11 +1,20 @@
-import boto3
 import json
+import numpy as np
 from datetime import datetime, timedelta
 
-# Initialize AWS Clients
-ce_client = boto3.client('ce')
-cw_client = boto3.client('cloudwatch')
-ddb_client = boto3.client('dynamodb')
+from aws_clients import batch_put, lazy_client
+from cloudwatch_batch import get_metric_data_batched
+from cost_aggregation import CostAggregate, fetch_cost_aggregate
+from cost_cache import CostCache, DynamoDBCostStore, days_in_range
+from metric_catalog import DynamoDBCatalogStore, MetricCatalog
+from result_cache import DynamoDBResultStore, ResultCache, usage_key
+from single_flight import DynamoDBFlightStore, SingleFlight
+from tracing import count, phase, traced_handler
+
+# Initialize AWS Clients (built on first use)
+ce_client = lazy_client('ce')
+cw_client = lazy_client('cloudwatch')
+ddb_client = lazy_client('dynamodb')
 
 # Config
 DDB_TABLE_NAME = "CloudCostUtilizationResponse"
@@ -48,70 +57,80 @@ SERVICE_COST_MAPPING = {
     "Auto Scaling": "Auto Scaling"
 }
 
-def get_cost_data(service_name, start_date, end_date):
+def fetch_daily_costs(start_date, end_date):
+    """Cost Explorer lookup for [start_date, end_date): {day: {service: amount}} for every service."""
+    return fetch_cost_aggregate(ce_client, start_date, end_date).daily_costs()
+
+# Per-day cost cache shared by every warm invocation; only missing or non-final days reach Cost Explorer
+cost_cache = CostCache(DynamoDBCostStore(ddb_client), fetch_daily_costs)
+
+# Finished answers for closed date ranges, shared with LexToSQSHandler's fast path
+result_cache = ResultCache(DynamoDBResultStore(ddb_client))
+
+def get_cost_aggregate(start_date, end_date):
+    """Daily costs of every service in the range; serves any number of services from one lookup."""
+    daily_costs = cost_cache.get_daily_costs(start_date, end_date)
+    return CostAggregate.from_daily_costs(days_in_range(start_date, end_date), daily_costs)
+
+def get_cost_summary(service_name, start_date, end_date, aggregate=None):
+    """Total and per-day cost series of one service."""
     actual_service_name = SERVICE_COST_MAPPING.get(service_name, service_name)
+    aggregate = aggregate or get_cost_aggregate(start_date, end_date)
+    return aggregate.summary(actual_service_name)
 
-    response = ce_client.get_cost_and_usage(
-        TimePeriod={'Start': start_date, 'End': end_date},
-        Granularity='DAILY',
-        Metrics=['UnblendedCost'],
-        GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
-    )
+def get_cost_data(service_name, start_date, end_date):
+    return get_cost_summary(service_name, start_date, end_date)["total"]
+
+def list_namespace_metrics(namespace):
+    """Every metric in the namespace, following list_metrics pagination."""
+    metrics = []
+    paginator = cw_client.get_paginator('list_metrics')
+    for page in paginator.paginate(Namespace=namespace):
+        metrics.extend(page.get('Metrics', []))
+    return metrics
 
-    for result in response['ResultsByTime']:
-        for group in result['Groups']:
-            if group['Keys'][0] == actual_service_name:
-                return float(group['Metrics']['UnblendedCost']['Amount'])
-    return 0.0
+# Namespace -> metrics index reused across warm invocations, so list_metrics stays off the request path
+metric_catalog = MetricCatalog(DynamoDBCatalogStore(ddb_client), list_namespace_metrics)
 
 def get_cloudwatch_metrics(service, start_date, end_date):
     namespace = CW_NAMESPACES.get(service)
     if not namespace:
         return {}
 
-    response = cw_client.list_metrics(Namespace=namespace)
-    metrics = response.get('Metrics', [])[:3]  # Limiting for safety
+    # Only dimensioned metrics return data from GetMetricData
+    metrics = [metric for metric in metric_catalog.get_metrics(namespace) if metric.get('Dimensions')]
+    if not metrics:
+        return {}
 
-    total_utilization = {}
     start_time = datetime.fromisoformat(start_date + "T00:00:00")
     end_time = datetime.fromisoformat(end_date + "T23:59:59")
+    metric_names = [metric['MetricName'] for metric in metrics]
+
+    metric_stats = [
+        {
+            'Metric': {
+                'Namespace': namespace,
+                'MetricName': metric['MetricName'],
+                'Dimensions': metric['Dimensions']
+            },
+            'Period': 86400,
+            'Stat': 'Average'
+        }
+        for metric in metrics
+    ]
+
+    try:
+        values = get_metric_data_batched(cw_client, metric_stats, start_time, end_time)
+    except Exception as e:
+        return {metric_name: f"Error: {str(e)}" for metric_name in dict.fromkeys(metric_names)}
+
+    # Sum every datapoint of every dimension set per metric name in one vectorised pass
+    names, name_index = np.unique(metric_names, return_inverse=True)
+    counts = np.fromiter((len(series) for series in values), dtype=np.intp, count=len(values))
+    flat_values = np.fromiter((value for series in values for value in series), dtype=float, count=int(counts.sum()))
+    totals = np.bincount(np.repeat(name_index, counts), weights=flat_values, minlength=len(names))
 
-    for metric in metrics:
-        metric_name = metric['MetricName']
-        dimensions = metric.get('Dimensions', [])
-        query_id = metric_name.lower().replace(' ', '_')
-
-        if not dimensions:
-            continue
-
-        try:
-            metric_query = {
-                'Id': query_id,
-                'MetricStat': {
-                    'Metric': {
-                        'Namespace': namespace,
-                        'MetricName': metric_name,
-                        'Dimensions': dimensions
-                    },
-                    'Period': 86400,
-                    'Stat': 'Average'
-                },
-                'ReturnData': True
-            }
-
-            response = cw_client.get_metric_data(
-                MetricDataQueries=[metric_query],
-                StartTime=start_time,
-                EndTime=end_time
-            )
-
-            values = response['MetricDataResults'][0].get('Values', [])
-            total_utilization[metric_name] = sum(values)
-
-        except Exception as e:
-            total_utilization[metric_name] = f"Error: {str(e)}"
-
-    return total_utilization
+    return dict(zip(names.tolist(), totals.tolist()))
 
 def store_in_dynamodb(request_id, session_id, request_data, response_data):
     ddb_client.put_item(
@@ -125,6 +144,20 @@ def store_in_dynamodb(request_id, session_id, request_data, response_data):
         }
     )
 
+def deliver_to_waiters(waiters, response_data):
+    """Writes the answer into the response row of every session that waited on this question."""
+    batch_put(ddb_client, DDB_TABLE_NAME, [{
+        'session_id': {'S': waiter['session_id']},
+        'request_id': {'S': waiter['request_id']},
+        'request': {'S': json.dumps(waiter.get('request'))},
+        'response': {'S': json.dumps(response_data)},
+        'status': {'S': 'ready'}
+    } for waiter in waiters])
+
+# Concurrent questions about the same service and range share one Cost Explorer + CloudWatch pass
+single_flight = SingleFlight(DynamoDBFlightStore(ddb_client), deliver_to_waiters)
+
+@traced_handler("OtherServicesUtilization")
 def lambda_handler(event, context):
     session_id = event.get("session_id")
     request_id = event.get("request_id")
@@ -140,13 +173,40 @@ def lambda_handler(event, context):
         start_date = str(start_date_dt)
         end_date = str(end_date_dt)
 
-    cost = get_cost_data(service_name, start_date, end_date)
-    utilization = get_cloudwatch_metrics(service_name, start_date, end_date)
-
-    utilization_summary = ", ".join([f"{k}: {v}" for k, v in utilization.items()])
-    response_text = f"Service: {service_name}, Cost: {cost:.2f} USD, Utilization Summary: {utilization_summary}"
-
-    store_in_dynamodb(request_id, session_id, user_query, response_text)
+    # A closed range has a final answer; serve it if any container already computed it
+    usage_cache_key, usage_expires_at = usage_key(service_name, start_date, end_date)
+    response_text = None
+    if usage_cache_key:
+        response_text, level = result_cache.get(usage_cache_key)
+        count(f"UsageCache.{level.upper()}Hit" if level else "UsageCache.Miss")
+
+    def compute_usage():
+        with phase("cost"):
+            cost = get_cost_data(service_name, start_date, end_date)
+        with phase("utilization"):
+            utilization = get_cloudwatch_metrics(service_name, start_date, end_date)
+
+        utilization_summary = ", ".join([f"{k}: {v}" for k, v in utilization.items()])
+        summary = f"Service: {service_name}, Cost: {cost:.2f} USD, Utilization Summary: {utilization_summary}"
+        if usage_cache_key:
+            result_cache.put(usage_cache_key, summary, usage_expires_at)
+        return summary
+
+    # A follower's response row is written by the leader of its flight
+    role = None
+    if response_text is None:
+        with phase("single_flight"):
+            flight_key = usage_cache_key or f"usage#{service_name}#{start_date}#{end_date}"
+            waiter = {"session_id": session_id, "request_id": request_id, "request": user_query}
+            response_text, role = single_flight.run(flight_key, waiter, compute_usage)
+        count(f"SingleFlight.{role.capitalize()}")
+
+    if role != "follower":
+        with phase("store"):
+            store_in_dynamodb(request_id, session_id, user_query, response_text)
+
+    cache_metrics = dict(cost_cache.metrics, hit_rate=round(cost_cache.hit_rate(), 4))
+    print(f"Cost cache metrics: {json.dumps(cache_metrics)}")
 
     return {
         "statusCode": 200,
@@ -0,0 +1,31 @@
+import json
+import os
+import urllib.request
+
+from tracing import phase, traced_handler
+
+# Base URL of the result_stream service, e.g. http://result-stream.internal:8080
+RESULT_STREAM_URL = os.environ.get("RESULT_STREAM_URL", "http://localhost:8080")
+
+# Shared secret the service requires on /stream-records
+RESULT_STREAM_SECRET = os.environ.get("RESULT_STREAM_SECRET", "")
+
+@traced_handler("ResultStreamForwarder")
+def lambda_handler(event, context):
+    # Triggered by the CloudCostUtilizationResponse DynamoDB stream (NEW_IMAGE);
+    # the service filters for ready results and pushes them to the session's subscribers
+    records = event.get("Records", [])
+    if not records:
+        return {"statusCode": 200, "body": json.dumps({"delivered": 0})}
+
+    request = urllib.request.Request(
+        f"{RESULT_STREAM_URL}/stream-records",
+        data=json.dumps({"Records": records}).encode(),
+        headers={"Content-Type": "application/json", "X-Result-Stream-Secret": RESULT_STREAM_SECRET},
+        method="POST"
+    )
+    with phase("forward"), urllib.request.urlopen(request, timeout=5) as response:
+        body = response.read().decode()
+
+    print(f"Forwarded {len(records)} stream records: {body}")
+    return {"statusCode": 200, "body": body}
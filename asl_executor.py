@@ -0,0 +1,326 @@
+"""Local in-process executor for Amazon States Language definitions.
+
+Runs a state machine such as InvokeCloudUtilizationStepFunction.json without AWS so the
+orchestration layer can be load tested and profiled. Task states call local Python handlers
+looked up by their Resource ARN.
+
+Supported: Pass, Choice, Task, Succeed and Fail states; InputPath, Parameters (including
+States.StringToJson / States.JsonToString / States.Format), ResultSelector, ResultPath and
+OutputPath; Choice rules with And/Or/Not and the String/Numeric/Boolean/Is* comparators.
+Retry, Catch, Map, Parallel and Wait are not supported.
+
+    machine = StateMachine.from_file("InvokeCloudUtilizationStepFunction.json",
+                                     {EC2_ARN: ec2_handler, OTHER_ARN: other_handler})
+    output, trace = machine.execute({"message": body})
+"""
+import json
+import re
+import time
+
+
+class StatesError(Exception):
+    """An execution failure, carrying the States.* error name like Step Functions reports it."""
+
+    def __init__(self, error, cause=""):
+        super().__init__(f"{error}: {cause}" if cause else error)
+        self.error = error
+        self.cause = cause
+
+
+_MISSING = object()
+# Distinct sentinel so IsPresent can ask read_path for a default
+_MISSING_VALUE = object()
+_PATH_TOKEN = re.compile(r"\.([^.\[\]]+)|\[(\d+)\]|\['([^']+)'\]")
+_INTRINSIC = re.compile(r"^(States\.[A-Za-z]+)\((.*)\)$", re.S)
+
+
+def compile_path(path):
+    """Turns a reference path like $.parsed.items[0] into a tuple of keys/indexes."""
+    if path is None:
+        return None
+    if not path.startswith("$"):
+        raise StatesError("States.Runtime", f"Invalid path: {path}")
+
+    keys = []
+    position = 1
+    while position < len(path):
+        match = _PATH_TOKEN.match(path, position)
+        if not match:
+            raise StatesError("States.Runtime", f"Unsupported path: {path}")
+        name, index, quoted = match.groups()
+        keys.append(int(index) if index is not None else (name if name is not None else quoted))
+        position = match.end()
+    return tuple(keys)
+
+
+def read_path(data, keys, default=_MISSING):
+    value = data
+    for key in keys:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            if default is not _MISSING:
+                return default
+            raise StatesError("States.Runtime", f"Path not found: ${''.join(f'.{k}' for k in keys)}")
+    return value
+
+
+def write_path(data, keys, value):
+    """Returns data with value placed at keys, as ResultPath does; "$" replaces the input."""
+    if not keys:
+        return value
+    root = dict(data) if isinstance(data, dict) else {}
+    node = root
+    for key in keys[:-1]:
+        child = node.get(key)
+        child = dict(child) if isinstance(child, dict) else {}
+        node[key] = child
+        node = child
+    node[keys[-1]] = value
+    return root
+
+
+def _split_arguments(text):
+    """Splits intrinsic arguments on top-level commas, keeping quoted strings intact."""
+    arguments, current, depth, quoted = [], [], 0, False
+    for char in text:
+        if char == "'" and (not current or current[-1] != "\\"):
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            arguments.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if current:
+        arguments.append("".join(current).strip())
+    return arguments
+
+
+def compile_value(expression):
+    """Compiles the value of a "key.$" field into a function of the state input."""
+    intrinsic = _INTRINSIC.match(expression)
+    if not intrinsic:
+        keys = compile_path(expression)
+        return lambda data: read_path(data, keys)
+
+    name, raw_arguments = intrinsic.groups()
+    arguments = []
+    for argument in _split_arguments(raw_arguments):
+        if argument.startswith("'") and argument.endswith("'"):
+            literal = argument[1:-1].replace("\\'", "'")
+            arguments.append(lambda data, literal=literal: literal)
+        elif argument.startswith("$") or argument.startswith("States."):
+            arguments.append(compile_value(argument))
+        else:
+            literal = json.loads(argument)
+            arguments.append(lambda data, literal=literal: literal)
+
+    if name == "States.StringToJson":
+        return lambda data: json.loads(arguments[0](data))
+    if name == "States.JsonToString":
+        return lambda data: json.dumps(arguments[0](data), separators=(",", ":"))
+    if name == "States.Format":
+        def format_string(data):
+            template = arguments[0](data)
+            values = [value(data) for value in arguments[1:]]
+            pieces = template.split("{}")
+            if len(pieces) - 1 != len(values):
+                raise StatesError("States.Runtime", "States.Format argument count mismatch")
+            rendered = [pieces[0]]
+            for value, piece in zip(values, pieces[1:]):
+                rendered.append(value if isinstance(value, str) else json.dumps(value))
+                rendered.append(piece)
+            return "".join(rendered)
+        return format_string
+    raise StatesError("States.Runtime", f"Unsupported intrinsic function: {name}")
+
+
+def compile_template(template):
+    """Compiles a Parameters / ResultSelector payload template into a function of the input."""
+    if isinstance(template, dict):
+        fields = []
+        for key, value in template.items():
+            if key.endswith(".$"):
+                fields.append((key[:-2], compile_value(value)))
+            else:
+                fields.append((key, compile_template(value)))
+        return lambda data: {key: build(data) for key, build in fields}
+    if isinstance(template, list):
+        items = [compile_template(item) for item in template]
+        return lambda data: [build(data) for build in items]
+    return lambda data: template
+
+
+_COMPARATORS = {
+    "StringEquals": lambda v, x: isinstance(v, str) and v == x,
+    "StringLessThan": lambda v, x: isinstance(v, str) and v < x,
+    "StringGreaterThan": lambda v, x: isinstance(v, str) and v > x,
+    "StringLessThanEquals": lambda v, x: isinstance(v, str) and v <= x,
+    "StringGreaterThanEquals": lambda v, x: isinstance(v, str) and v >= x,
+    "NumericEquals": lambda v, x: _is_number(v) and v == x,
+    "NumericLessThan": lambda v, x: _is_number(v) and v < x,
+    "NumericGreaterThan": lambda v, x: _is_number(v) and v > x,
+    "NumericLessThanEquals": lambda v, x: _is_number(v) and v <= x,
+    "NumericGreaterThanEquals": lambda v, x: _is_number(v) and v >= x,
+    "BooleanEquals": lambda v, x: isinstance(v, bool) and v == x,
+    "IsNull": lambda v, x: (v is None) == x,
+    "IsString": lambda v, x: isinstance(v, str) == x,
+    "IsNumeric": lambda v, x: _is_number(v) == x,
+    "IsBoolean": lambda v, x: isinstance(v, bool) == x,
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def compile_rule(rule):
+    """Compiles a Choice rule into a predicate over the state input."""
+    if "And" in rule:
+        parts = [compile_rule(part) for part in rule["And"]]
+        return lambda data: all(part(data) for part in parts)
+    if "Or" in rule:
+        parts = [compile_rule(part) for part in rule["Or"]]
+        return lambda data: any(part(data) for part in parts)
+    if "Not" in rule:
+        part = compile_rule(rule["Not"])
+        return lambda data: not part(data)
+
+    keys = compile_path(rule["Variable"])
+    if "IsPresent" in rule:
+        expected = rule["IsPresent"]
+        return lambda data: (read_path(data, keys, _MISSING_VALUE) is not _MISSING_VALUE) == expected
+
+    for name, compare in _COMPARATORS.items():
+        if name in rule:
+            expected = rule[name]
+            return lambda data: compare(read_path(data, keys), expected)
+        if name + "Path" in rule:
+            other = compile_path(rule[name + "Path"])
+            return lambda data: compare(read_path(data, keys), read_path(data, other))
+    raise StatesError("States.Runtime", f"Unsupported Choice rule: {sorted(rule)}")
+
+
+class StateMachine:
+    """A compiled state machine; execute() can be called concurrently from many threads."""
+
+    def __init__(self, definition, resources=None):
+        self.definition = definition
+        self.resources = resources or {}
+        self.start_at = definition["StartAt"]
+        self.states = {name: self._compile_state(name, state) for name, state in definition["States"].items()}
+
+    @classmethod
+    def from_file(cls, path, resources=None):
+        with open(path) as f:
+            return cls(json.load(f), resources)
+
+    def _compile_io(self, state):
+        input_path = compile_path(state.get("InputPath", "$"))
+        output_path = compile_path(state.get("OutputPath", "$"))
+        if "ResultPath" not in state:
+            result_path = ()
+        elif state["ResultPath"] is None:
+            result_path = None
+        else:
+            result_path = compile_path(state["ResultPath"])
+        parameters = compile_template(state["Parameters"]) if "Parameters" in state else None
+        selector = compile_template(state["ResultSelector"]) if "ResultSelector" in state else None
+
+        def effective_input(data):
+            value = read_path(data, input_path) if input_path is not None else {}
+            return parameters(value) if parameters else value
+
+        def apply_result(data, result):
+            if selector:
+                result = selector(result)
+            # ResultPath null keeps the raw input and discards the result
+            combined = data if result_path is None else write_path(data, result_path, result)
+            return read_path(combined, output_path) if output_path is not None else {}
+
+        return effective_input, apply_result
+
+    def _compile_state(self, name, state):
+        state_type = state["Type"]
+        next_state = None if state.get("End") else state.get("Next")
+
+        if state_type == "Pass":
+            effective_input, apply_result = self._compile_io(state)
+            fixed = state.get("Result", _MISSING)
+
+            def run(data, context):
+                result = fixed if fixed is not _MISSING else effective_input(data)
+                return apply_result(data, result), next_state
+
+        elif state_type == "Task":
+            effective_input, apply_result = self._compile_io(state)
+            resource = state["Resource"]
+
+            def run(data, context):
+                handler = self.resources.get(resource)
+                if handler is None:
+                    raise StatesError("States.TaskFailed", f"No local handler for {resource}")
+                return apply_result(data, handler(effective_input(data), context)), next_state
+
+        elif state_type == "Choice":
+            input_path = compile_path(state.get("InputPath", "$"))
+            output_path = compile_path(state.get("OutputPath", "$"))
+            rules = [(compile_rule(rule), rule["Next"]) for rule in state["Choices"]]
+            default = state.get("Default")
+
+            def run(data, context):
+                value = read_path(data, input_path)
+                for matches, target in rules:
+                    if matches(value):
+                        return read_path(data, output_path), target
+                if default is None:
+                    raise StatesError("States.NoChoiceMatched", f"No Choice rule matched in {name}")
+                return read_path(data, output_path), default
+
+        elif state_type == "Succeed":
+            input_path = compile_path(state.get("InputPath", "$"))
+            output_path = compile_path(state.get("OutputPath", "$"))
+
+            def run(data, context):
+                return read_path(read_path(data, input_path), output_path), None
+
+        elif state_type == "Fail":
+            def run(data, context):
+                raise StatesError(state.get("Error", "States.Failed"), state.get("Cause", ""))
+
+        else:
+            raise StatesError("States.Runtime", f"Unsupported state type {state_type} in {name}")
+
+        return state_type, run
+
+    def execute(self, execution_input, context=None):
+        """Runs one execution; returns (output, trace) where trace lists (state, type, seconds)."""
+        trace = []
+        data = execution_input
+        name = self.start_at
+        while name is not None:
+            state_type, run = self.states[name]
+            started = time.perf_counter()
+            try:
+                data, next_name = run(data, context)
+            finally:
+                trace.append((name, state_type, time.perf_counter() - started))
+            name = next_name
+        return data, trace
+
+
+def summarize_traces(traces):
+    """Aggregates execute() traces into per-state count, total and mean milliseconds."""
+    summary = {}
+    for trace in traces:
+        for name, state_type, seconds in trace:
+            entry = summary.setdefault(name, {"type": state_type, "count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+    for entry in summary.values():
+        entry["mean_ms"] = entry["total_ms"] / entry["count"]
+    return summary
@@ -0,0 +1,151 @@
+"""Shared, lazily built AWS clients for the Lambda handlers.
+
+Handlers declare their clients at module level as before, but nothing is constructed at import:
+
+    sqs_client = lazy_client("sqs")
+    table = lazy_table("CloudCostUtilizationResponse")
+
+The first attribute access builds the client from one process-wide boto3 session, so the service
+model loader and credential resolution are shared, and applies client_config() (connection pool,
+TCP keep-alive, timeouts, standard retries); tracing times every call made through it. Clients are cached per process and reused across
+warm invocations; boto3 low-level clients are thread-safe.
+"""
+import os
+import threading
+import time
+
+import tracing
+
+# Tunable from the function's environment without a redeploy of the code
+MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50"))
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get("AWS_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT_SECONDS = float(os.environ.get("AWS_READ_TIMEOUT", "10"))
+MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "3"))
+
+# Calls that legitimately run longer than READ_TIMEOUT_SECONDS
+READ_TIMEOUT_OVERRIDES = {
+    "sagemaker-runtime": 60.0,
+    "ce": 30.0
+}
+
+# DynamoDB batch limits: BatchWriteItem takes at most 25 requests per call, BatchGetItem 100 keys
+DDB_BATCH_WRITE_SIZE = 25
+DDB_BATCH_GET_SIZE = 100
+
+# Unprocessed batch items are resent with exponential backoff (100 ms doubling, capped at 2 s), this often
+DDB_BATCH_MAX_ATTEMPTS = 8
+
+_lock = threading.RLock()
+_session = None
+_clients = {}
+_resources = {}
+
+
+def client_config(service_name):
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=CONNECT_TIMEOUT_SECONDS,
+        read_timeout=READ_TIMEOUT_OVERRIDES.get(service_name, READ_TIMEOUT_SECONDS),
+        retries={"mode": "standard", "max_attempts": MAX_ATTEMPTS}
+    )
+
+
+def get_session():
+    """The process-wide boto3 session; boto3 itself is imported on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import boto3
+
+                session = boto3.session.Session()
+                # Time every AWS call for the invocation that makes it
+                tracing.instrument_session(session)
+                _session = session
+    return _session
+
+
+def get_client(service_name):
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = get_session().client(service_name, config=client_config(service_name))
+                _clients[service_name] = client
+    return client
+
+
+def get_resource(service_name):
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = get_session().resource(service_name, config=client_config(service_name))
+                _resources[service_name] = resource
+    return resource
+
+
+class LazyProxy:
+    """Stands in for an object built by factory() on first attribute access."""
+
+    def __init__(self, factory, description):
+        self._factory = factory
+        self._description = description
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            with _lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        state = "built" if self._target is not None else "not built"
+        return f"<LazyProxy {self._description} ({state})>"
+
+
+def lazy_client(service_name):
+    return LazyProxy(lambda: get_client(service_name), f"client {service_name}")
+
+
+def lazy_resource(service_name):
+    return LazyProxy(lambda: get_resource(service_name), f"resource {service_name}")
+
+
+def lazy_table(table_name):
+    return LazyProxy(lambda: get_resource("dynamodb").Table(table_name), f"table {table_name}")
+
+
+def is_conditional_failure(error):
+    """True for a DynamoDB ConditionalCheckFailedException; matched on the error code so callers need not import botocore."""
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def batch_backoff(attempt):
+    """Sleeps before resending what a batch call left unprocessed; raises once the attempts are used up."""
+    if attempt >= DDB_BATCH_MAX_ATTEMPTS:
+        raise RuntimeError(f"DynamoDB left items unprocessed after {attempt} attempts")
+    time.sleep(min(0.05 * (2 ** attempt), 2))
+
+
+def batch_put(client, table_name, items):
+    """Batch-writes typed items, retrying anything DynamoDB leaves unprocessed."""
+    for start in range(0, len(items), DDB_BATCH_WRITE_SIZE):
+        requests = [{"PutRequest": {"Item": item}} for item in items[start:start + DDB_BATCH_WRITE_SIZE]]
+        attempt = 0
+        while requests:
+            response = client.batch_write_item(RequestItems={table_name: requests})
+            requests = response.get("UnprocessedItems", {}).get(table_name, [])
+            if requests:
+                attempt += 1
+                batch_backoff(attempt)
@@ -0,0 +1,546 @@
+"""In-memory stand-ins for the AWS clients the handlers use, with call counting and injected latency.
+
+Every fake shares one CallRecorder: each API call sleeps the configured latency for its service
+(plus optional jitter) and is counted per "service.operation".
+"""
+import io
+import json
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# Typical single-call latencies in milliseconds, scaled by --latency-scale
+DEFAULT_LATENCY_MS = {
+    "lex": 40.0,
+    "sqs": 10.0,
+    "stepfunctions": 25.0,
+    "cloudwatch": 20.0,
+    "ce": 80.0,
+    "sagemaker": 30.0,
+    "dynamodb": 5.0,
+    "ec2": 30.0
+}
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+
+class CallRecorder:
+    def __init__(self, latency_ms=None, jitter=0.2, seed=1):
+        self.latency_ms = dict(DEFAULT_LATENCY_MS, **(latency_ms or {}))
+        self.jitter = jitter
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def record(self, service, operation):
+        with self._lock:
+            key = f"{service}.{operation}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+            delay = self.latency_ms.get(service, 0.0) * (1 + self._random.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+
+# --- DynamoDB -------------------------------------------------------------------------------------
+
+# Key attributes per table; anything else is keyed by its first attribute
+TABLE_KEYS = {
+    "CloudCostUtilizationResponse": ("session_id", "request_id"),
+    "CloudCostRightsizingRecommendations": ("instance_id",),
+    "CloudCostDailyCache": ("day",),
+    "CloudWatchMetricCatalog": ("namespace",),
+    "CloudCostResultCache": ("cache_key",),
+    "CloudCostIdempotency": ("idempotency_key",),
+    "CloudCostInflight": ("flight_key",)
+}
+
+
+def _evaluate(condition, item):
+    expression = condition.get_expression()
+    operator, values = expression["operator"], expression["values"]
+    if operator == "AND":
+        return _evaluate(values[0], item) and _evaluate(values[1], item)
+    if operator == "OR":
+        return _evaluate(values[0], item) or _evaluate(values[1], item)
+    name = values[0].name
+    if name not in item:
+        return False
+    actual = item[name]
+    if operator == "=":
+        return actual == values[1]
+    if operator == ">":
+        return actual > values[1]
+    if operator == ">=":
+        return actual >= values[1]
+    if operator == "<":
+        return actual < values[1]
+    if operator == "<=":
+        return actual <= values[1]
+    if operator == "BETWEEN":
+        return values[1] <= actual <= values[2]
+    if operator == "begins_with":
+        return actual.startswith(values[1])
+    raise NotImplementedError(operator)
+
+
+class FakeDynamoDBStore:
+    """Tables shared by the resource-style and client-style fakes."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def key_of(self, table_name, item):
+        names = TABLE_KEYS.get(table_name) or (next(iter(item)),)
+        return tuple(item[name] for name in names)
+
+    def put(self, table_name, item):
+        with self.lock:
+            self.tables.setdefault(table_name, {})[self.key_of(table_name, item)] = dict(item)
+
+    def get(self, table_name, key):
+        with self.lock:
+            item = self.tables.get(table_name, {}).get(self.key_of(table_name, key))
+            return dict(item) if item else None
+
+    def put_if(self, table_name, item, condition):
+        """Atomic conditional put: condition(existing item or None) decides; returns (stored, existing)."""
+        with self.lock:
+            table = self.tables.setdefault(table_name, {})
+            key = self.key_of(table_name, item)
+            existing = table.get(key)
+            if not condition(existing):
+                return False, dict(existing) if existing else None
+            table[key] = dict(item)
+            return True, existing
+
+    def update_if(self, table_name, key, condition, update):
+        """Atomic conditional update: update(item) mutates a copy of the existing (or a new) item;
+        returns (updated, item after or before the update)."""
+        with self.lock:
+            table = self.tables.setdefault(table_name, {})
+            table_key = self.key_of(table_name, key)
+            existing = table.get(table_key)
+            if not condition(existing):
+                return False, dict(existing) if existing else None
+            item = dict(existing or key)
+            update(item)
+            table[table_key] = item
+            return True, dict(item)
+
+    def delete(self, table_name, key, condition=None):
+        """Removes the item; with a condition, only if condition(existing item or None) holds. Returns whether it did."""
+        with self.lock:
+            table = self.tables.get(table_name, {})
+            table_key = self.key_of(table_name, key)
+            if condition is not None and not condition(table.get(table_key)):
+                return False
+            table.pop(table_key, None)
+            return True
+
+    def scan(self, table_name):
+        with self.lock:
+            return [dict(item) for item in self.tables.get(table_name, {}).values()]
+
+
+class FakeTable:
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def put_item(self, Item, **kwargs):
+        self.store.recorder.record("dynamodb", "PutItem")
+        self.store.put(self.name, Item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self.store.recorder.record("dynamodb", "GetItem")
+        item = self.store.get(self.name, Key)
+        return {"Item": item} if item else {}
+
+    def query(self, KeyConditionExpression, Limit=None, ExclusiveStartKey=None, **kwargs):
+        self.store.recorder.record("dynamodb", "Query")
+        items = sorted(
+            (item for item in self.store.scan(self.name) if _evaluate(KeyConditionExpression, item)),
+            key=lambda item: self.store.key_of(self.name, item)
+        )
+        if ExclusiveStartKey:
+            start = self.store.key_of(self.name, ExclusiveStartKey)
+            items = [item for item in items if self.store.key_of(self.name, item) > start]
+        if Limit and len(items) > Limit:
+            items = items[:Limit]
+            last = items[-1]
+            names = TABLE_KEYS.get(self.name) or (next(iter(last)),)
+            return {"Items": items, "LastEvaluatedKey": {name: last[name] for name in names}}
+        return {"Items": items}
+
+
+class FakeDynamoDBResource:
+    def __init__(self, store):
+        self.store = store
+
+    def Table(self, name):
+        return FakeTable(self.store, name)
+
+
+_COMPARISONS = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b
+}
+_TERM = re.compile(r"^(attribute_not_exists|attribute_exists)\((\S+)\)$|^(\S+)\s*(=|<>|<=|>=|<|>)\s*(:\S+)$")
+
+
+def compile_condition(expression, names=None, values=None):
+    """Predicate over a plain item for simple ConditionExpressions: terms joined by AND/OR, no parentheses."""
+    names = names or {}
+    values = {key: _deserializer.deserialize(value) for key, value in (values or {}).items()}
+
+    def term(text):
+        match = _TERM.match(text.strip())
+        if not match:
+            raise NotImplementedError(f"Unsupported condition: {text}")
+        function, function_attr, attr, operator, placeholder = match.groups()
+        if function:
+            name = names.get(function_attr, function_attr)
+            return (lambda item: name in item) if function == "attribute_exists" else (lambda item: name not in item)
+        name = names.get(attr, attr)
+        compare, expected = _COMPARISONS[operator], values[placeholder]
+        return lambda item: name in item and compare(item[name], expected)
+
+    alternatives = [[term(part) for part in re.split(r"\s+AND\s+", branch)]
+                    for branch in re.split(r"\s+OR\s+", expression)]
+    return lambda item: any(all(check(item or {}) for check in branch) for branch in alternatives)
+
+
+_ASSIGNMENT = re.compile(r"^(\S+)\s*=\s*(?:list_append\((\S+),\s*(:\S+)\)|(:\S+))$")
+
+
+def compile_update(expression, names=None, values=None):
+    """Mutator for UpdateExpressions of the form "SET a = :v, b = list_append(b, :w)"."""
+    names = names or {}
+    values = {key: _deserializer.deserialize(value) for key, value in (values or {}).items()}
+    keyword, _, assignments = expression.strip().partition(" ")
+    if keyword.upper() != "SET":
+        raise NotImplementedError(f"Unsupported update: {expression}")
+
+    steps = []
+    for assignment in re.split(r",(?![^(]*\))", assignments):
+        match = _ASSIGNMENT.match(assignment.strip())
+        if not match:
+            raise NotImplementedError(f"Unsupported update: {assignment}")
+        target, appended_to, appended, value = match.groups()
+        steps.append((names.get(target, target), names.get(appended_to, appended_to), values[appended or value]))
+
+    def update(item):
+        for target, appended_to, value in steps:
+            item[target] = list(item.get(appended_to, [])) + list(value) if appended_to else value
+    return update
+
+
+def conditional_check_failed(operation, item=None):
+    response = {"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}}
+    if item is not None:
+        response["Item"] = item
+    return ClientError(response, operation)
+
+
+class FakeDynamoDBClient:
+    """Low-level client: typed attribute values in and out."""
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def _plain(item):
+        return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
+    @staticmethod
+    def _typed(item):
+        return {key: _serializer.serialize(value) for key, value in item.items()}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure=None, **kwargs):
+        self.store.recorder.record("dynamodb", "PutItem")
+        if ConditionExpression is None:
+            self.store.put(TableName, self._plain(Item))
+            return {}
+        condition = compile_condition(ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        stored, existing = self.store.put_if(TableName, self._plain(Item), condition)
+        if not stored:
+            old = self._typed(existing) if existing and ReturnValuesOnConditionCheckFailure == "ALL_OLD" else None
+            raise conditional_check_failed("PutItem", old)
+        return {}
+
+    def get_item(self, TableName, Key, **kwargs):
+        self.store.recorder.record("dynamodb", "GetItem")
+        item = self.store.get(TableName, self._plain(Key))
+        return {"Item": self._typed(item)} if item else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues="NONE", ReturnValuesOnConditionCheckFailure=None,
+                    **kwargs):
+        self.store.recorder.record("dynamodb", "UpdateItem")
+        condition = (compile_condition(ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+                     if ConditionExpression else (lambda item: True))
+        update = compile_update(UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        updated, item = self.store.update_if(TableName, self._plain(Key), condition, update)
+        if not updated:
+            old = self._typed(item) if item and ReturnValuesOnConditionCheckFailure == "ALL_OLD" else None
+            raise conditional_check_failed("UpdateItem", old)
+        return {"Attributes": self._typed(item)} if ReturnValues == "ALL_NEW" else {}
+
+    def delete_item(self, TableName, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, **kwargs):
+        self.store.recorder.record("dynamodb", "DeleteItem")
+        condition = (compile_condition(ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+                     if ConditionExpression else None)
+        if not self.store.delete(TableName, self._plain(Key), condition):
+            raise conditional_check_failed("DeleteItem")
+        return {}
+
+    def batch_get_item(self, RequestItems):
+        self.store.recorder.record("dynamodb", "BatchGetItem")
+        responses = {}
+        for table_name, request in RequestItems.items():
+            found = [self.store.get(table_name, self._plain(key)) for key in request["Keys"]]
+            responses[table_name] = [self._typed(item) for item in found if item]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems):
+        self.store.recorder.record("dynamodb", "BatchWriteItem")
+        for table_name, requests in RequestItems.items():
+            for request in requests:
+                self.store.put(table_name, self._plain(request["PutRequest"]["Item"]))
+        return {"UnprocessedItems": {}}
+
+
+# --- CloudWatch, Cost Explorer, SageMaker, EC2 ----------------------------------------------------
+
+class FakeCloudWatch:
+    def __init__(self, recorder, metrics_per_namespace=12, seed=3):
+        self.recorder = recorder
+        self.metrics_per_namespace = metrics_per_namespace
+        self._random = random.Random(seed)
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, **kwargs):
+        self.recorder.record("cloudwatch", "GetMetricData")
+        days = max(1, (EndTime - StartTime).days)
+        results = []
+        for query in MetricDataQueries:
+            period = query["MetricStat"]["Period"]
+            points = 1 if period < 86400 else min(days, 30)
+            results.append({"Id": query["Id"], "Values": [round(self._random.uniform(0, 100), 3) for _ in range(points)],
+                            "StatusCode": "Complete"})
+        return {"MetricDataResults": results}
+
+    def get_paginator(self, operation):
+        assert operation == "list_metrics"
+        return _ListMetricsPaginator(self)
+
+
+class _ListMetricsPaginator:
+    def __init__(self, cloudwatch):
+        self.cloudwatch = cloudwatch
+
+    def paginate(self, Namespace):
+        self.cloudwatch.recorder.record("cloudwatch", "ListMetrics")
+        yield {"Metrics": [
+            {"Namespace": Namespace, "MetricName": f"Metric{i % 4}", "Dimensions": [{"Name": "Resource", "Value": f"r{i}"}]}
+            for i in range(self.cloudwatch.metrics_per_namespace)
+        ]}
+
+
+class FakeCostExplorer:
+    SERVICES = ["AWS Lambda", "Amazon Simple Storage Service", "Amazon Simple Queue Service",
+                "Amazon Elastic Compute Cloud - Compute", "Amazon DynamoDB"]
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def get_cost_and_usage(self, TimePeriod, **kwargs):
+        self.recorder.record("ce", "GetCostAndUsage")
+        start = datetime.strptime(TimePeriod["Start"], "%Y-%m-%d").date()
+        end = datetime.strptime(TimePeriod["End"], "%Y-%m-%d").date()
+        results = []
+        day = start
+        while day < end:
+            results.append({
+                "TimePeriod": {"Start": str(day), "End": str(day + timedelta(days=1))},
+                "Groups": [{"Keys": [service], "Metrics": {"UnblendedCost": {"Amount": str(0.1 * (i + 1)), "Unit": "USD"}}}
+                           for i, service in enumerate(self.SERVICES)]
+            })
+            day += timedelta(days=1)
+        return {"ResultsByTime": results}
+
+
+class FakeSageMakerRuntime:
+    TYPES = ["t3.small", "t3.medium", "t3.large", "m5.4xlarge", "t3a.micro"]
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def invoke_endpoint(self, EndpointName, Body, **kwargs):
+        self.recorder.record("sagemaker", "InvokeEndpoint")
+        rows = json.loads(Body)
+        predictions = [self.TYPES[int(row[0]) % len(self.TYPES)] for row in rows]
+        return {"Body": io.BytesIO(json.dumps(predictions).encode())}
+
+
+# --- Lex, SQS, Step Functions ---------------------------------------------------------------------
+
+INSTANCE_PATTERN = re.compile(r"\b(i-[0-9a-zA-Z]+)\b")
+DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})")
+SERVICE_PATTERN = re.compile(r"\b(EC2|S3|Lambda|SQS|RDS|DynamoDB|SNS|Kinesis|CloudFront|EBS)\b", re.I)
+
+
+class FakeLex:
+    """recognize_text classifies the query with regexes and calls the fulfillment handler, like Lex does."""
+
+    def __init__(self, recorder, fulfillment_handler):
+        self.recorder = recorder
+        self.fulfillment_handler = fulfillment_handler
+
+    def recognize_text(self, botId, botAliasId, localeId, sessionId, text):
+        self.recorder.record("lex", "RecognizeText")
+        instance = INSTANCE_PATTERN.search(text)
+        if instance:
+            intent = {"name": "CheckInstanceSize",
+                      "slots": {"instance_id": {"value": {"interpretedValue": instance.group(1)}}}}
+        else:
+            service = SERVICE_PATTERN.search(text)
+            dates = DATE_PATTERN.findall(text)
+            slots = {"service_name": {"value": {"interpretedValue": service.group(1) if service else "EC2"}}}
+            if len(dates) >= 2:
+                slots["from_date"] = {"value": {"interpretedValue": dates[0]}}
+                slots["to_date"] = {"value": {"interpretedValue": dates[1]}}
+            intent = {"name": "CheckAWSUsage", "slots": slots}
+
+        event = {
+            "sessionId": sessionId,
+            "inputTranscript": text,
+            "interpretations": [{"intent": intent}],
+            "sessionState": {"intent": intent}
+        }
+        fulfillment = self.fulfillment_handler(event, None)
+        return {"sessionId": sessionId, "messages": fulfillment.get("messages", []),
+                "sessionState": fulfillment.get("sessionState", {})}
+
+
+class FakeSQS:
+    """A FIFO-ordered in-memory queue; consumers read batches with receive_batch().
+
+    redelivery_rate delivers that fraction of messages twice, like a standard queue's at-least-once delivery;
+    the second copy arrives redelivery_delay seconds later, as after a visibility timeout.
+    """
+
+    def __init__(self, recorder, redelivery_rate=0.0, seed=5, redelivery_delay=0.5):
+        self.recorder = recorder
+        self.redelivery_rate = redelivery_rate
+        self.redelivery_delay = redelivery_delay
+        self.messages = queue.Queue()
+        self.redelivered = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        self.recorder.record("sqs", "SendMessage")
+        with self._lock:
+            self._sequence += 1
+            message_id = str(self._sequence)
+            copies = 2 if self._random.random() < self.redelivery_rate else 1
+            self.redelivered += copies - 1
+        sent_at = str(int(time.time() * 1000))
+        for receive_count in range(1, copies + 1):
+            message = {
+                "messageId": message_id,
+                "body": MessageBody,
+                "attributes": {"SentTimestamp": sent_at, "ApproximateReceiveCount": str(receive_count)},
+                "messageAttributes": kwargs.get("MessageAttributes", {}),
+                "enqueued_at": time.perf_counter()
+            }
+            if receive_count == 1:
+                self.messages.put(message)
+            else:
+                timer = threading.Timer(self.redelivery_delay, self.messages.put, args=(message,))
+                timer.daemon = True
+                timer.start()
+        return {"MessageId": message_id}
+
+    def receive_batch(self, max_messages=10, timeout=0.1):
+        try:
+            batch = [self.messages.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < max_messages:
+            try:
+                batch.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+
+class FakeStepFunctions:
+    """start_execution runs the state machine synchronously on the local ASL executor."""
+
+    class exceptions:
+        class ExecutionAlreadyExists(Exception):
+            pass
+
+    def __init__(self, recorder, machine, transition_ms=0.0):
+        self.recorder = recorder
+        self.machine = machine
+        self.transition_ms = transition_ms
+        self.traces = []
+        self.names = set()
+        self._lock = threading.Lock()
+
+    def start_execution(self, stateMachineArn, input, name=None, **kwargs):
+        self.recorder.record("stepfunctions", "StartExecution")
+        if name is not None:
+            with self._lock:
+                if name in self.names:
+                    raise self.exceptions.ExecutionAlreadyExists(f"Execution {name} already exists")
+                self.names.add(name)
+        output, trace = self.machine.execute(json.loads(input))
+        if self.transition_ms:
+            time.sleep(len(trace) * self.transition_ms / 1000.0)
+        with self._lock:
+            self.traces.append(trace)
+        return {"executionArn": f"{stateMachineArn}:local-{len(self.traces)}", "startDate": datetime.utcnow()}
+
+
+class FakeEC2:
+    def __init__(self, recorder, instance_ids):
+        self.recorder = recorder
+        self.instance_ids = instance_ids
+
+    def get_paginator(self, operation):
+        assert operation == "describe_instances"
+        fake = self
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                for start in range(0, len(fake.instance_ids), 1000):
+                    fake.recorder.record("ec2", "DescribeInstances")
+                    chunk = fake.instance_ids[start:start + 1000]
+                    yield {"Reservations": [{"Instances": [{"InstanceId": i, "InstanceType": "t3.large"} for i in chunk]}]}
+
+        return Paginator()
+
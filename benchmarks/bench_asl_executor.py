@@ -0,0 +1,56 @@
+"""Executions per second and per-state time of InvokeCloudUtilizationStepFunction.json on the local executor.
+
+Task handlers are no-ops, so the numbers are pure orchestration overhead.
+
+    python benchmarks/bench_asl_executor.py --executions 50000
+"""
+import argparse
+import json
+import os
+import time
+
+from common import REPO_ROOT, write_json
+
+from asl_executor import StateMachine, summarize_traces
+
+DEFINITION_PATH = os.path.join(REPO_ROOT, "InvokeCloudUtilizationStepFunction.json")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--executions", type=int, default=50000)
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    with open(DEFINITION_PATH) as f:
+        definition = json.load(f)
+    task_arns = [state["Resource"] for state in definition["States"].values() if state["Type"] == "Task"]
+    machine = StateMachine(definition, {arn: (lambda event, context: event) for arn in task_arns})
+
+    messages = [
+        json.dumps({"request_id": "r", "session_id": "s", "user_query": "q",
+                    "intent_name": "CheckInstanceSize", "instance_id": "i-0123456789"}),
+        json.dumps({"request_id": "r", "session_id": "s", "user_query": "q", "intent_name": "CheckAWSUsage",
+                    "service_name": "Lambda", "from_date": "2025-04-01", "to_date": "2025-04-15"})
+    ]
+
+    traces = []
+    started = time.perf_counter()
+    for i in range(args.executions):
+        traces.append(machine.execute({"message": messages[i % 2]})[1])
+    elapsed = time.perf_counter() - started
+
+    per_state = summarize_traces(traces)
+    print(f"{args.executions} executions in {elapsed:.3f} s ({args.executions / elapsed:,.0f} executions/s)")
+    print(f"{'state':<18} {'type':<8} {'count':>8} {'mean us':>9} {'share':>7}")
+    total_ms = sum(entry["total_ms"] for entry in per_state.values())
+    for name, entry in per_state.items():
+        print(f"{name:<18} {entry['type']:<8} {entry['count']:>8} {entry['mean_ms'] * 1000:>9.2f} "
+              f"{entry['total_ms'] / total_ms:>7.1%}")
+
+    if args.output:
+        write_json(args.output, {"executions_per_second": args.executions / elapsed, "states": per_state})
+
+
+if __name__ == "__main__":
+    main()
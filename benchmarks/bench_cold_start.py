@@ -0,0 +1,89 @@
+"""Cold-start cost of the handler modules: eager boto3 clients at import versus aws_clients' lazy shared clients.
+
+Each sample runs in a fresh interpreter. "eager" imports the handler and then builds the same clients the
+way the handlers used to at import time (boto3.client / boto3.resource with default settings); "lazy"
+imports the handler (no clients built) and then measures the first use, which builds every client the
+module declares from the shared session with the tuned Config.
+
+Compare "lazy total" (init plus first use) with "eager init": lazy clients move the client build out of
+module init rather than removing it, so the totals come out about the same and only clients a code path
+never uses are saved.
+
+    python benchmarks/bench_cold_start.py --samples 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import REPO_ROOT, write_json
+
+MODULES = ["APIToLexHandler", "LexToSQSHandler", "LambdaSqsStepFunction", "LambdaSagemakerInvocation",
+           "OtherServicesUtilization", "fetch_response", "FleetRightsizingSweep"]
+
+SAMPLE = r"""
+import json, sys, time
+started = time.perf_counter()
+import aws_clients
+module = __import__(sys.argv[1])
+imported = time.perf_counter()
+proxies = [value for value in vars(module).values() if isinstance(value, aws_clients.LazyProxy)]
+
+if sys.argv[2] == "eager":
+    import boto3
+    for proxy in proxies:
+        kind, name = proxy._description.split(" ", 1)
+        if kind == "client":
+            boto3.client(name)
+        elif kind == "resource":
+            boto3.resource(name)
+        else:
+            boto3.resource("dynamodb").Table(name)
+else:
+    for proxy in proxies:
+        proxy.resolve()
+built = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "clients_ms": (built - imported) * 1000,
+                  "clients": len(proxies)}))
+"""
+
+
+def run_sample(module, mode):
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    output = subprocess.check_output([sys.executable, "-c", SAMPLE, module, mode], cwd=REPO_ROOT, env=env, text=True,
+                                     stderr=subprocess.DEVNULL)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--modules", nargs="*", default=MODULES)
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'module':<28} {'clients':>7} {'eager init ms':>14} {'lazy init ms':>13} {'first use ms':>13} {'lazy total ms':>14}")
+    for module in args.modules:
+        eager = [run_sample(module, "eager") for _ in range(args.samples)]
+        lazy = [run_sample(module, "lazy") for _ in range(args.samples)]
+        entry = {
+            "clients": lazy[0]["clients"],
+            # Before the change the clients were built during import, so both count as init
+            "eager_init_ms": round(statistics.median(s["import_ms"] + s["clients_ms"] for s in eager), 2),
+            "lazy_init_ms": round(statistics.median(s["import_ms"] for s in lazy), 2),
+            "lazy_first_use_ms": round(statistics.median(s["clients_ms"] for s in lazy), 2)
+        }
+        entry["lazy_total_ms"] = round(entry["lazy_init_ms"] + entry["lazy_first_use_ms"], 2)
+        results[module] = entry
+        print(f"{module:<28} {entry['clients']:>7} {entry['eager_init_ms']:>14.1f} {entry['lazy_init_ms']:>13.1f} "
+              f"{entry['lazy_first_use_ms']:>13.1f} {entry['lazy_total_ms']:>14.1f}")
+
+    if args.output:
+        write_json(args.output, {"samples": args.samples, "modules": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compares single-row latency of the local and SageMaker inference backends on X_test-V-1.csv.
+
+    python benchmarks/bench_inference_backends.py --model-dir ./model
+    python benchmarks/bench_inference_backends.py --model-dir ./model --endpoint RF-custom-model-...
+"""
+import argparse
+import time
+
+from common import X_TEST_PATH, load_feature_rows, summarize, write_json
+
+from inference_backends import LocalModelBackend, SageMakerEndpointBackend
+
+
+def time_backend(backend, rows):
+    backend.predict(rows[:1])  # Warm-up: first call pays connection setup / lazy init
+
+    latencies = []
+    for row in rows:
+        started = time.perf_counter()
+        backend.predict([row])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", type=str, help="Directory holding model.joblib")
+    parser.add_argument("--endpoint", type=str, help="SageMaker endpoint name; omit to skip the remote backend")
+    parser.add_argument("--data", type=str, default=X_TEST_PATH)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    rows = load_feature_rows(args.data, limit=args.rows)
+    results = {}
+
+    if args.model_dir:
+        started = time.perf_counter()
+        local = LocalModelBackend(args.model_dir)
+        load_ms = (time.perf_counter() - started) * 1000
+        results["local"] = dict(time_backend(local, rows), load_ms=round(load_ms, 2))
+
+    if args.endpoint:
+        import boto3
+        remote = SageMakerEndpointBackend(boto3.client("sagemaker-runtime"), args.endpoint)
+        results["sagemaker"] = time_backend(remote, rows)
+
+    if not results:
+        parser.error("pass --model-dir and/or --endpoint")
+
+    print(f"{'backend':<10} {'rows':>6} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<10} {stats['count']:>6} {stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f} {stats['mean_ms']:>10.3f}")
+
+    if args.output:
+        write_json(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
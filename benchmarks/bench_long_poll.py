@@ -0,0 +1,125 @@
+"""DynamoDB reads and Lambda invocations per completed request: client polling versus server-side long-poll.
+
+Each simulated request becomes ready after a random delay. "client-poll" reproduces the React client
+(invoke fetch_response, wait --poll-interval-ms, repeat); "long-poll" invokes it with wait=20.
+
+    python benchmarks/bench_long_poll.py --requests 20 --min-ready-ms 500 --max-ready-ms 4000
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import summarize, write_json
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import fetch_response
+
+
+class FakeResponseTable:
+    """Holds one row per session that flips to ready at a given time; counts every read."""
+
+    def __init__(self):
+        self.ready_at = {}
+        self.reads = {}
+        self.lock = threading.Lock()
+
+    def _item(self, session_id):
+        with self.lock:
+            self.reads[session_id] = self.reads.get(session_id, 0) + 1
+        if time.monotonic() >= self.ready_at[session_id]:
+            return {"session_id": session_id, "request_id": "r1", "status": "ready", "response": "done"}
+        return None
+
+    def query(self, KeyConditionExpression, **kwargs):
+        # The handler queries with Key("session_id").eq(session_id)
+        session_id = KeyConditionExpression.get_expression()["values"][1]
+        item = self._item(session_id)
+        return {"Items": [item] if item else []}
+
+    def get_item(self, Key, **kwargs):
+        item = self._item(Key["session_id"])
+        return {"Item": item} if item else {}
+
+
+def client_poll(session_id, interval_ms):
+    invocations = 0
+    while True:
+        invocations += 1
+        body = json.loads(fetch_response.lambda_handler({"sessionId": session_id}, None)["body"])
+        if body["responses"] and body["responses"][0]["status"] == "ready":
+            return invocations
+        time.sleep(interval_ms / 1000.0)
+
+
+def long_poll(session_id, wait_seconds):
+    invocations = 0
+    while True:
+        invocations += 1
+        event = {"sessionId": session_id, "requestId": "r1", "wait": wait_seconds}
+        body = json.loads(fetch_response.lambda_handler(event, None)["body"])
+        if body["responses"] and body["responses"][0]["status"] == "ready":
+            return invocations
+
+
+def run_mode(mode, delays_ms, args):
+    table = FakeResponseTable()
+    fetch_response.table = table
+
+    def one(index):
+        session_id = f"{mode}-{index}"
+        table.ready_at[session_id] = time.monotonic() + delays_ms[index] / 1000.0
+        if mode == "client-poll":
+            invocations = client_poll(session_id, args.poll_interval_ms)
+        else:
+            invocations = long_poll(session_id, args.wait)
+        # Time from the result landing until the client saw it
+        detection_ms = (time.monotonic() - table.ready_at[session_id]) * 1000
+        return invocations, table.reads[session_id], detection_ms
+
+    with ThreadPoolExecutor(max_workers=len(delays_ms)) as executor:
+        outcomes = list(executor.map(one, range(len(delays_ms))))
+
+    count = len(outcomes)
+    return {
+        "requests": count,
+        "reads_per_request": round(sum(o[1] for o in outcomes) / count, 2),
+        "invocations_per_request": round(sum(o[0] for o in outcomes) / count, 2),
+        "detection_latency": summarize([o[2] for o in outcomes])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--min-ready-ms", type=float, default=500)
+    parser.add_argument("--max-ready-ms", type=float, default=4000)
+    parser.add_argument("--poll-interval-ms", type=float, default=30, help="Client delay between polls (App.js used 30 ms)")
+    parser.add_argument("--wait", type=float, default=20, help="Long-poll wait parameter in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    # Silence the per-invocation event logging
+    fetch_response.print = lambda *a, **k: None
+
+    rng = random.Random(args.seed)
+    delays_ms = [rng.uniform(args.min_ready_ms, args.max_ready_ms) for _ in range(args.requests)]
+    results = {mode: run_mode(mode, delays_ms, args) for mode in ("client-poll", "long-poll")}
+
+    print(f"{'mode':<12} {'reads/req':>10} {'invokes/req':>12} {'detect p50 ms':>14} {'detect p99 ms':>14}")
+    for mode, stats in results.items():
+        latency = stats["detection_latency"]
+        print(f"{mode:<12} {stats['reads_per_request']:>10} {stats['invocations_per_request']:>12} "
+              f"{latency['p50_ms']:>14.1f} {latency['p99_ms']:>14.1f}")
+
+    if args.output:
+        write_json(args.output, {"config": vars(args), "results": results})
+
+
+if __name__ == "__main__":
+    main()
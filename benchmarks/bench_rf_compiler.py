@@ -0,0 +1,119 @@
+"""Scores X_test-V-1.csv with pipeline.predict and with the NumPy-compiled pipeline (sagemaker_project/rf_compiler.py).
+
+Checks that both give identical predictions (on the raw request rows predict_fn receives, and with the
+forest alone on scaled rows), then reports batch throughput in rows/sec, single-row latency, and time
+per call across batch sizes (which places COMPILED_MAX_BATCH_ROWS); both scorers scale and predict.
+
+    python benchmarks/bench_rf_compiler.py --model-dir ./model
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from common import X_TEST_PATH, load_feature_rows, summarize, write_json
+
+from rf_compiler import COMPILED_MAX_BATCH_ROWS, compile_forest
+
+
+def rows_per_second(predict, X, min_seconds=1.0):
+    """Best-of rows/sec of predict on the whole batch, repeating until min_seconds have passed."""
+    predict(X)
+    best, spent = 0.0, 0.0
+    while spent < min_seconds:
+        started = time.perf_counter()
+        predict(X)
+        elapsed = time.perf_counter() - started
+        spent += elapsed
+        best = max(best, len(X) / elapsed)
+    return best
+
+
+def single_row_latency(predict, X, rows):
+    predict(X[:1])
+    latencies = []
+    for index in range(min(rows, len(X))):
+        row = X[index:index + 1]
+        started = time.perf_counter()
+        predict(row)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return summarize(latencies)
+
+
+def batch_ms(predict, X, repeats=7):
+    predict(X)
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        predict(X)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", type=str, required=True, help="Directory holding model.joblib")
+    parser.add_argument("--data", type=str, default=X_TEST_PATH)
+    parser.add_argument("--latency-rows", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=str, default="1,10,100,256,500,2000")
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    # The forest was fitted on a DataFrame; numpy rows are what both serving paths pass
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    pipeline = joblib.load(os.path.join(args.model_dir, "model.joblib"))["pipeline"]
+    model = pipeline.steps[-1][1]
+    started = time.perf_counter()
+    forest = compile_forest(pipeline)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    X = np.asarray(load_feature_rows(args.data), dtype=float)
+    X_scaled = pipeline[:-1].transform(X)
+    mismatches = {
+        "pipeline": int((pipeline.predict(X) != forest.predict(X)).sum()),
+        "forest": int((model.predict(X_scaled) != compile_forest(model).predict(X_scaled)).sum())
+    }
+    identical = not any(mismatches.values())
+
+    results = {
+        "trees": forest.n_trees,
+        "nodes": forest.n_nodes,
+        "max_depth": forest.max_depth,
+        "rows": len(X),
+        "compile_ms": round(compile_ms, 2),
+        "identical_predictions": identical,
+        "mismatches": mismatches
+    }
+    for name, predict in (("sklearn", pipeline.predict), ("compiled", forest.predict)):
+        results[name] = {
+            "rows_per_second": round(rows_per_second(predict, X)),
+            "single_row": single_row_latency(predict, X, args.latency_rows),
+            "batch_ms": {size: round(batch_ms(predict, X[:size]), 3)
+                         for size in map(int, args.batch_sizes.split(",")) if size <= len(X)}
+        }
+
+    print(f"Compiled {results['trees']} trees ({results['nodes']} nodes, depth {results['max_depth']}) "
+          f"in {compile_ms:.1f} ms; predictions identical on {len(X)} rows: {identical}")
+    print(f"{'scorer':<10} {'rows/sec':>12} {'1-row p50 ms':>14} {'1-row p99 ms':>14}")
+    for name in ("sklearn", "compiled"):
+        entry = results[name]
+        print(f"{name:<10} {entry['rows_per_second']:>12,} {entry['single_row']['p50_ms']:>14.3f} "
+              f"{entry['single_row']['p99_ms']:>14.3f}")
+
+    print(f"{'batch rows':<10} {'sklearn ms':>12} {'compiled ms':>14}   (compiled serves <= {COMPILED_MAX_BATCH_ROWS} rows)")
+    for size, sklearn_ms in results["sklearn"]["batch_ms"].items():
+        print(f"{size:<10} {sklearn_ms:>12.3f} {results['compiled']['batch_ms'][size]:>14.3f}")
+
+    if args.output:
+        write_json(args.output, results)
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
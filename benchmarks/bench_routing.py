@@ -0,0 +1,103 @@
+"""End-to-end latency of Step Functions routing versus direct in-process routing, through the real handlers.
+
+Both modes run LambdaSqsStepFunction and the real LambdaSagemakerInvocation / OtherServicesUtilization
+handlers against the in-memory AWS fakes (pipeline_load_test.install_fakes, same injected per-service
+latencies in both modes). In "stepfunctions" mode every message executes the real
+InvokeCloudUtilizationStepFunction.json definition on the local ASL executor; "direct" applies the same
+Choice in-process. The measured latency runs from the SQS batch reaching LambdaSqsStepFunction to the
+handler finishing.
+
+What Step Functions itself adds in AWS (the StartExecution call, each state transition, the Task's Lambda
+invoke) cannot be measured locally. Those are NOT measurements: they are modeled from the --start-ms,
+--transition-ms and --invoke-ms assumptions, applied to the states each execution actually ran, and
+reported in their own column next to the measured numbers.
+
+    python benchmarks/bench_routing.py --messages 200 --start-ms 25 --transition-ms 15 --invoke-ms 20
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+
+from common import summarize, write_json
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import LambdaSqsStepFunction
+from aws_fakes import CallRecorder
+from pipeline_load_test import PipelineTimeline, install_fakes
+
+
+def build_messages(count):
+    messages = []
+    for i in range(count):
+        message = {"request_id": f"req-{i}", "session_id": f"bench-{i}", "user_query": "bench"}
+        if i % 2:
+            message.update({"intent_name": "CheckInstanceSize", "instance_id": f"i-{i:017x}"})
+        else:
+            message.update({"intent_name": "CheckAWSUsage", "service_name": "Lambda",
+                            "from_date": "2025-04-01", "to_date": "2025-04-15"})
+        messages.append(message)
+    return messages
+
+
+def modeled_overhead_ms(trace, args):
+    """Step Functions service time for one execution under the benchmark's assumptions (not measured)."""
+    tasks = sum(1 for _, state_type, _ in trace if state_type == "Task")
+    return args.start_ms + len(trace) * args.transition_ms + tasks * args.invoke_ms
+
+
+def run_mode(mode, messages, args):
+    # The Step Functions service time is modeled separately, so the fake's StartExecution does not sleep
+    recorder = CallRecorder(latency_ms={"stepfunctions": 0.0})
+    timeline = PipelineTimeline()
+    _, step_functions = install_fakes(recorder, mode, timeline)
+
+    measured, modeled = [], []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for message in messages:
+            event = {"Records": [{"messageId": message["request_id"], "body": json.dumps(message)}]}
+            traces_before = len(step_functions.traces)
+            started = time.perf_counter()
+            LambdaSqsStepFunction.lambda_handler(event, None)
+            finished = timeline.get(message["request_id"])["handler_end"]
+            measured.append((finished - started) * 1000)
+            trace = step_functions.traces[traces_before] if len(step_functions.traces) > traces_before else None
+            modeled.append(modeled_overhead_ms(trace, args) if trace else 0.0)
+
+    return {
+        "measured": summarize(measured),
+        "modeled_sfn_overhead_ms": round(sum(modeled) / len(modeled), 3),
+        "measured_plus_modeled": summarize([m + o for m, o in zip(measured, modeled)])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--start-ms", type=float, default=25.0, help="assumed StartExecution API latency")
+    parser.add_argument("--transition-ms", type=float, default=15.0, help="assumed latency per state transition")
+    parser.add_argument("--invoke-ms", type=float, default=20.0, help="assumed Task state Lambda invoke overhead")
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages)
+    results = {mode: run_mode(mode, messages, args) for mode in ("stepfunctions", "direct")}
+
+    print(f"{'mode':<14} {'measured p50':>13} {'p95':>8} {'p99':>8}   {'modeled SFN ms':>14}   "
+          f"{'total p50':>10} {'p95':>8} {'p99':>8}")
+    for mode, stats in results.items():
+        measured, total = stats["measured"], stats["measured_plus_modeled"]
+        print(f"{mode:<14} {measured['p50_ms']:>13.2f} {measured['p95_ms']:>8.2f} {measured['p99_ms']:>8.2f}   "
+              f"{stats['modeled_sfn_overhead_ms']:>14.2f}   "
+              f"{total['p50_ms']:>10.2f} {total['p95_ms']:>8.2f} {total['p99_ms']:>8.2f}")
+    print(f"Modeled SFN ms is an assumption, not a measurement: StartExecution {args.start_ms} ms + "
+          f"{args.transition_ms} ms per state + {args.invoke_ms} ms per Task invoke")
+
+    if args.output:
+        write_json(args.output, {"config": vars(args), "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import csv
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+X_TEST_PATH = os.path.join(REPO_ROOT, "sagemaker_project", "X_test-V-1.csv")
+
+# Let the benchmarks import the Lambda modules from the repository root, and the model helpers
+# (rf_compiler) from sagemaker_project
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, "sagemaker_project")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms):
+    """p50/p95/p99/mean summary of a list of latencies in milliseconds."""
+    count = len(latencies_ms)
+    return {
+        "count": count,
+        "mean_ms": round(sum(latencies_ms) / count, 4) if count else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 4),
+        "p95_ms": round(percentile(latencies_ms, 95), 4),
+        "p99_ms": round(percentile(latencies_ms, 99), 4)
+    }
+
+
+def load_feature_rows(path=X_TEST_PATH, limit=None):
+    """Reads the held-out feature rows as lists of floats in METRIC_MAP order."""
+    rows = []
+    with open(path, newline="") as f:
+        for record in csv.DictReader(f):
+            rows.append([float(value) for value in record.values()])
+            if limit and len(rows) >= limit:
+                break
+    return rows
+
+
+def write_json(path, payload):
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"Results written to {path}")
@@ -0,0 +1,366 @@
+"""End-to-end load test of the chatbot pipeline against in-memory AWS fakes with injected latency.
+
+Replays a query corpus at a target arrival rate through the real handlers:
+APIToLexHandler -> (Lex) LexToSQSHandler -> SQS -> LambdaSqsStepFunction -> (Step Functions on the
+local ASL executor, or direct routing) -> LambdaSagemakerInvocation / OtherServicesUtilization ->
+DynamoDB, while each client long-polls fetch_response for its request ID.
+
+Reports p50/p95/p99 per stage and end to end, throughput, and AWS API calls per request.
+--duplicates makes that fraction of users send their question twice (a client retry), and
+--redelivery makes SQS deliver that fraction of messages twice; the report counts how many
+duplicates the idempotency claims suppressed. --burst N makes every arrival N users (in different
+sessions) asking the same question at once; single-flight coalescing should keep backend calls
+close to one per distinct question.
+
+    python benchmarks/pipeline_load_test.py --requests 200 --rate 20 --routing stepfunctions
+    python benchmarks/pipeline_load_test.py --corpus queries.txt --latency ce=150 --latency-scale 0.5 --output run.json
+    python benchmarks/pipeline_load_test.py --requests 200 --rate 30 --duplicates 0.1 --redelivery 0.05
+    python benchmarks/pipeline_load_test.py --requests 400 --rate 5 --burst 20
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from common import REPO_ROOT, summarize, write_json
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import APIToLexHandler
+import LambdaSagemakerInvocation
+import LambdaSqsStepFunction
+import LexToSQSHandler
+import OtherServicesUtilization
+import fetch_response
+import inference_backends
+from asl_executor import StateMachine, summarize_traces
+from aws_fakes import (CallRecorder, FakeCloudWatch, FakeCostExplorer, FakeDynamoDBClient, FakeDynamoDBResource,
+                       FakeDynamoDBStore, FakeLex, FakeSageMakerRuntime, FakeSQS, FakeStepFunctions)
+from cost_cache import CostCache, DynamoDBCostStore
+from idempotency import DynamoDBClaimStore
+from metric_catalog import DynamoDBCatalogStore, MetricCatalog
+from result_cache import DynamoDBResultStore, ResultCache
+from single_flight import DynamoDBFlightStore, SingleFlight
+
+DEFINITION_PATH = os.path.join(REPO_ROOT, "InvokeCloudUtilizationStepFunction.json")
+REQUEST_ID_PATTERN = re.compile(r"request ID: (\S+) ")
+STAGES = ("api", "queue_wait", "orchestration", "handler", "delivery", "end_to_end")
+BACKEND_OPERATIONS = ("sagemaker.InvokeEndpoint", "cloudwatch.GetMetricData", "ce.GetCostAndUsage")
+
+
+def default_corpus(instances, days=30):
+    """Instance rightsizing questions over a pool of instance IDs plus service usage questions over recent ranges."""
+    today = date.today()
+    queries = [f"Is instance i-{n:017x} the right size?" for n in range(instances)]
+    for service in ("EC2", "Lambda", "S3", "DynamoDB", "SQS"):
+        for span in (7, 14, days):
+            start, end = today - timedelta(days=span + 3), today - timedelta(days=3)
+            queries.append(f"How much did {service} cost from {start} to {end}?")
+    return queries
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class PipelineTimeline:
+    """Per-request timestamps stamped by the wrapped pipeline stages, keyed by request_id."""
+
+    def __init__(self):
+        self.events = {}
+        self.lock = threading.Lock()
+
+    def stamp(self, request_id, name, value=None):
+        with self.lock:
+            self.events.setdefault(request_id, {})[name] = time.perf_counter() if value is None else value
+
+    def stamp_once(self, request_id, name, value):
+        """Keeps the first value, so a redelivered message does not move the request's timestamps."""
+        with self.lock:
+            self.events.setdefault(request_id, {}).setdefault(name, value)
+
+    def get(self, request_id):
+        with self.lock:
+            return dict(self.events.get(request_id, {}))
+
+
+def timed_handler(handler, timeline):
+    def run(event, context):
+        request_id = event.get("request_id")
+        timeline.stamp(request_id, "handler_start")
+        try:
+            return handler(event, context)
+        finally:
+            timeline.stamp(request_id, "handler_end")
+    return run
+
+
+def install_fakes(recorder, routing, timeline, redelivery_rate=0.0, seed=5):
+    """Points every handler module at the fakes and returns (sqs, step_functions)."""
+    store = FakeDynamoDBStore(recorder)
+    ddb_resource, ddb_client = FakeDynamoDBResource(store), FakeDynamoDBClient(store)
+    cloudwatch = FakeCloudWatch(recorder)
+
+    LexToSQSHandler.sqs_client = sqs = FakeSQS(recorder, redelivery_rate, seed)
+    LexToSQSHandler.ddb_client = ddb_client
+    LexToSQSHandler.claim_store = DynamoDBClaimStore(ddb_client)
+    LexToSQSHandler.result_cache = ResultCache(DynamoDBResultStore(ddb_client))
+    APIToLexHandler.lex = FakeLex(recorder, LexToSQSHandler.lambda_handler)
+
+    LambdaSagemakerInvocation.cloudwatch = cloudwatch
+    LambdaSagemakerInvocation.sagemaker_runtime = FakeSageMakerRuntime(recorder)
+    LambdaSagemakerInvocation.ddb_client = ddb_client
+    LambdaSagemakerInvocation.prediction_cache = ResultCache(DynamoDBResultStore(ddb_client))
+    LambdaSagemakerInvocation.single_flight = SingleFlight(DynamoDBFlightStore(ddb_client),
+                                                           LambdaSagemakerInvocation.deliver_to_waiters)
+    inference_backends._backends.clear()
+
+    OtherServicesUtilization.ce_client = FakeCostExplorer(recorder)
+    OtherServicesUtilization.cw_client = cloudwatch
+    OtherServicesUtilization.ddb_client = ddb_client
+    OtherServicesUtilization.result_cache = ResultCache(DynamoDBResultStore(ddb_client))
+    OtherServicesUtilization.single_flight = SingleFlight(DynamoDBFlightStore(ddb_client),
+                                                          OtherServicesUtilization.deliver_to_waiters)
+    OtherServicesUtilization.cost_cache = CostCache(DynamoDBCostStore(ddb_client), OtherServicesUtilization.fetch_daily_costs)
+    OtherServicesUtilization.metric_catalog = MetricCatalog(DynamoDBCatalogStore(ddb_client),
+                                                           OtherServicesUtilization.list_namespace_metrics)
+
+    fetch_response.table = ddb_resource.Table(fetch_response.table_name)
+
+    ec2_handler = timed_handler(LambdaSagemakerInvocation.lambda_handler, timeline)
+    other_handler = timed_handler(OtherServicesUtilization.lambda_handler, timeline)
+    LambdaSqsStepFunction.ROUTING_MODE = routing
+    LambdaSqsStepFunction.ddb_client = ddb_client
+    LambdaSqsStepFunction.claim_store = DynamoDBClaimStore(ddb_client)
+    LambdaSqsStepFunction._handler_cache.update({
+        LambdaSqsStepFunction.EC2_ROUTE[0]: ec2_handler,
+        LambdaSqsStepFunction.OTHER_SERVICES_ROUTE[0]: other_handler
+    })
+
+    with open(DEFINITION_PATH) as f:
+        definition = json.load(f)
+    resources = {}
+    for state in definition["States"].values():
+        if state["Type"] == "Task":
+            resources[state["Resource"]] = ec2_handler if state["Resource"].endswith("LambdaSagemakerInvocation") else other_handler
+    step_functions = FakeStepFunctions(recorder, StateMachine(definition, resources))
+    LambdaSqsStepFunction.sfn_client = step_functions
+    return sqs, step_functions
+
+
+def consume(sqs, timeline, stop):
+    """One SQS-triggered LambdaSqsStepFunction container: receive a batch, invoke the handler, repeat."""
+    while not stop.is_set():
+        batch = sqs.receive_batch(max_messages=10)
+        if not batch:
+            continue
+        dequeued = time.perf_counter()
+        for message in batch:
+            request_id = json.loads(message["body"])["request_id"]
+            timeline.stamp_once(request_id, "enqueued", message["enqueued_at"])
+            timeline.stamp_once(request_id, "dequeued", dequeued)
+        LambdaSqsStepFunction.lambda_handler({"Records": batch}, None)
+
+
+def run_request(query, session_id, timeline, wait_seconds, resend=False):
+    """One chatbot user: send the query through the API, then long-poll for the result.
+
+    With resend the query is sent a second time, as a client retry would, and the user follows
+    the request ID of the second reply.
+    """
+    submitted = time.perf_counter()
+    event = {"body": json.dumps({"message": query, "sessionId": session_id})}
+    response = APIToLexHandler.lambda_handler(event, None)
+    if resend:
+        response = APIToLexHandler.lambda_handler(event, None)
+    api_done = time.perf_counter()
+    messages = json.loads(response["body"]).get("LexResponse", {}).get("messages", [])
+
+    # LexToSQSHandler's fast path answers cached questions directly, marked by a ready CustomPayload
+    for message in messages:
+        if message.get("contentType") == "CustomPayload":
+            payload = json.loads(message["content"])
+            if payload.get("status") == "ready":
+                timeline.stamp(payload["request_id"], "submitted", submitted)
+                timeline.stamp(payload["request_id"], "api_done", api_done)
+                timeline.stamp(payload["request_id"], "ready_seen", api_done)
+                timeline.stamp(payload["request_id"], "fast_path", True)
+                return payload["request_id"]
+
+    content = " ".join(message.get("content", "") for message in messages)
+    match = REQUEST_ID_PATTERN.search(content)
+    if not match:
+        return None
+
+    request_id = match.group(1)
+    timeline.stamp(request_id, "submitted", submitted)
+    timeline.stamp(request_id, "api_done", api_done)
+    deadline = submitted + 120
+    while time.perf_counter() < deadline:
+        event = {"sessionId": session_id, "requestId": request_id, "wait": wait_seconds}
+        body = json.loads(fetch_response.lambda_handler(event, None)["body"])
+        if any(item.get("status") == "ready" for item in body.get("responses", [])):
+            timeline.stamp(request_id, "ready_seen")
+            return request_id
+    return None
+
+
+def stage_latencies(timeline, request_ids):
+    spans = {
+        "api": ("submitted", "api_done"),
+        "queue_wait": ("enqueued", "dequeued"),
+        "orchestration": ("dequeued", "handler_start"),
+        "handler": ("handler_start", "handler_end"),
+        "delivery": ("handler_end", "ready_seen"),
+        "end_to_end": ("submitted", "ready_seen")
+    }
+    latencies = {stage: [] for stage in STAGES}
+    for request_id in request_ids:
+        events = timeline.get(request_id)
+        for stage, (start, end) in spans.items():
+            if start in events and end in events:
+                latencies[stage].append((events[end] - events[start]) * 1000)
+    return {stage: summarize(values) for stage, values in latencies.items()}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_latency_overrides(values):
+    overrides = {}
+    for value in values or []:
+        service, _, ms = value.partition("=")
+        overrides[service] = float(ms)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="arrivals per second (open loop)")
+    parser.add_argument("--routing", choices=["stepfunctions", "direct"], default="stepfunctions")
+    parser.add_argument("--corpus", type=str, help="file with one query per line; default is a generated mix")
+    parser.add_argument("--instances", type=int, default=50, help="instance IDs in the generated corpus")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--consumers", type=int, default=4, help="concurrent LambdaSqsStepFunction containers")
+    parser.add_argument("--clients", type=int, default=128, help="maximum users waiting at once")
+    parser.add_argument("--wait", type=float, default=20.0, help="fetch_response long-poll seconds")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=MS", help="override a service's latency")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="fraction of users that send their question twice")
+    parser.add_argument("--redelivery", type=float, default=0.0, help="fraction of SQS messages delivered twice")
+    parser.add_argument("--burst", type=int, default=1, help="users per arrival, all asking the same question")
+    parser.add_argument("--output", type=str)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else default_corpus(args.instances)
+    rng = random.Random(args.seed)
+    burst = max(1, args.burst)
+    questions = [rng.choice(corpus) for _ in range(0, args.requests, burst)]
+    workload = [(questions[i // burst], f"load-session-{rng.randrange(args.sessions)}", rng.random() < args.duplicates)
+                for i in range(args.requests)]
+
+    recorder = CallRecorder(parse_latency_overrides(args.latency), jitter=args.jitter, seed=args.seed)
+    recorder.latency_ms = {service: ms * args.latency_scale for service, ms in recorder.latency_ms.items()}
+    timeline = PipelineTimeline()
+    sqs, step_functions = install_fakes(recorder, args.routing, timeline, args.redelivery, args.seed)
+
+    stop = threading.Event()
+    consumers = [threading.Thread(target=consume, args=(sqs, timeline, stop), daemon=True) for _ in range(args.consumers)]
+
+    # The handlers log every event; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for consumer in consumers:
+            consumer.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            futures = []
+            for i, (query, session_id, resend) in enumerate(workload):
+                delay = started + (i // burst) / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(run_request, query, session_id, timeline, args.wait, resend))
+            completed = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+        # Let delayed redeliveries arrive and be consumed before the consumers stop
+        if args.redelivery:
+            time.sleep(sqs.redelivery_delay)
+            while not sqs.messages.empty():
+                time.sleep(0.05)
+        stop.set()
+        for consumer in consumers:
+            consumer.join()
+
+    request_ids = [request_id for request_id in completed if request_id]
+    stages = stage_latencies(timeline, request_ids)
+    calls_per_request = {op: round(count / max(1, len(request_ids)), 3) for op, count in sorted(recorder.calls.items())}
+    distinct_questions = len(set(questions))
+    report = {
+        "revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "latency_ms": recorder.latency_ms,
+        "requests": args.requests,
+        "completed": len(request_ids),
+        "failed": args.requests - len(request_ids),
+        "fast_path": sum(1 for request_id in request_ids if timeline.get(request_id).get("fast_path")),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(request_ids) / elapsed, 3),
+        "stages": stages,
+        "aws_calls_per_request": round(recorder.total_calls() / max(1, len(request_ids)), 3),
+        "aws_calls_per_request_by_operation": calls_per_request,
+        "step_function_states": summarize_traces(step_functions.traces) if step_functions.traces else {},
+        "duplicates": {
+            "sent": sum(1 for _, _, resend in workload if resend),
+            "suppressed_at_intake": LexToSQSHandler.claim_store.metrics["duplicates"],
+            "redelivered": sqs.redelivered,
+            "suppressed_at_dispatch": LambdaSqsStepFunction.claim_store.metrics["duplicates"]
+        },
+        "single_flight": {
+            "LambdaSagemakerInvocation": LambdaSagemakerInvocation.single_flight.metrics,
+            "OtherServicesUtilization": OtherServicesUtilization.single_flight.metrics
+        },
+        "distinct_questions": distinct_questions,
+        "backend_calls_per_distinct_question": {
+            op: round(recorder.calls.get(op, 0) / distinct_questions, 3) for op in BACKEND_OPERATIONS
+        }
+    }
+
+    print(f"{report['completed']}/{args.requests} requests completed in {elapsed:.2f} s "
+          f"({report['throughput_rps']:.2f} req/s, target {args.rate:g}), routing={args.routing}")
+    print(f"{'stage':<14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for stage in STAGES:
+        entry = stages[stage]
+        print(f"{stage:<14} {entry['p50_ms']:>9.1f} {entry['p95_ms']:>9.1f} {entry['p99_ms']:>9.1f} {entry['mean_ms']:>9.1f}")
+    print(f"Answered on the fast path: {report['fast_path']}")
+    duplicates = report["duplicates"]
+    print(f"Duplicate sends: {duplicates['sent']} ({duplicates['suppressed_at_intake']} suppressed at intake); "
+          f"SQS redeliveries: {duplicates['redelivered']} ({duplicates['suppressed_at_dispatch']} suppressed at dispatch)")
+    for module, metrics in report["single_flight"].items():
+        print(f"Single flight {module}: {metrics['leader']} led, {metrics['follower']} followed, "
+              f"{metrics['solo']} alone, {metrics['takeovers']} takeovers")
+    backend = ", ".join(f"{op} {value:.2f}" for op, value in report["backend_calls_per_distinct_question"].items())
+    print(f"Backend calls per distinct question ({distinct_questions}): {backend}")
+    print(f"AWS calls per request: {report['aws_calls_per_request']:.2f}")
+    for op, count in calls_per_request.items():
+        print(f"  {op:<32} {count:>8.3f}")
+
+    if args.output:
+        write_json(args.output, report)
+
+
+if __name__ == "__main__":
+    main()
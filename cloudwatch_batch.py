@@ -0,0 +1,35 @@
+# GetMetricData accepts at most 500 queries per request
+MAX_QUERIES_PER_REQUEST = 500
+
+
+def get_metric_data_batched(cw_client, metric_stats, start_time, end_time, scan_by="TimestampDescending"):
+    """Runs one query per MetricStat with as few GetMetricData calls as possible.
+
+    Queries are packed MAX_QUERIES_PER_REQUEST per call and NextToken pages are followed.
+    Returns the Values of every query as lists aligned with metric_stats, ordered as scan_by.
+    """
+    values = [[] for _ in metric_stats]
+
+    for offset in range(0, len(metric_stats), MAX_QUERIES_PER_REQUEST):
+        chunk = metric_stats[offset:offset + MAX_QUERIES_PER_REQUEST]
+        # Ids must start with a lowercase letter; the suffix maps results back to their position
+        kwargs = {
+            "MetricDataQueries": [
+                {"Id": f"q{i}", "MetricStat": stat, "ReturnData": True} for i, stat in enumerate(chunk)
+            ],
+            "StartTime": start_time,
+            "EndTime": end_time,
+            "ScanBy": scan_by
+        }
+
+        while True:
+            response = cw_client.get_metric_data(**kwargs)
+            for result in response.get("MetricDataResults", []):
+                values[offset + int(result["Id"][1:])].extend(result.get("Values", []))
+
+            next_token = response.get("NextToken")
+            if not next_token:
+                break
+            kwargs["NextToken"] = next_token
+
+    return values
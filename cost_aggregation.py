@@ -0,0 +1,103 @@
+import numpy as np
+
+from cost_cache import days_in_range
+
+
+class CostAggregate:
+    """Daily cost of every service over a date range, held as a (services x days) matrix."""
+
+    def __init__(self, days, services, amounts):
+        self.days = days
+        self.services = services
+        self.amounts = amounts
+        self._service_index = {service: i for i, service in enumerate(services)}
+
+    def series(self, service):
+        """Per-day costs of one service, zeros for services that had no spend."""
+        index = self._service_index.get(service)
+        if index is None:
+            return np.zeros(len(self.days))
+        return self.amounts[index]
+
+    def total(self, service):
+        return float(self.series(service).sum())
+
+    def totals(self):
+        """Total cost per service over the whole range."""
+        return dict(zip(self.services, self.amounts.sum(axis=1).tolist()))
+
+    def summary(self, service):
+        series = self.series(service)
+        return {
+            "service": service,
+            "total": float(series.sum()),
+            "days": list(self.days),
+            "daily": series.tolist()
+        }
+
+    def daily_costs(self):
+        """{day: {service: amount}} view, omitting services with no entry that day."""
+        return {
+            day: {service: float(self.amounts[i, j]) for i, service in enumerate(self.services) if self.amounts[i, j]}
+            for j, day in enumerate(self.days)
+        }
+
+    @classmethod
+    def from_daily_costs(cls, days, daily_costs):
+        rows, cols, values = [], [], []
+        services = {}
+        for j, day in enumerate(days):
+            for service, amount in daily_costs.get(day, {}).items():
+                rows.append(services.setdefault(service, len(services)))
+                cols.append(j)
+                values.append(amount)
+        return cls._fold(days, list(services), rows, cols, values)
+
+    @staticmethod
+    def _fold(days, services, rows, cols, values):
+        amounts = np.zeros((len(services), len(days)))
+        # add.at accumulates repeated (service, day) pairs, e.g. a day split across result pages
+        np.add.at(amounts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), np.asarray(values, dtype=float))
+        return CostAggregate(list(days), services, amounts)
+
+
+def fetch_cost_pages(ce_client, start_date, end_date, metric="UnblendedCost"):
+    """Yields every get_cost_and_usage page for the range, grouped by SERVICE."""
+    kwargs = {
+        "TimePeriod": {"Start": start_date, "End": end_date},
+        "Granularity": "DAILY",
+        "Metrics": [metric],
+        "GroupBy": [{"Type": "DIMENSION", "Key": "SERVICE"}]
+    }
+    while True:
+        response = ce_client.get_cost_and_usage(**kwargs)
+        yield response
+        next_token = response.get("NextPageToken")
+        if not next_token:
+            break
+        kwargs["NextPageToken"] = next_token
+
+
+def aggregate_cost_pages(pages, start_date, end_date, metric="UnblendedCost"):
+    """Folds all ResultsByTime of all pages into one CostAggregate in a single pass."""
+    days = days_in_range(start_date, end_date)
+    day_index = {day: j for j, day in enumerate(days)}
+
+    services = {}
+    rows, cols, values = [], [], []
+    for page in pages:
+        for result in page.get("ResultsByTime", []):
+            j = day_index.get(result["TimePeriod"]["Start"])
+            if j is None:
+                continue
+            for group in result.get("Groups", []):
+                rows.append(services.setdefault(group["Keys"][0], len(services)))
+                cols.append(j)
+                values.append(float(group["Metrics"][metric]["Amount"]))
+
+    return CostAggregate._fold(days, list(services), rows, cols, values)
+
+
+def fetch_cost_aggregate(ce_client, start_date, end_date, metric="UnblendedCost"):
+    """One paginated Cost Explorer query that covers every service in the range."""
+    return aggregate_cost_pages(fetch_cost_pages(ce_client, start_date, end_date, metric), start_date, end_date, metric)
@@ -0,0 +1,136 @@
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from aws_clients import DDB_BATCH_GET_SIZE, batch_backoff, batch_put
+
+# DynamoDB table holding one item per day: {"day": "YYYY-MM-DD", "costs": {service: amount}, ...}
+CACHE_TABLE_NAME = "CloudCostDailyCache"
+
+# Cost Explorer keeps revising the most recent days; anything older than this is treated as closed
+FINALITY_LAG_DAYS = 2
+
+# How long a not-yet-final day (today's partial day included) may be served from the cache
+PARTIAL_TTL_SECONDS = 900
+
+
+def parse_day(value):
+    return value if isinstance(value, date) else datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def days_in_range(start_date, end_date):
+    """Days covered by a Cost Explorer TimePeriod (End is exclusive)."""
+    start, end = parse_day(start_date), parse_day(end_date)
+    return [str(start + timedelta(days=offset)) for offset in range((end - start).days)]
+
+
+class LocalCostStore:
+    """Per-day entries kept in memory; nothing is shared between containers."""
+
+    def __init__(self):
+        self.items = {}
+
+    def get_days(self, days):
+        return {day: self.items[day] for day in days if day in self.items}
+
+    def put_days(self, entries):
+        self.items.update(entries)
+
+
+class DynamoDBCostStore:
+    """Per-day cost entries persisted in DynamoDB so every container shares them."""
+
+    def __init__(self, client, table_name=CACHE_TABLE_NAME):
+        self.client = client
+        self.table_name = table_name
+
+    def get_days(self, days):
+        # boto3 is imported on first use, like the clients in aws_clients
+        from boto3.dynamodb.types import TypeDeserializer
+
+        deserializer = TypeDeserializer()
+        entries = {}
+        for start in range(0, len(days), DDB_BATCH_GET_SIZE):
+            request = {self.table_name: {"Keys": [{"day": {"S": day}} for day in days[start:start + DDB_BATCH_GET_SIZE]]}}
+            attempt = 0
+            while request:
+                response = self.client.batch_get_item(RequestItems=request)
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    entry = {key: deserializer.deserialize(value) for key, value in item.items()}
+                    entries[entry["day"]] = {
+                        "costs": {service: float(amount) for service, amount in entry.get("costs", {}).items()},
+                        "final": bool(entry.get("final")),
+                        "fetched_at": float(entry.get("fetched_at", 0))
+                    }
+                request = response.get("UnprocessedKeys") or None
+                if request:
+                    attempt += 1
+                    batch_backoff(attempt)
+        return entries
+
+    def put_days(self, entries):
+        from boto3.dynamodb.types import TypeSerializer
+
+        serializer = TypeSerializer()
+        items = []
+        for day, entry in entries.items():
+            item = {
+                "day": day,
+                "costs": {service: Decimal(str(amount)) for service, amount in entry["costs"].items()},
+                "final": entry["final"],
+                "fetched_at": Decimal(str(round(entry["fetched_at"], 3)))
+            }
+            if not entry["final"]:
+                # DynamoDB TTL removes partial days once they are stale
+                item["expires_at"] = int(entry["fetched_at"] + PARTIAL_TTL_SECONDS)
+            items.append({key: serializer.serialize(value) for key, value in item.items()})
+        batch_put(self.client, self.table_name, items)
+
+
+class CostCache:
+    """Serves daily per-service costs from the store and asks Cost Explorer only for missing or stale days.
+
+    fetch_costs(start, end) must return {day: {service: amount}} for the half-open range [start, end).
+    """
+
+    def __init__(self, store, fetch_costs):
+        self.store = store
+        self.fetch_costs = fetch_costs
+        self.metrics = {"days_requested": 0, "days_hit": 0, "ce_calls": 0, "ce_calls_avoided": 0}
+
+    def _is_fresh(self, entry, now):
+        return entry["final"] or now - entry["fetched_at"] < PARTIAL_TTL_SECONDS
+
+    def get_daily_costs(self, start_date, end_date):
+        """Returns {day: {service: amount}} for every day in [start_date, end_date)."""
+        days = days_in_range(start_date, end_date)
+        now = time.time()
+
+        cached = {day: entry for day, entry in self.store.get_days(days).items() if self._is_fresh(entry, now)}
+        missing = [day for day in days if day not in cached]
+
+        self.metrics["days_requested"] += len(days)
+        self.metrics["days_hit"] += len(cached)
+
+        if days and not missing:
+            # The uncached path would have made one Cost Explorer call for this range
+            self.metrics["ce_calls_avoided"] += 1
+
+        if missing:
+            # One call spanning every missing day, however scattered: each call is billed, its length is not
+            span_end = str(parse_day(missing[-1]) + timedelta(days=1))
+            fetched = self.fetch_costs(missing[0], span_end)
+            self.metrics["ce_calls"] += 1
+
+            last_final_day = str(datetime.utcnow().date() - timedelta(days=FINALITY_LAG_DAYS))
+            entries = {}
+            for day in missing:
+                entries[day] = {"costs": fetched.get(day, {}), "final": day <= last_final_day, "fetched_at": now}
+            self.store.put_days(entries)
+            cached.update(entries)
+
+        return {day: cached[day]["costs"] for day in days}
+
+    def hit_rate(self):
+        requested = self.metrics["days_requested"]
+        return self.metrics["days_hit"] / requested if requested else 0.0
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from cloudwatch_batch import MAX_QUERIES_PER_REQUEST, get_metric_data_batched
+
+# CloudWatch metrics to fetch, in the feature order the model was trained on
+METRIC_MAP = {
+    "CPUUtilization": {"Namespace": "AWS/EC2", "Metric": "CPUUtilization", "Stat": "Average"},
+    "DiskReadOps": {"Namespace": "AWS/EC2", "Metric": "DiskReadOps", "Stat": "Sum"},
+    "DiskWriteOps": {"Namespace": "AWS/EC2", "Metric": "DiskWriteOps", "Stat": "Sum"},
+    "NetworkIn": {"Namespace": "AWS/EC2", "Metric": "NetworkIn", "Stat": "Sum"},
+    "NetworkOut": {"Namespace": "AWS/EC2", "Metric": "NetworkOut", "Stat": "Sum"}
+}
+
+METRIC_KEYS = list(METRIC_MAP)
+
+
+def build_metric_stats(instance_ids, period=300):
+    """Builds one MetricStat per (instance, metric) along with the (instance, metric key) it answers."""
+    stats = []
+    targets = []
+
+    for instance_id in instance_ids:
+        for key, metric in METRIC_MAP.items():
+            stats.append({
+                "Metric": {
+                    "Namespace": metric["Namespace"],
+                    "MetricName": metric["Metric"],
+                    "Dimensions": [{"Name": "InstanceId", "Value": instance_id}]
+                },
+                "Period": period,
+                "Stat": metric["Stat"],
+                "Unit": "Percent" if key == "CPUUtilization" else "Count"
+            })
+            targets.append((instance_id, key))
+
+    return stats, targets
+
+
+def fetch_instance_metrics(cloudwatch, instance_ids, end_time=None, window_minutes=5, period=300):
+    """Fetches the latest METRIC_MAP values for many instances with as few GetMetricData calls as possible.
+
+    Returns {instance_id: {metric_key: value}} with keys in METRIC_MAP order and 0 for missing data.
+    """
+    instance_ids = list(dict.fromkeys(instance_ids))
+    end_time = end_time or datetime.utcnow()
+    start_time = end_time - timedelta(minutes=window_minutes)
+
+    results = {instance_id: dict.fromkeys(METRIC_KEYS, 0) for instance_id in instance_ids}
+
+    stats, targets = build_metric_stats(instance_ids, period=period)
+    values = get_metric_data_batched(cloudwatch, stats, start_time, end_time, scan_by="TimestampDescending")
+    for (instance_id, key), series in zip(targets, values):
+        # Newest datapoint comes first
+        if series:
+            results[instance_id][key] = series[0]
+
+    return results
+
+
+def to_feature_vector(metrics):
+    """Returns the metric values as a model feature row in METRIC_MAP order."""
+    return [metrics.get(key, 0) for key in METRIC_KEYS]
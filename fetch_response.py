@@ -1,12 +1,140 @@
 import json
-import boto3
-from boto3.dynamodb.conditions import Key
+import math
+import time
+import base64
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+from aws_clients import lazy_table
+from tracing import phase, traced_handler
+
+# Initialize DynamoDB table (built on first use)
 table_name = 'CloudCostUtilizationResponse'  # Replace with your table name
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
+
+# Sort key. Rows are written when a request completes, not in request_id order, so there is no
+# "newer than" cursor: clients long-poll each request by its own requestId and page with nextToken
+REQUEST_ID_ATTRIBUTE = 'request_id'
+
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'  # For cross-origin access from your frontend
+}
+
+# Long-poll: the longest a request may wait server-side (API Gateway times out at 29 s)
+MAX_WAIT_SECONDS = 20
+# Read backoff while waiting: first retry after 100 ms, growing 1.5x up to 1 s
+INITIAL_BACKOFF_SECONDS = 0.1
+MAX_BACKOFF_SECONDS = 1.0
+BACKOFF_MULTIPLIER = 1.5
+
+def encode_token(last_evaluated_key):
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_token(token):
+    """The ExclusiveStartKey in a nextToken; raises ValueError if the token is not one of ours."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(str(token).encode()).decode())
+    except ValueError:
+        raise ValueError('Invalid nextToken')
+    if not isinstance(key, dict) or not key:
+        raise ValueError('Invalid nextToken')
+    return key
+
+def parse_wait(wait):
+    """Seconds to long-poll from the `wait` parameter; raises ValueError unless it is a non-negative number."""
+    try:
+        wait_seconds = float(wait or 0)
+    except (TypeError, ValueError):
+        raise ValueError('wait must be a number of seconds')
+    if not math.isfinite(wait_seconds) or wait_seconds < 0:
+        raise ValueError('wait must be a number of seconds')
+    return wait_seconds
+
+def parse_limit(limit):
+    try:
+        limit = int(limit) if limit else None
+    except (TypeError, ValueError):
+        raise ValueError('limit must be a positive integer')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return limit
+
+def parse_fields(fields):
+    # Accepts ["status", "response"] or "status,response"
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',')]
+    fields = [field for field in (fields or []) if field]
+    if fields and REQUEST_ID_ATTRIBUTE not in fields:
+        fields.append(REQUEST_ID_ATTRIBUTE)
+    return fields
+
+def build_query(session_id, fields=None, limit=None, next_token=None):
+    # boto3 is imported on first use, like the clients in aws_clients
+    from boto3.dynamodb.conditions import Key
+
+    query = {'KeyConditionExpression': Key('session_id').eq(session_id)}
+    if fields:
+        # Placeholders because attributes like "status" are DynamoDB reserved words
+        names = {f"#f{i}": field for i, field in enumerate(fields)}
+        query['ProjectionExpression'] = ", ".join(names)
+        query['ExpressionAttributeNames'] = names
+    if limit:
+        query['Limit'] = int(limit)
+    if next_token:
+        query['ExclusiveStartKey'] = decode_token(next_token)
+    return query
+
+def query_responses(session_id, fields=None, limit=None, next_token=None):
+    """Returns (items, next_token). Without a limit every page is read; with one, a single page."""
+    query = build_query(session_id, fields, limit, next_token)
+    items = []
+    while True:
+        response = table.query(**query)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items, None
+        if limit:
+            return items, encode_token(last_key)
+        query['ExclusiveStartKey'] = last_key
+
+def get_response(session_id, request_id, fields=None):
+    """Reads a single request's row, or None if it has not been written yet."""
+    kwargs = {'Key': {'session_id': session_id, REQUEST_ID_ATTRIBUTE: request_id}}
+    if fields:
+        names = {f"#f{i}": field for i, field in enumerate(fields)}
+        kwargs['ProjectionExpression'] = ", ".join(names)
+        kwargs['ExpressionAttributeNames'] = names
+    return table.get_item(**kwargs).get('Item')
 
+def is_ready(items):
+    return any(item.get('status') == 'ready' for item in items)
+
+def wait_for_responses(session_id, request_id=None, fields=None, wait_seconds=0, context=None):
+    """Long-poll: re-reads with backoff until a result is ready or the deadline passes.
+
+    With request_id only that row is read (a single GetItem); otherwise the whole session.
+    """
+    deadline = time.monotonic() + min(float(wait_seconds), MAX_WAIT_SECONDS)
+    if context is not None:
+        # Leave time to respond before the Lambda itself times out
+        deadline = min(deadline, time.monotonic() + context.get_remaining_time_in_millis() / 1000.0 - 1.0)
+
+    backoff = INITIAL_BACKOFF_SECONDS
+    while True:
+        if request_id:
+            item = get_response(session_id, request_id, fields)
+            items, next_token = ([item] if item else []), None
+        else:
+            items, next_token = query_responses(session_id, fields)
+
+        remaining = deadline - time.monotonic()
+        if is_ready(items) or remaining <= 0:
+            return items, next_token
+
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * BACKOFF_MULTIPLIER, MAX_BACKOFF_SECONDS)
+
+@traced_handler('fetch_response')
 def lambda_handler(event, context):
     # Get sessionId from query parameters or body
     #session_id = event.get('queryStringParameters', {}).get('sessionId')
@@ -18,24 +146,44 @@ def lambda_handler(event, context):
             'statusCode': 400,
             'body': json.dumps({'error': 'Missing sessionId parameter'})
         }
-    
+
+    # Optional: a subset of attributes, a page size and the previous page's token
+    fields = parse_fields(event.get('fields'))
+    next_token = event.get('nextToken')
+
+    # Optional long-poll: hold the request up to `wait` seconds until a result is ready
+    request_id = event.get('requestId')
+
+    # Malformed parameters are the caller's error, not a server error
+    try:
+        limit = parse_limit(event.get('limit'))
+        wait_seconds = parse_wait(event.get('wait'))
+        if next_token:
+            decode_token(next_token)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': str(e)}),
+            'headers': RESPONSE_HEADERS
+        }
+
     try:
-        # Query DynamoDB using sessionId
-        response = table.query(
-            KeyConditionExpression=Key('session_id').eq(session_id)
-        )
-        items = response.get('Items', [])
-        
+        if wait_seconds > 0 or request_id:
+            with phase('wait'):
+                items, next_token = wait_for_responses(session_id, request_id, fields, wait_seconds, context)
+        else:
+            # Query DynamoDB using sessionId
+            with phase('query'):
+                items, next_token = query_responses(session_id, fields, limit, next_token)
+
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'session_id': session_id,
-                'responses': items
+                'responses': items,
+                'nextToken': next_token
             }),
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'  # For cross-origin access from your frontend
-            }
+            'headers': RESPONSE_HEADERS
         }
 
     except Exception as e:
@@ -44,4 +192,3 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': 'Server error'})
         }
-
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+from aws_clients import is_conditional_failure
+
+# DynamoDB table holding one claim per key: {"idempotency_key": ..., "owner": ..., "status": ..., "expires_at": ...}
+# (enable TTL on expires_at)
+IDEMPOTENCY_TABLE_NAME = "CloudCostIdempotency"
+
+# The same question from the same session inside this window is one request (Lex / API Gateway retries, double clicks)
+IDEMPOTENCY_WINDOW_SECONDS = int(os.environ.get("IDEMPOTENCY_WINDOW_SECONDS", "60"))
+
+# How long a consumer may work on a message before another delivery of it may take over
+PROCESSING_LEASE_SECONDS = 900
+
+# How long a processed request_id is remembered, to drop late redeliveries
+COMPLETED_TTL_SECONDS = 24 * 3600
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def intake_key(session_id, transcript, timestamp=None, window=IDEMPOTENCY_WINDOW_SECONDS):
+    """Key shared by every repeat of a question within one time bucket of a session."""
+    bucket = int((time.time() if timestamp is None else timestamp) // window)
+    normalized = _WHITESPACE.sub(" ", str(transcript)).strip().lower()
+    digest = hashlib.sha256(f"{session_id}\n{normalized}\n{bucket}".encode()).hexdigest()
+    return f"intake#{digest}"
+
+
+def message_key(request_id):
+    return f"request#{request_id}"
+
+
+class LocalClaimStore:
+    """Claims in a dict behind one lock, with the same rules as DynamoDBClaimStore; one process only."""
+
+    def __init__(self):
+        self.items = {}
+        self.metrics = {"claimed": 0, "duplicates": 0}
+        self._lock = threading.Lock()
+
+    def claim(self, key, owner, expires_at):
+        """Returns (claimed, current owner, current status); see DynamoDBClaimStore.claim."""
+        with self._lock:
+            item = self.items.get(key)
+            if item is not None and item["expires_at"] > time.time() and not (
+                    item["owner"] == owner and item["status"] == "in_progress"):
+                self.metrics["duplicates"] += 1
+                return False, item["owner"], item["status"]
+            self.items[key] = {"owner": owner, "status": "in_progress", "expires_at": expires_at}
+            self.metrics["claimed"] += 1
+            return True, owner, "in_progress"
+
+    def complete(self, key, owner, expires_at):
+        with self._lock:
+            self.items[key] = {"owner": owner, "status": "done", "expires_at": expires_at}
+
+    def release(self, key):
+        with self._lock:
+            self.items.pop(key, None)
+
+
+class DynamoDBClaimStore:
+    """Claims made with a conditional put, so exactly one caller wins a key across all containers."""
+
+    def __init__(self, client, table_name=IDEMPOTENCY_TABLE_NAME):
+        self.client = client
+        self.table_name = table_name
+        self.metrics = {"claimed": 0, "duplicates": 0}
+
+    def claim(self, key, owner, expires_at):
+        """Returns (claimed, current owner, current status).
+
+        The key is claimed if it is free, expired, or still in progress under this same owner (a redelivery
+        of a message whose processing died). Otherwise the current owner and its status ("in_progress" or
+        "done") are returned.
+        """
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "idempotency_key": {"S": key},
+                    "owner": {"S": owner},
+                    "status": {"S": "in_progress"},
+                    "expires_at": {"N": str(int(expires_at))}
+                },
+                # TTL deletion lags, so an expired claim counts as free
+                ConditionExpression="attribute_not_exists(idempotency_key) OR expires_at < :now"
+                                    " OR #owner = :owner AND #status = :in_progress",
+                ExpressionAttributeNames={"#owner": "owner", "#status": "status"},
+                ExpressionAttributeValues={
+                    ":now": {"N": str(int(time.time()))},
+                    ":owner": {"S": owner},
+                    ":in_progress": {"S": "in_progress"}
+                },
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+            self.metrics["duplicates"] += 1
+            item = e.response.get("Item") or self.client.get_item(
+                TableName=self.table_name, Key={"idempotency_key": {"S": key}}
+            ).get("Item", {})
+            return False, item.get("owner", {}).get("S"), item.get("status", {}).get("S")
+        self.metrics["claimed"] += 1
+        return True, owner, "in_progress"
+
+    def complete(self, key, owner, expires_at):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "idempotency_key": {"S": key},
+                "owner": {"S": owner},
+                "status": {"S": "done"},
+                "expires_at": {"N": str(int(expires_at))}
+            }
+        )
+
+    def release(self, key):
+        self.client.delete_item(TableName=self.table_name, Key={"idempotency_key": {"S": key}})
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+
+# Artifact written by sagemaker_project/script.py: the scaler + forest pipeline and its feature schema
+MODEL_FILE = "model.joblib"
+
+try:
+    # sagemaker_project/rf_compiler.py, when packaged with the function
+    from rf_compiler import COMPILED_MAX_BATCH_ROWS, CompiledForest, compile_forest
+except ImportError:
+    compile_forest = None
+
+
+def parse_predictions(result):
+    """Normalizes an endpoint response into one predicted type per input row."""
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict):
+        prediction = result.get("predicted_instance_type") or result.get("prediction") or list(result.values())[0]
+        return prediction if isinstance(prediction, list) else [prediction]
+    return [str(result)]
+
+
+class SageMakerEndpointBackend:
+    """Scores rows on the deployed RF-custom-model endpoint."""
+
+    name = "sagemaker"
+
+    def __init__(self, client, endpoint_name):
+        self.client = client
+        self.endpoint_name = endpoint_name
+
+    def predict(self, rows):
+        response = self.client.invoke_endpoint(
+            EndpointName=self.endpoint_name,
+            ContentType="application/json",
+            Body=json.dumps(rows)
+        )
+        result = json.loads(response["Body"].read().decode())
+        return parse_predictions(result)
+
+
+class LocalModelBackend:
+    """Scores rows in-process with the model pipeline loaded once per container."""
+
+    name = "local"
+
+    def __init__(self, model_dir):
+        # Imported here so the endpoint backend does not need scikit-learn in the package
+        import joblib
+        import numpy as np
+
+        self._np = np
+        self.model_dir = model_dir
+        artifact = joblib.load(os.path.join(model_dir, MODEL_FILE))
+        self.pipeline = artifact["pipeline"]
+        self.feature_schema = artifact["feature_schema"]
+        self.forest = None
+        if compile_forest is not None:
+            # A compiled forest exported by script.py loads without compiling
+            arrays = artifact.get("forest")
+            try:
+                self.forest = CompiledForest.from_arrays(arrays) if arrays else compile_forest(self.pipeline)
+            except (ValueError, AttributeError) as e:
+                # Not a scaler + forest pipeline the compiler supports; serve with pipeline.predict
+                print(f"Forest not compiled, using pipeline.predict: {str(e)}")
+
+    def predict(self, rows):
+        # Same steps as predict_fn in script.py so both backends agree; rows come in METRIC_MAP order
+        features = self._np.asarray(rows, dtype=float)
+        if features.ndim != 2 or features.shape[1] != self.feature_schema["n_features"]:
+            raise ValueError(f"Expected rows of features {self.feature_schema['features']}, got shape {features.shape}")
+        if self.forest is not None and len(features) <= COMPILED_MAX_BATCH_ROWS:
+            return self.forest.predict(features).tolist()
+        return self.pipeline.predict(features).tolist()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name, sagemaker_client=None, endpoint_name=None, model_dir=None):
+    """Returns the named backend, building it on first use and reusing it across warm invocations."""
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name == "local":
+                backend = LocalModelBackend(model_dir)
+            elif name == "sagemaker":
+                backend = SageMakerEndpointBackend(sagemaker_client, endpoint_name)
+            else:
+                raise ValueError(f"Unknown inference backend: {name}")
+            _backends[name] = backend
+        return backend
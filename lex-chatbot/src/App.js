@@ -33,15 +33,38 @@ function App() {
         sessionId: sessionId // sessionId used to track conversation
       });
 
+      // A CustomPayload carries this message's request_id: "ready" when the answer came back directly
+      // (no polling needed), "queued" when it must be polled for
+      const lexBody = typeof lexResponse.data.body === 'string'
+        ? JSON.parse(lexResponse.data.body)
+        : (lexResponse.data.body || lexResponse.data);
+      const lexMessages = lexBody?.LexResponse?.messages || [];
+      const payload = lexMessages
+        .filter((message) => message.contentType === 'CustomPayload')
+        .map((message) => JSON.parse(message.content))
+        .find((content) => content.request_id);
+      const answer = lexMessages.find((message) => message.contentType === 'PlainText');
+      if (!payload || payload.status === 'ready') {
+        // Answered directly, or Lex replied without queueing anything (e.g. no intent recognized)
+        setIsWaiting(false);
+        appendMessage(payload ? `Processed: ${answer?.content}` : (answer?.content || "Sorry, I didn't get that."), "bot");
+        return;
+      }
+      const requestId = payload.request_id;
+
       // Assuming Lex response is immediately returned with confirmation (or no response, since it goes to SQS)
       appendMessage("Your message is being processed, please wait...", "bot");
 
       // Step 2: Polling for DynamoDB response (via DynamoDB API Gateway)
+      // Each message waits on its own row, so answers that complete out of order are never skipped
       
       const pollForResponse = async () => {
         try {
           const response = await axios.post(dynamoApiUrl, {
-            sessionId: sessionId
+            sessionId: sessionId,
+            requestId: requestId,
+            fields: ["status", "response"],
+            wait: 20 // long-poll: the server holds the request until this request's result is ready
           });
           // Parse the response body (it's a stringified JSON)
           const parsedBody = typeof response.data.body === 'string'
@@ -53,7 +76,7 @@ function App() {
             setIsWaiting(false);
             appendMessage(`Processed: ${responseItem.response}`, "bot"); // ✅ This is now a string
           } else {
-            setTimeout(pollForResponse, 30); // keep polling
+            pollForResponse(); // server-side wait elapsed without a result; ask again
           }
         } catch (error) {
           console.error("Error checking DynamoDB response:", error);
@@ -62,8 +85,8 @@ function App() {
         }
       };
 
-      // Start polling right after sending the message to Lex
-      setTimeout(pollForResponse, 3000);
+      // Start long-polling right after sending the message to Lex
+      pollForResponse();
 
     } catch (error) {
       appendMessage(error,"bot");
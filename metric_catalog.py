@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+import zlib
+
+# DynamoDB table holding one item per namespace: {"namespace": ..., "metrics": <zlib JSON>, "refreshed_at": ...}
+CATALOG_TABLE_NAME = "CloudWatchMetricCatalog"
+
+# After this long an entry is still served, but refreshed in the background
+CATALOG_TTL_SECONDS = 6 * 3600
+
+# Entries older than this are too stale to serve and are refreshed before returning
+CATALOG_MAX_STALE_SECONDS = 7 * 24 * 3600
+
+# DynamoDB items are capped at 400 KB
+DDB_MAX_ITEM_BYTES = 400 * 1024
+
+
+class FileCatalogStore:
+    """JSON file backend for tests and local runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def load(self, namespace):
+        with self._lock:
+            return self._read().get(namespace)
+
+    def save(self, namespace, entry):
+        with self._lock:
+            entries = self._read()
+            entries[namespace] = entry
+            with open(self.path, "w") as f:
+                json.dump(entries, f)
+
+
+class DynamoDBCatalogStore:
+    """Catalog entries persisted in DynamoDB so new containers start with a warm catalog."""
+
+    def __init__(self, client, table_name=CATALOG_TABLE_NAME):
+        self.client = client
+        self.table_name = table_name
+
+    def load(self, namespace):
+        item = self.client.get_item(TableName=self.table_name, Key={"namespace": {"S": namespace}}).get("Item")
+        if not item:
+            return None
+        return {
+            "metrics": json.loads(zlib.decompress(item["metrics"]["B"]).decode()),
+            "refreshed_at": float(item["refreshed_at"]["N"])
+        }
+
+    def save(self, namespace, entry):
+        payload = zlib.compress(json.dumps(entry["metrics"], separators=(",", ":")).encode())
+        if len(payload) > DDB_MAX_ITEM_BYTES - 1024:
+            print(f"Metric catalog for {namespace} is too large to persist ({len(payload)} bytes)")
+            return
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "namespace": {"S": namespace},
+                "metrics": {"B": payload},
+                "refreshed_at": {"N": str(entry["refreshed_at"])}
+            }
+        )
+
+
+class MetricCatalog:
+    """Namespace -> metric names and dimension sets, kept in memory across warm invocations.
+
+    list_metrics(namespace) must return every metric of the namespace (already paginated).
+    Fresh entries are a dictionary lookup; entries past the TTL are served while a background
+    thread revalidates them; missing or very stale entries are refreshed synchronously. A failing
+    store is only logged: reads fall back to a live list_metrics call and writes keep the entry in memory.
+    """
+
+    def __init__(self, store, list_metrics, ttl_seconds=CATALOG_TTL_SECONDS, max_stale_seconds=CATALOG_MAX_STALE_SECONDS):
+        self.store = store
+        self.list_metrics = list_metrics
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_metrics(self, namespace):
+        entry = self._entries.get(namespace)
+        if entry is None:
+            try:
+                entry = self.store.load(namespace)
+            except Exception as e:
+                print(f"Metric catalog read failed for {namespace}: {str(e)}")
+            if entry is not None:
+                self._entries[namespace] = entry
+
+        age = time.time() - entry["refreshed_at"] if entry else None
+        if entry is None or age > self.max_stale_seconds:
+            entry = self.refresh(namespace)
+        elif age > self.ttl_seconds:
+            self._revalidate_in_background(namespace)
+
+        return entry["metrics"]
+
+    def refresh(self, namespace):
+        metrics = [
+            {"MetricName": metric["MetricName"], "Dimensions": metric.get("Dimensions", [])}
+            for metric in self.list_metrics(namespace)
+        ]
+        entry = {"metrics": metrics, "refreshed_at": time.time()}
+        self._entries[namespace] = entry
+        try:
+            self.store.save(namespace, entry)
+        except Exception as e:
+            print(f"Metric catalog write failed for {namespace}: {str(e)}")
+        return entry
+
+    def _revalidate_in_background(self, namespace):
+        with self._lock:
+            if namespace in self._refreshing:
+                return
+            self._refreshing.add(namespace)
+
+        def run():
+            try:
+                self.refresh(namespace)
+            except Exception as e:
+                print(f"Metric catalog refresh failed for {namespace}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(namespace)
+
+        # Lambda freezes the thread between invocations; it simply resumes on the next one
+        threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from cost_cache import FINALITY_LAG_DAYS, parse_day
+
+# DynamoDB table holding one item per cached answer: {"cache_key": ..., "value": <JSON>, "expires_at": ...}
+# (enable TTL on expires_at)
+RESULT_CACHE_TABLE_NAME = "CloudCostResultCache"
+
+# CloudWatch publishes EC2 metrics per 5-minute period, so a prediction cannot change inside one
+METRIC_PERIOD_SECONDS = 300
+
+# Usage answers for a closed date range only change if CloudWatch or Cost Explorer revise history
+USAGE_TTL_SECONDS = 24 * 3600
+
+# Entries kept in a warm container before the least recently used is dropped
+L1_MAX_ENTRIES = 1024
+
+
+def period_bucket(timestamp=None, period=METRIC_PERIOD_SECONDS):
+    return int((time.time() if timestamp is None else timestamp) // period)
+
+
+def prediction_key(instance_id, timestamp=None):
+    """Cache key and expiry (end of the metric period) for an instance's rightsizing answer."""
+    bucket = period_bucket(timestamp)
+    return f"prediction#{instance_id}#{bucket}", (bucket + 1) * METRIC_PERIOD_SECONDS
+
+
+def usage_key(service_name, start_date, end_date, now=None):
+    """Cache key and expiry for a service usage answer, or (None, None) unless the range is closed.
+
+    A range is closed when every day in [start_date, end_date) is old enough for Cost Explorer to
+    treat it as final, so the answer will not change.
+    """
+    try:
+        start, end = parse_day(start_date), parse_day(end_date)
+    except (TypeError, ValueError):
+        return None, None
+    now = time.time() if now is None else now
+    last_final_day = datetime.utcfromtimestamp(now).date() - timedelta(days=FINALITY_LAG_DAYS)
+    if start >= end or end - timedelta(days=1) > last_final_day:
+        return None, None
+    return f"usage#{service_name}#{start}#{end}", now + USAGE_TTL_SECONDS
+
+
+class LocalResultStore:
+    """Shared level kept in a plain dict; ResultCache checks expires_at, so nothing is swept."""
+
+    def __init__(self):
+        self.items = {}
+
+    def get(self, key):
+        return self.items.get(key)
+
+    def put(self, key, value, expires_at):
+        self.items[key] = {"value": value, "expires_at": expires_at}
+
+
+class DynamoDBResultStore:
+    """Cached answers persisted in DynamoDB so every container shares them."""
+
+    def __init__(self, client, table_name=RESULT_CACHE_TABLE_NAME):
+        self.client = client
+        self.table_name = table_name
+
+    def get(self, key):
+        item = self.client.get_item(TableName=self.table_name, Key={"cache_key": {"S": key}}).get("Item")
+        if not item:
+            return None
+        return {"value": json.loads(item["value"]["S"]), "expires_at": float(item["expires_at"]["N"])}
+
+    def put(self, key, value, expires_at):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "cache_key": {"S": key},
+                "value": {"S": json.dumps(value)},
+                # DynamoDB TTL deletes the item some time after this; reads check it themselves
+                "expires_at": {"N": str(int(expires_at))}
+            }
+        )
+
+
+class ResultCache:
+    """Two-level cache of computed answers: an LRU in the warm container (L1) in front of a shared store (L2).
+
+    Values must be JSON-serializable. Each entry carries an absolute expiry; expired entries are misses.
+    The cache is an optimization: a failing store is logged and counted (store_errors) and treated as a
+    miss on get and as L1-only on put, never failing the caller.
+    """
+
+    def __init__(self, store, max_entries=L1_MAX_ENTRIES):
+        self.store = store
+        self.max_entries = max_entries
+        self.metrics = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "store_errors": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Returns (value, level) with level "l1" or "l2", or (None, None) on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.metrics["l1_hits"] += 1
+                    return entry[0], "l1"
+                del self._entries[key]
+
+        try:
+            stored = self.store.get(key)
+        except Exception as e:
+            self.metrics["store_errors"] += 1
+            print(f"Result cache read failed for {key}: {str(e)}")
+            stored = None
+        if stored is not None and stored["expires_at"] > now:
+            self._remember(key, stored["value"], stored["expires_at"])
+            self.metrics["l2_hits"] += 1
+            return stored["value"], "l2"
+
+        self.metrics["misses"] += 1
+        return None, None
+
+    def put(self, key, value, expires_at):
+        self._remember(key, value, expires_at)
+        try:
+            self.store.put(key, value, expires_at)
+        except Exception as e:
+            self.metrics["store_errors"] += 1
+            print(f"Result cache write failed for {key}: {str(e)}")
+
+    def hit_rate(self):
+        hits = self.metrics["l1_hits"] + self.metrics["l2_hits"]
+        total = hits + self.metrics["misses"]
+        return hits / total if total else 0.0
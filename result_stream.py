@@ -0,0 +1,171 @@
+"""Server-Sent Events push channel for completed chatbot results.
+
+Clients subscribe with GET /sessions/{session_id}/events and receive one `result` event per completed
+request of that session. Results arrive through POST /stream-records (DynamoDB Streams records of
+CloudCostUtilizationResponse, forwarded by ResultStreamForwarder) or POST /publish; both must carry the
+shared RESULT_STREAM_SECRET in the X-Result-Stream-Secret header.
+
+    RESULT_STREAM_SECRET=... uvicorn result_stream:app --host 0.0.0.0 --port 8080
+"""
+import asyncio
+import hmac
+import json
+import os
+from contextlib import asynccontextmanager
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+# Comment line sent to idle subscribers so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+
+# Results buffered per subscriber; the oldest is dropped if a client stops reading
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Shared with ResultStreamForwarder; without it the publishing routes refuse every request
+RESULT_STREAM_SECRET = os.environ.get("RESULT_STREAM_SECRET", "")
+SECRET_HEADER = "X-Result-Stream-Secret"
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+
+class ResultBroker:
+    """Fans results out to the subscribers of their session_id; lives on the server's event loop."""
+
+    def __init__(self):
+        self.loop = None
+        self._subscribers = {}
+
+    def subscribe(self, session_id):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, session_id, queue):
+        queues = self._subscribers.get(session_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[session_id]
+
+    def publish(self, result):
+        """Delivers a result to every subscriber of its session. Must run on the broker's loop."""
+        delivered = 0
+        for queue in self._subscribers.get(result.get("session_id"), ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(result)
+            delivered += 1
+        return delivered
+
+    def publish_threadsafe(self, result):
+        """Publishes from another thread, e.g. a local change stream or a writer's worker thread."""
+        self.loop.call_soon_threadsafe(self.publish, result)
+
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+def stream_records_to_results(records):
+    """Completed results carried by DynamoDB Streams records (NEW_IMAGE or NEW_AND_OLD_IMAGES)."""
+    results = []
+    for record in records:
+        if record.get("eventName") not in ("INSERT", "MODIFY"):
+            continue
+        image = record.get("dynamodb", {}).get("NewImage")
+        if not image:
+            continue
+        item = {key: _deserializer.deserialize(value) for key, value in image.items()}
+        if item.get("status") == "ready":
+            results.append(item)
+    return results
+
+
+class LocalChangeStream:
+    """Stand-in for the response table and its stream: put_item emits Streams-style records to listeners."""
+
+    def __init__(self):
+        self.items = {}
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def put_item(self, Item, **kwargs):
+        key = (Item["session_id"], Item["request_id"])
+        event_name = "MODIFY" if key in self.items else "INSERT"
+        self.items[key] = Item
+        record = {
+            "eventName": event_name,
+            "dynamodb": {"NewImage": {name: _serializer.serialize(value) for name, value in Item.items()}}
+        }
+        for listener in self.listeners:
+            listener([record])
+        return {}
+
+
+def format_event(result):
+    return f"id: {result.get('request_id', '')}\nevent: result\ndata: {json.dumps(result, default=str)}\n\n"
+
+
+def create_app(broker=None, secret=None):
+    broker = broker or ResultBroker()
+    secret = RESULT_STREAM_SECRET if secret is None else secret
+
+    def require_secret(provided: str = Header("", alias=SECRET_HEADER)):
+        """Only holders of the shared secret may push results into a session's stream."""
+        if not secret:
+            raise HTTPException(status_code=503, detail="RESULT_STREAM_SECRET is not configured")
+        if not hmac.compare_digest(provided.encode(), secret.encode()):
+            raise HTTPException(status_code=401, detail="Invalid or missing result stream secret")
+
+    @asynccontextmanager
+    async def lifespan(app):
+        broker.loop = asyncio.get_running_loop()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.broker = broker
+
+    @app.get("/sessions/{session_id}/events")
+    async def session_events(session_id: str):
+        queue = broker.subscribe(session_id)
+
+        async def events():
+            try:
+                yield ": subscribed\n\n"
+                while True:
+                    try:
+                        result = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield format_event(result)
+            finally:
+                # Runs when the client disconnects and the response task is cancelled
+                broker.unsubscribe(session_id, queue)
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Access-Control-Allow-Origin": "*"}
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    @app.post("/publish", dependencies=[Depends(require_secret)])
+    async def publish(result: dict):
+        return {"delivered": broker.publish(result)}
+
+    @app.post("/stream-records", dependencies=[Depends(require_secret)])
+    async def stream_records(payload: dict):
+        delivered = 0
+        for result in stream_records_to_results(payload.get("Records", [])):
+            delivered += broker.publish(result)
+        return {"delivered": delivered}
+
+    @app.get("/health")
+    async def health():
+        return {"subscribers": broker.subscriber_count()}
+
+    return app
+
+
+app = create_app()
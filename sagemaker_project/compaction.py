@@ -0,0 +1,206 @@
+"""Model compaction sweep: smaller variants of the trained forest, scored for accuracy against size and speed.
+
+Every candidate is derived from the fitted forest without retraining:
+
+* tree count: the first n trees (a random forest's trees are exchangeable)
+* depth: every tree pruned to max_depth, the cut nodes becoming leaves with their own class distribution
+* format "sklearn": the pruned forest with prediction-unused state dropped (node impurities and sample
+  counts, internal-node class values, the training sample weights) and saved with compressed joblib;
+  model_fn loads it like the full model
+* format "compiled": the rf_compiler.CompiledForest of the same forest (float32 thresholds, int32 node
+  indices, leaves-only probability table), saved with compressed joblib; model_fn serves it without
+  compiling when its to_arrays() are stored under "forest" in model.joblib
+
+Each is measured for accuracy / weighted F1 and agreement with the full model, artifact size, load time,
+memory once loaded and single-row latency; the report flags the Pareto-optimal candidates (no other
+candidate is at least as good on F1, size, load time and latency, and better on one).
+"""
+import copy
+import json
+import logging
+import os
+import pickle
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.tree._tree import Tree
+
+from rf_compiler import compile_forest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TREE_COUNTS = (10, 25, 50, 100)
+DEFAULT_DEPTHS = (8, 12, 16, 20)
+DEFAULT_COMPRESS = 3
+
+# Forest attributes only needed while fitting
+_FIT_ONLY_ATTRIBUTES = ("_sample_weight", "oob_score_", "oob_decision_function_", "estimators_samples_")
+
+
+def _node_depths(children_left, children_right):
+    depths = np.zeros(len(children_left), dtype=np.int64)
+    # Nodes are stored in depth-first preorder, so a parent always comes before its children
+    for node in range(len(children_left)):
+        if children_left[node] != -1:
+            depths[children_left[node]] = depths[node] + 1
+            depths[children_right[node]] = depths[node] + 1
+    return depths
+
+
+def _rebuild_tree(tree, nodes, values, max_depth):
+    rebuilt = Tree(tree.n_features, np.asarray(tree.n_classes), tree.n_outputs)
+    rebuilt.__setstate__({"max_depth": max_depth, "node_count": len(nodes), "nodes": nodes, "values": values})
+    return rebuilt
+
+
+def prune_tree(tree, max_depth):
+    """Copy of a fitted sklearn Tree cut to max_depth; nodes at the cut keep their class distribution."""
+    state = tree.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+    if tree.max_depth <= max_depth:
+        return _rebuild_tree(tree, nodes.copy(), values.copy(), tree.max_depth)
+
+    depths = _node_depths(nodes["left_child"], nodes["right_child"])
+    keep = depths <= max_depth
+    # Kept nodes stay in preorder, so renumbering them in order keeps a valid tree
+    new_index = np.cumsum(keep) - 1
+    pruned = nodes[keep].copy()
+    cut = (depths[keep] == max_depth) & (pruned["left_child"] != -1)
+    internal = pruned["left_child"] != -1
+    pruned["left_child"][internal] = new_index[pruned["left_child"][internal]]
+    pruned["right_child"][internal] = new_index[pruned["right_child"][internal]]
+    pruned["left_child"][cut] = -1
+    pruned["right_child"][cut] = -1
+    pruned["feature"][cut] = -2
+    pruned["threshold"][cut] = -2.0
+    pruned["missing_go_to_left"][cut] = 0
+    return _rebuild_tree(tree, pruned, values[keep].copy(), max_depth)
+
+
+def strip_tree(tree):
+    """Zeroes what prediction never reads (impurities, sample counts, internal-node values) so it compresses away."""
+    state = tree.__getstate__()
+    nodes, values = state["nodes"].copy(), state["values"].copy()
+    nodes["impurity"] = 0.0
+    nodes["n_node_samples"] = 0
+    nodes["weighted_n_node_samples"] = 0.0
+    values[nodes["left_child"] != -1] = 0.0
+    return _rebuild_tree(tree, nodes, values, state["max_depth"])
+
+
+def compact_forest(model, n_trees=None, max_depth=None, strip=True):
+    """A smaller copy of a fitted forest: its first n_trees trees, each pruned to max_depth."""
+    compact = copy.copy(model)
+    estimators = model.estimators_[:n_trees] if n_trees else model.estimators_
+    compact.estimators_ = []
+    for estimator in estimators:
+        estimator = copy.copy(estimator)
+        tree = estimator.tree_
+        if max_depth is not None:
+            tree = prune_tree(tree, max_depth)
+            estimator.max_depth = max_depth
+        if strip:
+            tree = strip_tree(tree)
+        estimator.tree_ = tree
+        compact.estimators_.append(estimator)
+    compact.n_estimators = len(compact.estimators_)
+    if max_depth is not None:
+        compact.max_depth = max_depth
+    if strip:
+        for name in _FIT_ONLY_ATTRIBUTES:
+            compact.__dict__.pop(name, None)
+    return compact
+
+
+def _single_row_latency_ms(predict, X, rows=200):
+    predict(X[:1])
+    latencies = []
+    for index in range(min(rows, len(X))):
+        started = time.perf_counter()
+        predict(X[index:index + 1])
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def measure_candidate(artifact, X, y, reference, path, compress, latency_rows=200):
+    """Saves the artifact and returns its accuracy, size, load time, memory and latency."""
+    joblib.dump(artifact, path, compress=compress)
+    load_seconds = []
+    for _ in range(3):
+        started = time.perf_counter()
+        joblib.load(path)
+        load_seconds.append(time.perf_counter() - started)
+
+    predictions = artifact.predict(X)
+    memory_bytes = artifact.nbytes if hasattr(artifact, "nbytes") else len(pickle.dumps(artifact, protocol=4))
+    p50_ms, p99_ms = _single_row_latency_ms(artifact.predict, X, latency_rows)
+    return {
+        "accuracy": round(float(accuracy_score(y, predictions)), 4),
+        "f1": round(float(f1_score(y, predictions, average="weighted")), 4),
+        "agreement": round(float(np.mean(predictions == reference)), 4),
+        "size_bytes": os.path.getsize(path),
+        "load_ms": round(min(load_seconds) * 1000, 2),
+        "memory_bytes": int(memory_bytes),
+        "latency_p50_ms": round(p50_ms, 3),
+        "latency_p99_ms": round(p99_ms, 3)
+    }
+
+
+def mark_pareto(candidates):
+    """Flags candidates no other candidate dominates on (higher F1, smaller size, faster load, lower latency)."""
+    def key(candidate):
+        return (-candidate["f1"], candidate["size_bytes"], candidate["load_ms"], candidate["latency_p50_ms"])
+
+    for candidate in candidates:
+        mine = key(candidate)
+        candidate["pareto"] = not any(
+            all(a <= b for a, b in zip(key(other), mine)) and key(other) != mine for other in candidates
+        )
+    return candidates
+
+
+def sweep(model, X, y, tree_counts=DEFAULT_TREE_COUNTS, depths=DEFAULT_DEPTHS, compress=DEFAULT_COMPRESS,
+          latency_rows=200):
+    """Measures the full model as saved today plus every (trees, depth, format) candidate."""
+    X = np.asarray(X, dtype=float)
+    reference = model.predict(X)
+    max_trees = len(model.estimators_)
+    max_depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+    tree_counts = sorted({min(count, max_trees) for count in tree_counts})
+    depths = sorted({min(depth, max_depth) for depth in depths})
+
+    candidates = []
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = measure_candidate(model, X, y, reference, os.path.join(tmp, "baseline.joblib"), 0, latency_rows)
+        candidates.append(dict(name="baseline", format="sklearn", trees=max_trees, depth=max_depth, compress=0,
+                               **baseline))
+
+        for n_trees in tree_counts:
+            for depth in depths:
+                compact = compact_forest(model, n_trees, depth)
+                variants = (("sklearn", compact), ("compiled", compile_forest(compact)))
+                for fmt, artifact in variants:
+                    name = f"{fmt}-t{n_trees}-d{depth}"
+                    measured = measure_candidate(artifact, X, y, reference, os.path.join(tmp, name + ".joblib"),
+                                                 compress, latency_rows)
+                    candidates.append(dict(name=name, format=fmt, trees=n_trees, depth=depth, compress=compress,
+                                           **measured))
+                    logger.info(f"Compaction candidate {name}: {json.dumps(measured)}")
+    return mark_pareto(candidates)
+
+
+def format_report(candidates):
+    """Pareto-optimal candidates first, as a fixed-width table."""
+    lines = [f"{'candidate':<22} {'acc':>6} {'f1':>6} {'agree':>6} {'size KB':>9} {'load ms':>8} {'mem KB':>9} "
+             f"{'p50 ms':>7} {'p99 ms':>7} pareto"]
+    for candidate in sorted(candidates, key=lambda c: (not c["pareto"], c["size_bytes"])):
+        lines.append(
+            f"{candidate['name']:<22} {candidate['accuracy']:>6.3f} {candidate['f1']:>6.3f} {candidate['agreement']:>6.3f} "
+            f"{candidate['size_bytes'] / 1024:>9.1f} {candidate['load_ms']:>8.1f} {candidate['memory_bytes'] / 1024:>9.1f} "
+            f"{candidate['latency_p50_ms']:>7.3f} {candidate['latency_p99_ms']:>7.3f} {'*' if candidate['pareto'] else ''}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,193 @@
+"""Successive-halving hyperparameter search for the random forest, with n_estimators as the budget.
+
+Every configuration of the parameter space starts on a small forest scored by cross-validation; after
+each rung only the best 1/eta of the configurations go on, with eta times as many trees:
+
+    rung 0: 90 configurations x  11 trees
+    rung 1: 30 configurations x  33 trees
+    rung 2: 10 configurations x 100 trees
+
+Forests grow with warm_start, so a rung only fits the trees added since the previous one (a random
+forest's trees are independent, so a grown forest equals one fitted at that size from scratch), and
+every (configuration, fold) fit runs in parallel across all cores. sklearn's HalvingGridSearchCV
+refits each rung from scratch, which is why the search is implemented here.
+
+Completed fold scores are cached by configuration, fold, tree count and data fingerprint; with a
+cache_path (e.g. under /opt/ml/checkpoints, which SageMaker syncs to S3 for spot training) an
+interrupted job resumes without refitting what it already scored.
+"""
+import itertools
+import json
+import logging
+import math
+import os
+import time
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPACE = {
+    "max_depth": [8, 12, 16, 20, None],
+    "min_samples_split": [2, 5, 10],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": ["sqrt", 0.5]
+}
+DEFAULT_ETA = 3
+DEFAULT_MIN_TREES = 10
+DEFAULT_CV = 3
+DEFAULT_SCORING = "accuracy"
+
+
+def expand_space(space):
+    """Every combination of a {parameter: [values]} space, as a list of parameter dicts."""
+    names = sorted(space)
+    values = [space[name] if isinstance(space[name], (list, tuple)) else [space[name]] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def budget_schedule(n_candidates, min_trees, max_trees, eta):
+    """Tree counts per rung: the last rung reaches max_trees, earlier ones shrink by eta each."""
+    rungs = max(1, min(int(math.ceil(math.log(max(n_candidates, 1), eta))) + 1,
+                       int(math.floor(math.log(max(max_trees / float(min_trees), 1), eta))) + 1))
+    return [max(1, int(round(max_trees / float(eta ** (rungs - 1 - rung))))) for rung in range(rungs)]
+
+
+def _candidate_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def _grow_and_score(forest, n_trees, X, y, train_index, test_index, scorer):
+    """Grows the fold's forest to n_trees (fitting only the new trees) and scores it on the held-out fold."""
+    grown = forest.n_estimators if hasattr(forest, "estimators_") else 0
+    forest.set_params(n_estimators=n_trees)
+    started = time.perf_counter()
+    forest.fit(X[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - started
+    return forest, float(scorer(forest, X[test_index], y[test_index])), n_trees - grown, fit_seconds
+
+
+class SuccessiveHalvingSearch:
+    """Successive halving over a random forest parameter space; see the module docstring.
+
+    After search(X, y): best_params_ (including n_estimators), best_score_, best_estimator_ (refitted on
+    all of X at max_trees), history (one entry per configuration per rung) and metrics.
+    """
+
+    def __init__(self, space=None, max_trees=100, min_trees=DEFAULT_MIN_TREES, eta=DEFAULT_ETA, cv=DEFAULT_CV,
+                 scoring=DEFAULT_SCORING, n_jobs=-1, random_state=None, cache_path=None):
+        self.space = space or DEFAULT_SPACE
+        self.max_trees = max_trees
+        self.min_trees = min(min_trees, max_trees)
+        self.eta = eta
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.cache_path = cache_path
+        self.history = []
+        self.metrics = {"fits": 0, "cached_scores": 0, "trees_grown": 0, "trees_without_warm_start": 0,
+                        "fit_seconds": 0.0, "search_seconds": 0.0, "refit_seconds": 0.0}
+
+    def _load_cache(self):
+        if self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_cache(self, cache):
+        if self.cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            with open(self.cache_path + ".tmp", "w") as f:
+                json.dump(cache, f)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def search(self, X, y):
+        started = time.perf_counter()
+        # The final model is fitted on X as given (a DataFrame keeps its feature names)
+        X_full, y_full = X, np.asarray(y).ravel()
+        X = np.asarray(X)
+        y = y_full
+        scorer = get_scorer(self.scoring)
+        folds = list(StratifiedKFold(self.cv, shuffle=True, random_state=self.random_state or 0).split(X, y))
+        fingerprint = joblib.hash((X, y, self.cv, self.random_state, self.scoring))
+
+        candidates = expand_space(self.space)
+        schedule = budget_schedule(len(candidates), self.min_trees, self.max_trees, self.eta)
+        base = RandomForestClassifier(warm_start=True, n_jobs=1, random_state=self.random_state)
+        # One warm-started forest per (candidate, fold); dropped as soon as the candidate is eliminated
+        forests = {}
+        cache = self._load_cache()
+        logger.info(f"Successive halving: {len(candidates)} configurations, {self.cv}-fold CV, "
+                    f"trees per rung {schedule}, eta {self.eta}")
+
+        survivors = list(range(len(candidates)))
+        scores = {}
+        with Parallel(n_jobs=self.n_jobs, prefer="threads") as parallel:
+            for rung, n_trees in enumerate(schedule):
+                rung_started = time.perf_counter()
+                scores = {}
+                tasks = []
+                for index in survivors:
+                    fold_scores = []
+                    for fold, (train_index, test_index) in enumerate(folds):
+                        key = f"{fingerprint}|{_candidate_key(candidates[index])}|{fold}|{n_trees}"
+                        if key in cache:
+                            fold_scores.append(cache[key])
+                            self.metrics["cached_scores"] += 1
+                            continue
+                        forest = forests.get((index, fold))
+                        if forest is None:
+                            forest = clone(base).set_params(**candidates[index])
+                        tasks.append((index, fold, key, forest, train_index, test_index))
+                    scores[index] = fold_scores
+
+                results = parallel(
+                    delayed(_grow_and_score)(forest, n_trees, X, y, train_index, test_index, scorer)
+                    for _, _, _, forest, train_index, test_index in tasks
+                )
+                for (index, fold, key, _, _, _), (forest, score, trees_grown, fit_seconds) in zip(tasks, results):
+                    forests[(index, fold)] = forest
+                    scores[index].append(score)
+                    cache[key] = score
+                    self.metrics["fits"] += 1
+                    self.metrics["trees_grown"] += trees_grown
+                    self.metrics["trees_without_warm_start"] += n_trees
+                    self.metrics["fit_seconds"] += fit_seconds
+                self._save_cache(cache)
+
+                ranked = sorted(survivors, key=lambda index: -np.mean(scores[index]))
+                for place, index in enumerate(ranked):
+                    self.history.append({"rung": rung, "n_estimators": n_trees, "params": candidates[index],
+                                         "score": round(float(np.mean(scores[index])), 4),
+                                         "score_std": round(float(np.std(scores[index])), 4), "rank": place + 1})
+                survivors = ranked[:max(1, int(math.ceil(len(ranked) / float(self.eta))))]
+                for index, fold in list(forests):
+                    if index not in survivors:
+                        del forests[(index, fold)]
+                logger.info(f"Rung {rung}: {len(ranked)} configurations x {n_trees} trees in "
+                            f"{time.perf_counter() - rung_started:.1f}s, best {np.mean(scores[ranked[0]]):.4f} "
+                            f"{candidates[ranked[0]]}")
+
+        best = ranked[0]
+        self.best_params_ = dict(candidates[best], n_estimators=self.max_trees)
+        self.best_score_ = float(np.mean(scores[best]))
+        self.metrics["search_seconds"] = time.perf_counter() - started
+
+        refit_started = time.perf_counter()
+        self.best_estimator_ = RandomForestClassifier(n_jobs=self.n_jobs, random_state=self.random_state,
+                                                      **self.best_params_).fit(X_full, y_full)
+        self.metrics["refit_seconds"] = time.perf_counter() - refit_started
+        return self
+
+    def report(self):
+        """JSON-serializable summary: best configuration, timings and the per-rung history."""
+        metrics = {name: round(value, 3) if isinstance(value, float) else value for name, value in self.metrics.items()}
+        return {"best_params": self.best_params_, "best_score": round(self.best_score_, 4), "scoring": self.scoring,
+                "cv": self.cv, "eta": self.eta, "metrics": metrics, "history": self.history}
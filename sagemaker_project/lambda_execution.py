@@ -19,31 +19,51 @@ METRIC_MAP = {
 }
 
 def get_instance_metrics(instance_id):
-    """Fetches the latest CloudWatch metrics for the given EC2 instance."""
+    """Fetches the latest CloudWatch metrics for the given EC2 instance in a single GetMetricData call."""
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(minutes=5)  # Fetch last 5 minutes of data
 
-    metrics_data = {}
-    
-    for key, metric in METRIC_MAP.items():
-        response = cloudwatch.get_metric_statistics(
-            Namespace=metric["Namespace"],
-            MetricName=metric["Metric"],
-            Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=300,  # 5-minute period
-            Statistics=[metric["Stat"]],
-            Unit="Percent" if key == "CPUUtilization" else "Count"
-        )
-        
-        # Extract the most recent datapoint
-        data_points = response.get("Datapoints", [])
-        if data_points:
-            latest_value = sorted(data_points, key=lambda x: x["Timestamp"], reverse=True)[0][metric["Stat"]]
-            metrics_data[key] = latest_value
-        else:
-            metrics_data[key] = 0  # Default to zero if no data
+    # One query per metric, all sent in the same request
+    queries = []
+    for i, (key, metric) in enumerate(METRIC_MAP.items()):
+        queries.append({
+            "Id": f"m{i}",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": metric["Namespace"],
+                    "MetricName": metric["Metric"],
+                    "Dimensions": [{"Name": "InstanceId", "Value": instance_id}]
+                },
+                "Period": 300,  # 5-minute period
+                "Stat": metric["Stat"],
+                "Unit": "Percent" if key == "CPUUtilization" else "Count"
+            },
+            "ReturnData": True
+        })
+    keys_by_id = {query["Id"]: key for query, key in zip(queries, METRIC_MAP)}
+
+    metrics_data = dict.fromkeys(METRIC_MAP, 0)  # Default to zero if no data
+    seen = set()
+    kwargs = {
+        "MetricDataQueries": queries,
+        "StartTime": start_time,
+        "EndTime": end_time,
+        "ScanBy": "TimestampDescending"
+    }
+
+    while True:
+        response = cloudwatch.get_metric_data(**kwargs)
+        for result in response.get("MetricDataResults", []):
+            # Values are newest first, so the first page holding a value has the latest datapoint
+            values = result.get("Values", [])
+            if values and result["Id"] not in seen:
+                metrics_data[keys_by_id[result["Id"]]] = values[0]
+                seen.add(result["Id"])
+
+        next_token = response.get("NextToken")
+        if not next_token:
+            break
+        kwargs["NextToken"] = next_token
 
     return metrics_data
 
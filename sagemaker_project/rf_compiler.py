@@ -0,0 +1,206 @@
+"""Compiles a fitted RandomForestClassifier into flat NumPy arrays and scores it without scikit-learn.
+
+Every tree's nodes are concatenated into one set of contiguous arrays (feature, threshold, child
+pair, and a class probability table holding leaves only), so a batch is scored by walking all (row, tree) pairs one level per
+step: max_depth vectorised steps, with no Python loop over trees or rows. Leaves point to
+themselves, so paths that end early simply stay put.
+
+A Pipeline of a StandardScaler and the forest compiles too: the scaler's mean and scale are applied
+inside apply(), with the same float64 arithmetic as StandardScaler.transform, so a request is scaled
+and scored in one pass without scikit-learn's per-call overhead.
+
+Predictions are identical to model.predict: features are compared as float32 like sklearn's tree
+code (against thresholds rounded down to float32, which decides every float32 input the same way as
+the float64 threshold), missing values follow each node's missing_go_to_left, and the per-tree
+probabilities are summed in tree order, averaged and arg-maxed the same way.
+
+    artifact = joblib.load("model.joblib")
+    forest = compile_forest(artifact["pipeline"])
+    forest.predict(rows)
+"""
+import numpy as np
+
+# Below this many rows the compiled forest beats model.predict, whose ~10 ms of fixed per-call
+# overhead dominates small batches; on large batches sklearn's compiled traversal is faster
+COMPILED_MAX_BATCH_ROWS = 256
+
+
+class CompiledForest:
+    """A random forest classifier as flat node arrays; see compile_forest()."""
+
+    def __init__(self, feature, threshold, children, missing_left, leaf_index, leaf_proba, roots, max_depth,
+                 classes, n_features, shift=None, scale=None):
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = children
+        self.missing_left = missing_left
+        # leaf_proba[leaf_index[node]] holds a leaf's class probabilities
+        self.leaf_index = leaf_index
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        # Fitted StandardScaler of a compiled Pipeline: rows become (X - shift) / scale; None when not used
+        self.shift = shift
+        self.scale = scale
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuilds a forest from to_arrays(), which pickles as plain NumPy arrays."""
+        forest = cls.__new__(cls)
+        forest.__dict__.update(arrays)
+        return forest
+
+    def to_arrays(self):
+        """The forest as a dict of arrays, loadable without this module; see from_arrays()."""
+        return dict(self.__dict__)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arrays."""
+        arrays = (self.feature, self.threshold, self.children, self.missing_left, self.leaf_index, self.leaf_proba,
+                  self.roots, self.shift, self.scale)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def apply(self, X):
+        """Leaf index (into the flat arrays) reached by every row in every tree: shape (n_rows, n_trees)."""
+        if self.shift is not None or self.scale is not None:
+            # Same operations, in the same order, as StandardScaler.transform
+            X = np.array(X, dtype=np.float64)
+            if self.shift is not None:
+                X -= self.shift
+            if self.scale is not None:
+                X /= self.scale
+        # sklearn's trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError("Expected rows of %d features, got shape %s" % (self.n_features_in_, X.shape))
+
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=self.roots.dtype) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        has_missing = bool(np.isnan(flat).any())
+        for _ in range(self.max_depth):
+            # np.take is markedly faster than fancy indexing for these flat gathers
+            value = np.take(flat, row_offsets + np.take(self.feature, node))
+            go_right = value > np.take(self.threshold, node)
+            if has_missing:
+                go_right = np.where(np.isnan(value), ~np.take(self.missing_left, node), go_right)
+            node = np.take(self.children, 2 * node + go_right)
+        return node
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # A running sum over the tree axis adds one tree at a time, in the order sklearn accumulates them,
+        # so the averaged probabilities (and argmax ties) match bit for bit
+        leaf_proba = np.take(self.leaf_proba, np.take(self.leaf_index, leaves), axis=0)
+        proba = np.cumsum(leaf_proba, axis=1)[:, -1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def _leaf_proba(tree):
+    """Per-node class probabilities exactly as DecisionTreeClassifier.predict_proba returns them."""
+    proba = tree.value[:, 0, :].astype(np.float64)
+    # sklearn >= 1.4 stores class fractions and returns them as is; older versions store
+    # (weighted) sample counts and normalise them in predict_proba
+    if np.isclose(proba[0].sum(), 1.0):
+        return proba
+    normalizer = proba.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    return proba / normalizer
+
+
+def _float32_thresholds(threshold):
+    """The largest float32 not above each float64 threshold: for a float32 x, x <= t exactly when x <= t32."""
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _scaler_arrays(preprocessing):
+    """(shift, scale) of the preprocessing steps of a Pipeline: none, or one fitted StandardScaler."""
+    steps = [step for _, step in preprocessing if step is not None and step != "passthrough"]
+    if not steps:
+        return None, None
+    scaler = steps[0]
+    if len(steps) > 1 or type(scaler).__name__ != "StandardScaler":
+        raise ValueError("compile_forest supports a Pipeline of one StandardScaler and the forest only")
+    shift = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None
+    scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None
+    return shift, scale
+
+
+def compile_forest(model):
+    """Flattens a fitted single-output RandomForestClassifier (or ExtraTreesClassifier), or a Pipeline of a
+    StandardScaler and one, into a CompiledForest."""
+    shift, scale = None, None
+    if hasattr(model, "steps"):
+        shift, scale = _scaler_arrays(model.steps[:-1])
+        model = model.steps[-1][1]
+    estimators = getattr(model, "estimators_", None)
+    if not estimators:
+        raise ValueError("compile_forest needs a fitted forest classifier")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("compile_forest supports single-output forests only")
+
+    total_nodes = sum(estimator.tree_.node_count for estimator in estimators)
+    # Half-width indices halve the memory each traversal step reads
+    index_dtype = np.int32 if 2 * total_nodes < np.iinfo(np.int32).max else np.intp
+
+    features, thresholds, children, missing_lefts, leaf_indexes, probas, roots = [], [], [], [], [], [], []
+    offset = 0
+    leaf_offset = 0
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves loop back to themselves, so every path can take max_depth steps
+        left = np.where(is_leaf, nodes, tree.children_left) + offset
+        right = np.where(is_leaf, nodes, tree.children_right) + offset
+        feature = np.where(is_leaf, 0, tree.feature)
+        # Trees fitted before sklearn 1.3 send missing values right, like a failed "<=" comparison
+        missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+
+        features.append(feature.astype(index_dtype))
+        thresholds.append(_float32_thresholds(tree.threshold))
+        children.append(np.stack([left, right], axis=1).astype(index_dtype).ravel())
+        missing_lefts.append(np.asarray(missing_left, dtype=bool))
+        # Internal nodes point at row 0; traversal never stops on them
+        leaf_indexes.append(np.where(is_leaf, np.cumsum(is_leaf) - 1 + leaf_offset, 0).astype(index_dtype))
+        probas.append(_leaf_proba(tree)[is_leaf])
+        roots.append(offset)
+        offset += tree.node_count
+        leaf_offset += int(is_leaf.sum())
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        children=np.concatenate(children),
+        missing_left=np.concatenate(missing_lefts),
+        leaf_index=np.concatenate(leaf_indexes),
+        leaf_proba=np.ascontiguousarray(np.concatenate(probas)),
+        roots=np.asarray(roots, dtype=index_dtype),
+        max_depth=max_depth,
+        classes=np.asarray(model.classes_),
+        n_features=model.n_features_in_,
+        shift=shift,
+        scale=scale
+    )
@@ -0,0 +1,343 @@
+import pandas as pd
+import pickle
+import sklearn
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+import joblib
+import logging
+import argparse
+import os
+import ast
+import json
+import time
+import boto3
+import numpy as np
+from collections import namedtuple
+from botocore.exceptions import ClientError
+
+from compaction import compact_forest, format_report, sweep
+from hyperparameter_search import SuccessiveHalvingSearch
+from rf_compiler import COMPILED_MAX_BATCH_ROWS, CompiledForest, compile_forest
+
+# The one serving artifact: {"pipeline": Pipeline(scaler, forest), "feature_schema": {...},
+# "forest": CompiledForest.to_arrays() or None}; the compiled forest is stored by --export-trees /
+# --export-depth and compiled at load otherwise
+MODEL_FILE = "model.joblib"
+
+# Logging setup for better tracking on SageMaker
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+s3_client = boto3.client('s3')
+# Helper function to safely parse lists from strings
+def safe_eval(param_str):
+    try:
+        return ast.literal_eval(param_str)
+    except (ValueError, SyntaxError):
+        raise ValueError(f"Invalid parameter format: {param_str}")
+        
+# Function to check if a file exists in S3
+def check_s3_file_exists(bucket, file_key):
+    try:
+        s3_client.head_object(Bucket=bucket, Key=file_key)
+        logger.info(f"File exists: s3://{bucket}/{file_key}")
+        return True
+    except ClientError as e:
+        logger.error(f"File not found: s3://{bucket}/{file_key} - {e}")
+        return False
+    
+
+# Everything the endpoint needs to score a request, loaded once by model_fn
+ModelBundle = namedtuple("ModelBundle", ["pipeline", "feature_schema", "forest", "load_seconds"])
+
+# Per-container serving timings, updated by predict_fn
+SERVING_STATS = {"load_seconds": 0.0, "predict_count": 0, "predict_seconds_total": 0.0, "last_predict_seconds": 0.0}
+
+
+def _load_artifact(path):
+    # Memory-map numpy arrays inside uncompressed pickles (the forest's node arrays) instead of copying them
+    try:
+        return joblib.load(path, mmap_mode="r")
+    except (ValueError, OSError):
+        return joblib.load(path)
+
+
+def feature_schema(X):
+    """The features the pipeline expects, in column order."""
+    return {"features": [str(name) for name in X.columns], "n_features": X.shape[1], "dtype": "float64"}
+
+
+def to_features(input_data, schema):
+    """Request rows as a float64 array in schema order: a dict or list of dicts keyed by feature name,
+    a DataFrame, or rows of values already in schema order."""
+    names = schema["features"]
+    if isinstance(input_data, dict):
+        input_data = [input_data]
+    if isinstance(input_data, pd.DataFrame):
+        input_data = input_data[names]
+    elif isinstance(input_data, list) and input_data and isinstance(input_data[0], dict):
+        missing = set(names) - set(input_data[0])
+        if missing:
+            raise ValueError(f"Missing features: {sorted(missing)}")
+        input_data = [[row[name] for name in names] for row in input_data]
+    features = np.asarray(input_data, dtype=np.float64)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    if features.ndim != 2 or features.shape[1] != schema["n_features"]:
+        raise ValueError(f"Expected rows of {schema['n_features']} features {names}, got shape {features.shape}")
+    return features
+
+
+def build_artifact(pipeline, schema, forest=None):
+    return {"pipeline": pipeline, "feature_schema": schema, "forest": forest.to_arrays() if forest else None}
+
+
+# Model loading function for SageMaker
+def model_fn(model_dir):
+    started = time.perf_counter()
+    artifact = _load_artifact(os.path.join(model_dir, MODEL_FILE))
+    pipeline, schema = artifact["pipeline"], artifact["feature_schema"]
+
+    # Flat-array copy of scaler + forest for small batches (identical predictions, one pass, no sklearn overhead)
+    try:
+        forest = CompiledForest.from_arrays(artifact["forest"]) if artifact.get("forest") else compile_forest(pipeline)
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Forest not compiled, serving with pipeline.predict: {e}")
+        forest = None
+
+    # Warm-up prediction so the first real request doesn't pay for lazy initialisation
+    warm_up = np.zeros((1, schema["n_features"]))
+    pipeline.predict(warm_up)
+    if forest is not None:
+        forest.predict(warm_up)
+
+    load_seconds = time.perf_counter() - started
+    SERVING_STATS["load_seconds"] = load_seconds
+    logger.info(f"Model pipeline loaded from {model_dir} in {load_seconds * 1000:.1f} ms")
+    logger.info(f"Features: {schema['features']}; classes: {pipeline.classes_}")
+    return ModelBundle(pipeline, schema, forest, load_seconds)
+
+
+# Model predict function for SageMaker: pure computation on the preloaded bundle
+def predict_fn(input_data, bundle):
+    started = time.perf_counter()
+    features = to_features(input_data, bundle.feature_schema)
+
+    # Scale and predict in one pass: the compiled copy for chatbot-sized batches, the pipeline otherwise
+    if bundle.forest is not None and len(features) <= COMPILED_MAX_BATCH_ROWS:
+        prediction = bundle.forest.predict(features)
+    else:
+        prediction = bundle.pipeline.predict(features)
+
+    elapsed = time.perf_counter() - started
+    SERVING_STATS["predict_count"] += 1
+    SERVING_STATS["predict_seconds_total"] += elapsed
+    SERVING_STATS["last_predict_seconds"] = elapsed
+    logger.debug(f"Predicted {len(prediction)} rows in {elapsed * 1000:.3f} ms")
+
+    return prediction
+
+
+def check_serving_consistency(model_dir, X, expected):
+    """Loads the saved artifact the way the endpoint does and checks predict_fn reproduces the
+    evaluation predictions, on both the compiled (small batch) and the pipeline (large batch) paths."""
+    bundle = model_fn(model_dir)
+    served = {
+        "batch": predict_fn(X, bundle),
+        "chunks": np.concatenate([predict_fn(X.iloc[start:start + COMPILED_MAX_BATCH_ROWS], bundle)
+                                  for start in range(0, len(X), COMPILED_MAX_BATCH_ROWS)]),
+        "records": predict_fn(X.head(50).to_dict(orient="records"), bundle)
+    }
+    mismatches = {name: int((np.asarray(prediction) != expected[:len(prediction)]).sum())
+                  for name, prediction in served.items()}
+    if any(mismatches.values()):
+        raise RuntimeError(f"Served predictions differ from the evaluation predictions: {mismatches}")
+    logger.info(f"Serving consistency check passed on {len(X)} rows ({', '.join(served)})")
+
+
+def parse_int_list(value):
+    return [int(item) for item in str(value).split(",") if item.strip()]
+
+
+# Main script execution
+if __name__ == "__main__":
+
+    logger.info("[INFO] Extracting arguments")
+    parser = argparse.ArgumentParser()
+
+    # Hyperparameters passed via command-line arguments (for Random Forest)
+    parser.add_argument("--n_estimators", type=int, default=100)
+    parser.add_argument("--max_depth", type=int, default=20)
+    parser.add_argument("--min_samples_split", type=int, default=2)
+    parser.add_argument("--min_samples_leaf", type=int, default=1)
+
+    # Directories for model, train, test, etc.
+    parser.add_argument("--model-dir", type=str, default=os.environ.get("SM_MODEL_DIR")) 
+    parser.add_argument("--train", type=str, default=os.environ.get("SM_CHANNEL_TRAIN")) 
+    parser.add_argument("--test", type=str, default=os.environ.get("SM_CHANNEL_TEST")) 
+    parser.add_argument("--X-train-file", type=str, default="X_train-V-1.csv")
+    parser.add_argument("--X-test-file", type=str, default="X_test-V-1.csv")
+    parser.add_argument("--y-train-file", type=str, default="y_train-V-1.csv")
+    parser.add_argument("--y-test-file", type=str, default="y_test-V-1.csv")
+    parser.add_argument("--output-data-dir", type=str, default=os.environ.get("SM_OUTPUT_DATA_DIR"))
+
+    # Compaction: sweep smaller variants of the trained forest and/or export one in place of the full model
+    parser.add_argument("--compact", action="store_true", help="write compaction_report.json (Pareto report)")
+    parser.add_argument("--compact-trees", type=str, default="10,25,50,100")
+    parser.add_argument("--compact-depths", type=str, default="8,12,16,20")
+    parser.add_argument("--compress", type=int, default=3, help="joblib compression level of exported artifacts")
+    parser.add_argument("--export-trees", type=int, help="save only the first N trees")
+    parser.add_argument("--export-depth", type=int, help="save the trees pruned to this depth")
+
+    # Search: successive halving over a parameter space, with --n_estimators as the largest forest
+    parser.add_argument("--search", action="store_true", help="tune hyperparameters instead of fitting one configuration")
+    parser.add_argument("--search-space", type=str, help="e.g. \"{'max_depth': [8, 16, None], 'min_samples_leaf': [1, 4]}\"")
+    parser.add_argument("--search-min-trees", type=int, default=10, help="forest size of the first rung")
+    parser.add_argument("--search-eta", type=int, default=3, help="keep the best 1/eta configurations per rung")
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--scoring", type=str, default="accuracy")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--random-state", type=int)
+    parser.add_argument("--checkpoint-dir", type=str, help="cache completed fold scores here (/opt/ml/checkpoints for spot training)")
+    
+
+    args = parser.parse_args()
+
+    train_file_check = check_s3_file_exists("ec2-utilization-sagemaker-model", f"sagemaker/mobile_price_classification/sklearncontainer/X_train-V-1.csv")
+    if not train_file_check:
+        raise FileNotFoundError(f"Training file X_train-V-1.csv not found in S3 path {args.train}")
+
+    # Parse parameters with safe_eval
+    #n_estimators = safe_eval(args.n_estimators)
+    #max_depth = safe_eval(args.max_depth)
+    #min_samples_split = safe_eval(args.min_samples_split)
+    #min_samples_leaf = safe_eval(args.min_samples_leaf)
+    n_estimators = args.n_estimators
+    max_depth = args.max_depth
+    min_samples_split = args.min_samples_split
+    min_samples_leaf = args.min_samples_leaf
+
+    # Check versions for logging
+    logger.info("SKLearn Version: %s", sklearn.__version__)
+    logger.info("Joblib Version: %s", joblib.__version__)
+
+    logger.info("[INFO] Reading data")
+    # Safely load data
+    
+    try:
+        X_train = pd.read_csv(os.path.join(args.train, args.X_train_file))
+        y_train = pd.read_csv(os.path.join(args.train, args.y_train_file))
+        X_test = pd.read_csv(os.path.join(args.test, args.X_test_file))
+        y_test = pd.read_csv(os.path.join(args.test, args.y_test_file))
+    except Exception as e:
+        logger.error(f"Error loading data: {e}")
+        raise
+
+    # Validate shapes of datasets
+    if X_train.shape[0] != y_train.shape[0]:
+        raise ValueError("Mismatch: X_train and y_train row counts are different!")
+    if X_test.shape[0] != y_test.shape[0]:
+        raise ValueError("Mismatch: X_test and y_test row counts are different!")
+
+    # Serving takes features in this order; test columns are matched by name
+    schema = feature_schema(X_train)
+    X_test = X_test[schema["features"]]
+    X_train_features = to_features(X_train, schema)
+    X_test_features = to_features(X_test, schema)
+
+    logger.info("Data Shape:")
+    logger.info("---- SHAPE OF TRAINING DATA (85%%) ---- %s", str(X_train.shape))
+    logger.info("---- SHAPE OF TESTING DATA (15%%) ---- %s", str(X_test.shape))
+
+    logger.info("Training RandomForest Model.....")
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train_features)
+    X_test_scaled = scaler.transform(X_test_features)
+    logger.info("Scalar completed.......")
+    # Encoding target
+    #encoder = LabelEncoder()
+    #y_train_encoded = encoder.fit_transform(y_train)
+    #y_test_encoded = encoder.transform(y_test)
+    y_train = y_train.ravel() if hasattr(y_train, 'ravel') else np.array(y_train).flatten()
+    y_test = y_test.ravel() if hasattr(y_test, 'ravel') else np.array(y_test).flatten()
+    # Fit and transform the encoder
+    encoder = LabelEncoder()
+    encoder.fit(np.concatenate([y_train, y_test]))  # Fit on both train and test labels
+
+    # Now transform separately
+    y_train_encoded = encoder.transform(y_train)
+    y_test_encoded = encoder.transform(y_test)
+
+    logger.info(f"y_train unique labels: {set(y_train)}")
+    logger.info(f"y_test unique labels: {set(y_test)}")
+    logger.info(f"Encoder classes: {encoder.classes_}")
+    logger.info(f"Test labels not in encoder: {set(y_test) - set(encoder.classes_)}")
+    training_started = time.perf_counter()
+    if args.search:
+        # Successive halving with warm-started forests, every fit in parallel
+        search = SuccessiveHalvingSearch(
+            space=safe_eval(args.search_space) if args.search_space else None, max_trees=n_estimators,
+            min_trees=args.search_min_trees, eta=args.search_eta, cv=args.cv, scoring=args.scoring,
+            n_jobs=args.n_jobs, random_state=args.random_state,
+            cache_path=os.path.join(args.checkpoint_dir, "search_cache.json") if args.checkpoint_dir else None
+        )
+        search.search(X_train_scaled, y_train)
+        best_params = search.best_params_
+        best_model = search.best_estimator_
+        search_report = dict(search.report(), wall_seconds=round(time.perf_counter() - training_started, 2))
+        search_report_path = os.path.join(args.output_data_dir or args.model_dir, "search_report.json")
+        with open(search_report_path, "w") as f:
+            json.dump(search_report, f, indent=2)
+        logger.info(f"Search metrics: {json.dumps(search_report['metrics'])}")
+        logger.info(f"Best CV {args.scoring}: {search.best_score_:.4f}; search report saved at {search_report_path}")
+    else:
+        best_params = {"n_estimators": n_estimators, "max_depth": max_depth,
+                       "min_samples_split": min_samples_split, "min_samples_leaf": min_samples_leaf}
+        best_model = RandomForestClassifier(n_jobs=args.n_jobs, random_state=args.random_state, **best_params)
+        best_model.fit(X_train_scaled, y_train)
+
+    logger.info("Best Parameters: %s", best_params)
+    logger.info(f"Training wall time: {time.perf_counter() - training_started:.1f}s")
+
+    # Save the scaler and the forest as one pipeline artifact, with the feature schema
+    model_path = os.path.join(args.model_dir, MODEL_FILE)
+    if args.export_trees or args.export_depth:
+        # Compacted forest plus its compiled copy, compressed; model_fn serves it like the full model
+        export_model = compact_forest(best_model, args.export_trees, args.export_depth)
+        pipeline = Pipeline([("scaler", scaler), ("forest", export_model)])
+        joblib.dump(build_artifact(pipeline, schema, compile_forest(pipeline)), model_path, compress=args.compress)
+        logger.info(f"Exported {export_model.n_estimators} trees pruned to depth {args.export_depth or best_model.max_depth}")
+    else:
+        pipeline = Pipeline([("scaler", scaler), ("forest", best_model)])
+        joblib.dump(build_artifact(pipeline, schema), model_path)
+
+    logger.info("Model pipeline persisted at %s", model_path)
+
+    # Predictions and evaluation, with the pipeline as saved
+    y_pred = pipeline.predict(X_test_features)
+    accuracy = accuracy_score(y_test, y_pred)
+    f1 = f1_score(y_test, y_pred, average='weighted')
+
+    # Log evaluation metrics
+    logger.info(f"Accuracy: {accuracy * 100:.2f}%")
+    logger.info(f"F1 Score: {f1:.2f}")
+    try:
+        roc_auc = roc_auc_score(y_test, pipeline.predict_proba(X_test_features)[:, 1])
+        logger.info(f"ROC AUC: {roc_auc:.2f}")
+    except ValueError:
+        logger.warning("ROC AUC unavailable — possibly a multi-class problem")
+
+    # The endpoint must reproduce these predictions from the saved artifact alone
+    check_serving_consistency(args.model_dir, X_test, y_pred)
+
+    if args.compact:
+        logger.info("Sweeping compacted models.....")
+        candidates = sweep(best_model, X_test_scaled, y_test, tree_counts=parse_int_list(args.compact_trees),
+                           depths=parse_int_list(args.compact_depths), compress=args.compress)
+        report_path = os.path.join(args.output_data_dir or args.model_dir, "compaction_report.json")
+        with open(report_path, "w") as f:
+            json.dump(candidates, f, indent=2)
+        logger.info("Compaction report (Pareto-optimal first):\n%s", format_report(candidates))
+        logger.info("Compaction report saved at %s", report_path)
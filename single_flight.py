@@ -0,0 +1,370 @@
+import json
+import os
+import threading
+import time
+
+from aws_clients import batch_put, is_conditional_failure
+
+# DynamoDB table holding one item per analysis in flight:
+# {"flight_key": ..., "leader": <request_id>, "status": "running" | "done", "waiters": [...], "result": <JSON>,
+#  "delivered": <bool, once the leader has written the waiters' rows or failed to>, "expires_at": ...}
+# (enable TTL on expires_at)
+FLIGHT_TABLE_NAME = "CloudCostInflight"
+
+# A leader that has not finished within its lease is presumed dead, and a waiting follower takes over
+FLIGHT_LEASE_SECONDS = int(os.environ.get("FLIGHT_LEASE_SECONDS", "90"))
+
+# How long a follower waits for the leader before computing the answer itself
+FOLLOWER_WAIT_SECONDS = float(os.environ.get("FOLLOWER_WAIT_SECONDS", "25"))
+
+# Finished flights only stay in the table for TTL cleanup; a new request after completion starts a new flight
+DONE_TTL_SECONDS = 3600
+
+# Follower polling: first read after 50 ms, growing 1.5x up to 500 ms
+INITIAL_POLL_SECONDS = 0.05
+MAX_POLL_SECONDS = 0.5
+POLL_MULTIPLIER = 1.5
+
+
+class LocalFlightStore:
+    """Flights in a dict behind one lock: coalesces the callers of a single process, e.g. in tests."""
+
+    def __init__(self):
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def start(self, key, leader, lease_until):
+        """Returns (True, None) if the caller now leads the flight, else (False, current flight).
+
+        Taking over an expired flight keeps its waiters, so the new leader delivers to them.
+        """
+        with self._lock:
+            item = self.items.get(key)
+            if item is not None and item["status"] == "running":
+                if item["expires_at"] >= time.time():
+                    return False, dict(item)
+                item.update(leader=leader, expires_at=lease_until)
+                return True, None
+            self.items[key] = {"leader": leader, "status": "running", "waiters": [], "result": None,
+                               "delivered": None, "expires_at": lease_until}
+            return True, None
+
+    def join(self, key, waiter):
+        """Adds the waiter to a running flight: (True, None), or (False, flight or None) if it is no longer running."""
+        with self._lock:
+            item = self.items.get(key)
+            if item is None or item["status"] != "running" or item["expires_at"] < time.time():
+                return False, dict(item) if item else None
+            item["waiters"].append(dict(waiter))
+            return True, None
+
+    def get(self, key):
+        with self._lock:
+            item = self.items.get(key)
+            return dict(item) if item else None
+
+    def finish(self, key, leader, result):
+        """Stores the result and returns the waiters to deliver it to; [] if the flight was taken over."""
+        with self._lock:
+            item = self.items.get(key)
+            if item is None or item["leader"] != leader:
+                return []
+            item.update(status="done", result=result, expires_at=time.time() + DONE_TTL_SECONDS)
+            return list(item["waiters"])
+
+    def set_delivered(self, key, leader, delivered):
+        with self._lock:
+            item = self.items.get(key)
+            if item is not None and item["leader"] == leader:
+                item["delivered"] = delivered
+
+    def abandon(self, key, leader):
+        with self._lock:
+            item = self.items.get(key)
+            if item is not None and item["leader"] == leader:
+                del self.items[key]
+
+
+class DynamoDBFlightStore:
+    """Flights in DynamoDB, so requests coalesce across every container.
+
+    Leadership is a conditional put (or, for an expired flight, a conditional update that keeps its
+    waiters) and followers register with a conditional list_append; finishing flips the status in one
+    conditional update that returns the waiter list, so no follower can join after the leader has read it.
+    """
+
+    def __init__(self, client, table_name=FLIGHT_TABLE_NAME):
+        self.client = client
+        self.table_name = table_name
+
+    def _key(self, key):
+        return {"flight_key": {"S": key}}
+
+    def _decode(self, item):
+        if not item:
+            return None
+        result = item.get("result", {}).get("S")
+        return {
+            "leader": item["leader"]["S"],
+            "status": item["status"]["S"],
+            "waiters": [{name: value["S"] for name, value in waiter["M"].items()}
+                        for waiter in item.get("waiters", {}).get("L", [])],
+            "result": json.loads(result) if result is not None else None,
+            "delivered": item.get("delivered", {}).get("BOOL"),
+            "expires_at": float(item["expires_at"]["N"])
+        }
+
+    def start(self, key, leader, lease_until):
+        """Returns (True, None) if the caller now leads the flight, else (False, current flight)."""
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "flight_key": {"S": key},
+                    "leader": {"S": leader},
+                    "status": {"S": "running"},
+                    "waiters": {"L": []},
+                    "expires_at": {"N": str(int(lease_until))}
+                },
+                # A finished flight is replaced; a running one is only taken over below, keeping its waiters
+                ConditionExpression="attribute_not_exists(flight_key) OR #status = :done",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":done": {"S": "done"}},
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+            flight = self._decode(e.response.get("Item"))
+            if flight is None or flight["expires_at"] >= time.time():
+                return False, flight
+            return self._take_over(key, leader, lease_until)
+        return True, None
+
+    def _take_over(self, key, leader, lease_until):
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self._key(key),
+                UpdateExpression="SET leader = :leader, expires_at = :lease",
+                # TTL deletion lags, so expiry is checked here
+                ConditionExpression="#status = :running AND expires_at < :now",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={
+                    ":leader": {"S": leader},
+                    ":lease": {"N": str(int(lease_until))},
+                    ":running": {"S": "running"},
+                    ":now": {"N": str(int(time.time()))}
+                },
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+            return False, self._decode(e.response.get("Item"))
+        return True, None
+
+    def join(self, key, waiter):
+        """Adds the waiter to a running flight: (True, None), or (False, flight or None) if it is no longer running."""
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self._key(key),
+                UpdateExpression="SET waiters = list_append(waiters, :waiter)",
+                ConditionExpression="#status = :running AND expires_at >= :now",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={
+                    ":waiter": {"L": [{"M": {name: {"S": str(value)} for name, value in waiter.items()
+                                                  if value is not None}}]},
+                    ":running": {"S": "running"},
+                    ":now": {"N": str(int(time.time()))}
+                },
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+            return False, self._decode(e.response.get("Item"))
+        return True, None
+
+    def get(self, key):
+        item = self.client.get_item(TableName=self.table_name, Key=self._key(key), ConsistentRead=True).get("Item")
+        return self._decode(item)
+
+    def finish(self, key, leader, result):
+        """Stores the result and returns the waiters to deliver it to; [] if the flight was taken over."""
+        try:
+            response = self.client.update_item(
+                TableName=self.table_name,
+                Key=self._key(key),
+                UpdateExpression="SET #status = :done, #result = :result, expires_at = :expires",
+                ConditionExpression="leader = :leader",
+                ExpressionAttributeNames={"#status": "status", "#result": "result"},
+                ExpressionAttributeValues={
+                    ":done": {"S": "done"},
+                    ":result": {"S": json.dumps(result)},
+                    ":expires": {"N": str(int(time.time() + DONE_TTL_SECONDS))},
+                    ":leader": {"S": leader}
+                },
+                ReturnValues="ALL_NEW"
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+            return []
+        return self._decode(response["Attributes"])["waiters"]
+
+    def set_delivered(self, key, leader, delivered):
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self._key(key),
+                UpdateExpression="SET delivered = :delivered",
+                ConditionExpression="leader = :leader",
+                ExpressionAttributeValues={":delivered": {"BOOL": delivered}, ":leader": {"S": leader}}
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+
+    def abandon(self, key, leader):
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key=self._key(key),
+                ConditionExpression="leader = :leader",
+                ExpressionAttributeValues={":leader": {"S": leader}}
+            )
+        except Exception as e:
+            if not is_conditional_failure(e):
+                raise
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers of the same key share its result.
+
+    The first caller leads and computes; callers arriving while it runs register as waiters and wait.
+    When the leader finishes it hands the result to deliver(waiters, result), which writes every
+    waiting session's response row, so backend calls scale with distinct questions rather than users.
+    A follower only leaves its row to the leader once the leader has recorded a successful delivery
+    that included it; otherwise it writes the row itself. A follower whose leader fails or outlives its
+    lease takes over; one that waits longer than wait_seconds computes the answer itself. Results must
+    be JSON-serializable.
+    """
+
+    def __init__(self, store, deliver, lease_seconds=FLIGHT_LEASE_SECONDS, wait_seconds=FOLLOWER_WAIT_SECONDS):
+        self.store = store
+        self.deliver = deliver
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.metrics = {"leader": 0, "follower": 0, "late": 0, "solo": 0, "takeovers": 0, "delivered": 0,
+                        "undelivered": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.metrics[name] += value
+
+    def _lead(self, key, leader, compute):
+        try:
+            result = compute()
+        except Exception:
+            try:
+                self.store.abandon(key, leader)
+            except Exception as e:
+                print(f"Failed to abandon flight {key}: {str(e)}")
+            raise
+
+        try:
+            # Waiters that re-joined after a takeover are listed more than once, and a follower that took
+            # over may still be listed as a waiter itself
+            waiters = list({waiter["request_id"]: waiter for waiter in self.store.finish(key, leader, result)
+                            if waiter["request_id"] != leader}.values())
+            if waiters:
+                self.deliver(waiters, result)
+                self._count("delivered", len(waiters))
+            delivered = True
+        except Exception as e:
+            print(f"Failed to deliver flight {key}: {str(e)}")
+            delivered = False
+        try:
+            self.store.set_delivered(key, leader, delivered)
+        except Exception as e:
+            # Followers still waiting for the flag write their own rows at their deadline
+            print(f"Failed to record delivery of flight {key}: {str(e)}")
+        return result
+
+    def _wait(self, key, request_id, deadline):
+        """Polls the flight: ("done", result) once the leader delivered to this caller, ("undelivered",
+        result) when it finished without doing so, ("retry", None) when it was abandoned or its lease
+        lapsed, ("timeout", None) at the deadline."""
+        delay = INITIAL_POLL_SECONDS
+        item = None
+        while time.time() < deadline:
+            time.sleep(min(delay, max(0.0, deadline - time.time())))
+            delay = min(delay * POLL_MULTIPLIER, MAX_POLL_SECONDS)
+            item = self.store.get(key)
+            if item is None or (item["status"] == "running" and item["expires_at"] < time.time()):
+                return "retry", None
+            if item["status"] == "done" and item["delivered"] is not None:
+                delivered_to = {waiter["request_id"] for waiter in item["waiters"]}
+                if item["delivered"] and request_id in delivered_to:
+                    return "done", item["result"]
+                return "undelivered", item["result"]
+        if item is not None and item["status"] == "done":
+            return "undelivered", item["result"]
+        return "timeout", None
+
+    def run(self, key, waiter, compute):
+        """Returns (result, role). waiter is {"session_id", "request_id", ...} for the caller's response row.
+
+        role is "leader", "late" (the flight finished as the caller arrived, or without delivering to it)
+        or "solo" (computed alone after a store failure or a timed-out wait), when the caller must still
+        write its own row; or "follower", when the leader has delivered the result to it.
+        """
+        deadline = time.time() + self.wait_seconds
+        leader = waiter["request_id"]
+        takeover = False
+        while True:
+            if takeover and time.time() >= deadline:
+                self._count("solo")
+                return compute(), "solo"
+            try:
+                started, flight = self.store.start(key, leader, time.time() + self.lease_seconds)
+                if not started:
+                    joined, flight = self.store.join(key, waiter)
+            except Exception as e:
+                # Losing coalescing is better than losing the request
+                print(f"Single-flight claim for {key} failed: {str(e)}")
+                self._count("solo")
+                return compute(), "solo"
+
+            if started:
+                self._count("leader")
+                if takeover:
+                    self._count("takeovers")
+                return self._lead(key, leader, compute), "leader"
+
+            if not joined:
+                if flight is not None and flight["status"] == "done":
+                    self._count("late")
+                    return flight["result"], "late"
+                # Expired or gone between the two calls; claim again
+                takeover = True
+                continue
+
+            try:
+                outcome, result = self._wait(key, leader, deadline)
+            except Exception as e:
+                print(f"Single-flight wait for {key} failed: {str(e)}")
+                outcome, result = "timeout", None
+            if outcome == "done":
+                self._count("follower")
+                return result, "follower"
+            if outcome == "undelivered":
+                self._count("undelivered")
+                return result, "late"
+            if outcome == "timeout":
+                self._count("solo")
+                return compute(), "solo"
+            takeover = True
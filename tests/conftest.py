@@ -0,0 +1,13 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+X_TEST_PATH = os.path.join(REPO_ROOT, "sagemaker_project", "X_test-V-1.csv")
+
+# The Lambda modules live at the repository root and the model code in sagemaker_project, as in benchmarks/
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, "sagemaker_project")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Modules build their boto3 clients lazily, but script.py creates its S3 client at import
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from cost_cache import PARTIAL_TTL_SECONDS, CostCache, LocalCostStore, days_in_range
+
+
+class CostExplorer:
+    """fetch_costs callback returning one amount per day, tagged with the call it came from."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        return {day: {"AWS Lambda": float(len(self.calls))} for day in days_in_range(start, end)}
+
+
+@pytest.fixture
+def today():
+    return datetime.utcnow().date()
+
+
+def day(today, offset):
+    return str(today + timedelta(days=offset))
+
+
+def test_closed_days_are_served_from_the_store(today):
+    store, cost_explorer = LocalCostStore(), CostExplorer()
+    start, end = day(today, -30), day(today, -10)
+    CostCache(store, cost_explorer).get_daily_costs(start, end)
+
+    # A new container shares the store
+    cache = CostCache(store, cost_explorer)
+    costs = cache.get_daily_costs(start, end)
+
+    assert cost_explorer.calls == [(start, end)]
+    assert list(costs) == days_in_range(start, end)
+    assert cache.metrics["ce_calls_avoided"] == 1 and cache.hit_rate() == 1.0
+
+
+def test_partial_days_are_refetched_once_stale(today):
+    store, cost_explorer = LocalCostStore(), CostExplorer()
+    cache = CostCache(store, cost_explorer)
+    start, end = day(today, -5), day(today, 1)
+
+    cache.get_daily_costs(start, end)
+    # Within PARTIAL_TTL_SECONDS the open days are served from the store too
+    cache.get_daily_costs(start, end)
+    assert len(cost_explorer.calls) == 1
+    assert [entry["final"] for entry in store.get_days(days_in_range(start, end)).values()] == \
+        [True, True, True, True, False, False]
+
+    for entry in store.items.values():
+        if not entry["final"]:
+            entry["fetched_at"] -= PARTIAL_TTL_SECONDS + 1
+    costs = cache.get_daily_costs(start, end)
+
+    # Only yesterday and today are asked for again; the closed days keep their first values
+    assert cost_explorer.calls[1] == (day(today, -1), day(today, 1))
+    assert [costs[d]["AWS Lambda"] for d in days_in_range(start, end)] == [1.0, 1.0, 1.0, 1.0, 2.0, 2.0]
+
+
+def test_scattered_missing_days_are_fetched_in_one_call(today):
+    store, cost_explorer = LocalCostStore(), CostExplorer()
+    days = days_in_range(day(today, -20), day(today, -10))
+    store.put_days({d: {"costs": {"AWS Lambda": 0.5}, "final": True, "fetched_at": 0} for d in days
+                    if d not in (days[2], days[6])})
+
+    cache = CostCache(store, cost_explorer)
+    costs = cache.get_daily_costs(days[0], day(today, -10))
+
+    assert cost_explorer.calls == [(days[2], days[7])]
+    assert costs[days[2]] == costs[days[6]] == {"AWS Lambda": 1.0}
+    # Days inside the span that were already cached are not overwritten
+    assert costs[days[4]] == store.items[days[4]]["costs"] == {"AWS Lambda": 0.5}
@@ -0,0 +1,103 @@
+import json
+import time
+
+import pytest
+
+import LambdaSqsStepFunction
+from idempotency import LocalClaimStore, intake_key, message_key
+
+
+def test_claim_is_retaken_only_by_its_owner_while_in_progress():
+    store = LocalClaimStore()
+    lease = time.time() + 60
+
+    assert store.claim("request#1", "message-a", lease) == (True, "message-a", "in_progress")
+    # A redelivery of the same message after its consumer died retakes the claim
+    assert store.claim("request#1", "message-a", lease) == (True, "message-a", "in_progress")
+    # Another message for the same request is turned away while the first is in flight
+    assert store.claim("request#1", "message-b", lease) == (False, "message-a", "in_progress")
+
+    store.complete("request#1", "message-a", lease)
+    # Once done, every delivery is a duplicate, the original message's included
+    assert store.claim("request#1", "message-a", lease) == (False, "message-a", "done")
+    assert store.claim("request#1", "message-b", lease) == (False, "message-a", "done")
+
+
+def test_expired_and_released_claims_are_free():
+    store = LocalClaimStore()
+    store.claim("request#1", "message-a", time.time() - 1)
+    assert store.claim("request#1", "message-b", time.time() + 60)[0]
+
+    store.release("request#1")
+    assert store.claim("request#1", "message-c", time.time() + 60) == (True, "message-c", "in_progress")
+
+
+def test_intake_key_normalizes_the_transcript_within_a_window():
+    assert intake_key("s", "Is  i-1 right-sized?", 120) == intake_key("s", "is i-1 RIGHT-SIZED? ", 170)
+    assert intake_key("s", "Is i-1 right-sized?", 120) != intake_key("s", "Is i-1 right-sized?", 185)
+    assert intake_key("s", "Is i-1 right-sized?", 120) != intake_key("t", "Is i-1 right-sized?", 120)
+
+
+@pytest.fixture
+def consumer(monkeypatch):
+    """LambdaSqsStepFunction in direct mode on a local claim store, with a recording EC2 handler."""
+    store = LocalClaimStore()
+    handled = []
+    responses = {}
+
+    def handler(event, context):
+        handled.append(event["request_id"])
+        return responses.get(event["request_id"], {"statusCode": 200})
+
+    monkeypatch.setattr(LambdaSqsStepFunction, "claim_store", store)
+    monkeypatch.setattr(LambdaSqsStepFunction, "ROUTING_MODE", "direct")
+    monkeypatch.setitem(LambdaSqsStepFunction._handler_cache, "LambdaSagemakerInvocation", handler)
+    return store, handled, responses
+
+
+def deliver(*records):
+    event = {"Records": [
+        {"messageId": message_id, "body": json.dumps({"request_id": request_id, "intent_name": "CheckInstanceSize"})}
+        for message_id, request_id in records
+    ]}
+    return LambdaSqsStepFunction.lambda_handler(event, None)["batchItemFailures"]
+
+
+def test_processed_request_is_not_handled_again(consumer):
+    store, handled, _ = consumer
+    assert deliver(("message-a", "request-1")) == []
+    assert store.items[message_key("request-1")]["status"] == "done"
+
+    # SQS redelivers the acknowledged message, and a second message carries the same request
+    assert deliver(("message-a", "request-1"), ("message-b", "request-1")) == []
+    assert handled == ["request-1"]
+
+
+def test_redelivery_of_an_abandoned_message_is_processed(consumer):
+    store, handled, _ = consumer
+    # The first consumer claimed the message and died before finishing; SQS redelivers it
+    store.claim(message_key("request-1"), "message-a", time.time() + 900)
+
+    assert deliver(("message-a", "request-1")) == []
+    assert handled == ["request-1"]
+
+
+def test_request_in_flight_under_another_message_is_retried(consumer):
+    store, handled, _ = consumer
+    store.claim(message_key("request-1"), "message-a", time.time() + 900)
+
+    assert deliver(("message-b", "request-1")) == [{"itemIdentifier": "message-b"}]
+    assert handled == []
+    assert store.items[message_key("request-1")]["owner"] == "message-a"
+
+
+def test_failed_message_releases_its_claim_for_the_retry(consumer):
+    store, handled, responses = consumer
+    responses["request-1"] = {"statusCode": 500, "body": "endpoint unavailable"}
+
+    assert deliver(("message-a", "request-1")) == [{"itemIdentifier": "message-a"}]
+    assert message_key("request-1") not in store.items
+
+    del responses["request-1"]
+    assert deliver(("message-a", "request-1")) == []
+    assert handled == ["request-1", "request-1"]
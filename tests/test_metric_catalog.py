@@ -0,0 +1,78 @@
+import json
+import time
+
+from metric_catalog import FileCatalogStore, MetricCatalog
+
+
+class ListMetrics:
+    """list_metrics callback whose answer changes with every call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, namespace):
+        self.calls += 1
+        return [{"MetricName": f"Invocations{self.calls}", "Dimensions": [{"Name": "FunctionName", "Value": "f"}]}]
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def seed(path, refreshed_at):
+    FileCatalogStore(path).save("AWS/Lambda", {"metrics": [{"MetricName": "Invocations0", "Dimensions": []}],
+                                               "refreshed_at": refreshed_at})
+
+
+def names(metrics):
+    return [metric["MetricName"] for metric in metrics]
+
+
+def test_new_container_starts_from_the_stored_catalog(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    list_metrics = ListMetrics()
+    MetricCatalog(FileCatalogStore(path), list_metrics).get_metrics("AWS/Lambda")
+
+    catalog = MetricCatalog(FileCatalogStore(path), list_metrics)
+    assert names(catalog.get_metrics("AWS/Lambda")) == ["Invocations1"]
+    assert list_metrics.calls == 1
+
+
+def test_entry_past_ttl_is_served_and_refreshed_in_background(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    seed(path, time.time() - 120)
+    list_metrics = ListMetrics()
+    catalog = MetricCatalog(FileCatalogStore(path), list_metrics, ttl_seconds=60)
+
+    assert names(catalog.get_metrics("AWS/Lambda")) == ["Invocations0"]
+    wait_until(lambda: list_metrics.calls == 1 and not catalog._refreshing)
+
+    assert names(catalog.get_metrics("AWS/Lambda")) == ["Invocations1"]
+    with open(path) as f:
+        assert time.time() - json.load(f)["AWS/Lambda"]["refreshed_at"] < 60
+    assert list_metrics.calls == 1
+
+
+def test_entry_past_max_stale_is_refreshed_before_returning(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    seed(path, time.time() - 7200)
+    list_metrics = ListMetrics()
+    catalog = MetricCatalog(FileCatalogStore(path), list_metrics, ttl_seconds=60, max_stale_seconds=3600)
+
+    assert names(catalog.get_metrics("AWS/Lambda")) == ["Invocations1"]
+    assert list_metrics.calls == 1
+
+
+def test_unreadable_store_falls_back_to_list_metrics(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text("{not json")
+    list_metrics = ListMetrics()
+    catalog = MetricCatalog(FileCatalogStore(str(path)), list_metrics)
+
+    # The read fails and so does the write (the file cannot be parsed to merge into)
+    assert names(catalog.get_metrics("AWS/Lambda")) == ["Invocations1"]
+    assert names(catalog.get_metrics("AWS/Lambda")) == ["Invocations1"]
+    assert list_metrics.calls == 1
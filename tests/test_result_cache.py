@@ -0,0 +1,50 @@
+import time
+
+from result_cache import LocalResultStore, ResultCache, prediction_key, usage_key
+
+
+class BrokenStore:
+    def get(self, key):
+        raise RuntimeError("throttled")
+
+    def put(self, key, value, expires_at):
+        raise RuntimeError("throttled")
+
+
+def test_other_containers_hit_the_shared_store():
+    store = LocalResultStore()
+    ResultCache(store).put("prediction#i-1#1", ["t3.small"], time.time() + 60)
+
+    cache = ResultCache(store)
+    assert cache.get("prediction#i-1#1") == (["t3.small"], "l2")
+    assert cache.get("prediction#i-1#1") == (["t3.small"], "l1")
+    assert cache.hit_rate() == 1.0
+
+
+def test_expired_entries_are_misses():
+    store = LocalResultStore()
+    cache = ResultCache(store)
+    cache.put("prediction#i-1#1", ["t3.small"], time.time() - 1)
+
+    assert cache.get("prediction#i-1#1") == (None, None)
+    assert ResultCache(store).get("prediction#i-1#1") == (None, None)
+
+
+def test_failing_store_never_fails_the_caller():
+    cache = ResultCache(BrokenStore())
+    assert cache.get("prediction#i-1#1") == (None, None)
+
+    # The write only reaches this container's L1
+    cache.put("prediction#i-1#1", ["t3.small"], time.time() + 60)
+    assert cache.get("prediction#i-1#1") == (["t3.small"], "l1")
+    assert cache.metrics["store_errors"] == 2
+
+
+def test_keys():
+    key, expires_at = prediction_key("i-1", timestamp=601)
+    assert (key, expires_at) == ("prediction#i-1#2", 900)
+    assert usage_key("Lambda", "2025-04-01", "2025-04-15", now=time.mktime((2025, 5, 1, 0, 0, 0, 0, 0, -1)))[0] == \
+        "usage#Lambda#2025-04-01#2025-04-15"
+    # A range that includes days Cost Explorer may still revise is not cached
+    assert usage_key("Lambda", "2025-04-01", "2025-04-15", now=time.mktime((2025, 4, 14, 0, 0, 0, 0, 0, -1))) == \
+        (None, None)
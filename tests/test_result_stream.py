@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from result_stream import LocalChangeStream, ResultBroker, stream_records_to_results
+
+
+def test_ready_rows_reach_the_sessions_subscribers():
+    table, broker = LocalChangeStream(), ResultBroker()
+    queue = broker.subscribe("session-1")
+    other = broker.subscribe("session-2")
+    table.subscribe(lambda records: [broker.publish(result) for result in stream_records_to_results(records)])
+
+    table.put_item(Item={"session_id": "session-1", "request_id": "request-1", "status": "processing"})
+    assert queue.empty()
+
+    table.put_item(Item={"session_id": "session-1", "request_id": "request-1", "status": "ready", "response": "t3.small"})
+    assert queue.get_nowait() == {"session_id": "session-1", "request_id": "request-1", "status": "ready",
+                                  "response": "t3.small"}
+    assert other.empty()
+
+
+def test_only_inserts_and_modifies_with_a_ready_image_are_results():
+    records = []
+    table = LocalChangeStream()
+    table.subscribe(records.extend)
+    table.put_item(Item={"session_id": "s", "request_id": "r", "status": "ready"})
+    table.put_item(Item={"session_id": "s", "request_id": "r", "status": "ready"})
+
+    assert [record["eventName"] for record in records] == ["INSERT", "MODIFY"]
+    assert len(stream_records_to_results(records)) == 2
+    assert stream_records_to_results([dict(records[0], eventName="REMOVE")]) == []
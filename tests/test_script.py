@@ -0,0 +1,84 @@
+"""script.py serving path: a pipeline trained on the sample metrics, saved as the training job saves it,
+must score the same through model_fn / predict_fn as pipeline.predict does."""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+import script
+from conftest import X_TEST_PATH
+from rf_compiler import COMPILED_MAX_BATCH_ROWS, compile_forest
+
+INSTANCE_TYPES = np.array(["t3a.micro", "t3.small", "t3.medium", "t3.large", "m5.4xlarge"])
+
+
+@pytest.fixture(scope="module")
+def sample():
+    X = pd.read_csv(X_TEST_PATH).head(600)
+    # Labels from CPU and network load, so the forest has real splits on several features
+    load = X["CPUUtilization"].rank(pct=True) + X["NetworkOut"].rank(pct=True)
+    y = INSTANCE_TYPES[np.minimum((load / 2 * len(INSTANCE_TYPES)).astype(int), len(INSTANCE_TYPES) - 1)]
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def pipeline(sample):
+    X, y = sample
+    forest = RandomForestClassifier(n_estimators=12, max_depth=6, random_state=0)
+    return Pipeline([("scaler", StandardScaler()), ("forest", forest)]).fit(X, y)
+
+
+@pytest.fixture(params=["exported", "compiled_at_load"])
+def model_dir(request, tmp_path, sample, pipeline):
+    X, _ = sample
+    forest = compile_forest(pipeline) if request.param == "exported" else None
+    joblib.dump(script.build_artifact(pipeline, script.feature_schema(X), forest),
+                os.path.join(tmp_path, script.MODEL_FILE))
+    return str(tmp_path)
+
+
+def test_predict_fn_matches_pipeline(model_dir, sample, pipeline):
+    X, _ = sample
+    bundle = script.model_fn(model_dir)
+    assert bundle.forest is not None
+    expected = pipeline.predict(X)
+
+    # Above COMPILED_MAX_BATCH_ROWS the pipeline scores; at or below it the compiled forest does
+    assert len(X) > COMPILED_MAX_BATCH_ROWS
+    np.testing.assert_array_equal(script.predict_fn(X, bundle), expected)
+    np.testing.assert_array_equal(script.predict_fn(X.head(COMPILED_MAX_BATCH_ROWS), bundle),
+                                  expected[:COMPILED_MAX_BATCH_ROWS])
+    np.testing.assert_array_equal(script.predict_fn(X.head(1).values.tolist(), bundle), expected[:1])
+
+
+def test_predict_fn_accepts_records_in_any_key_order(model_dir, sample, pipeline):
+    X, _ = sample
+    bundle = script.model_fn(model_dir)
+    records = [dict(reversed(list(row.items()))) for row in X.head(20).to_dict(orient="records")]
+    np.testing.assert_array_equal(script.predict_fn(records, bundle), pipeline.predict(X.head(20)))
+
+
+def test_predict_fn_rejects_missing_features(model_dir, sample):
+    X, _ = sample
+    bundle = script.model_fn(model_dir)
+    record = X.head(1).to_dict(orient="records")[0]
+    del record["NetworkIn"]
+    with pytest.raises(ValueError, match="NetworkIn"):
+        script.predict_fn(record, bundle)
+
+
+def test_model_fn_serves_uncompilable_pipeline(tmp_path, sample):
+    X, y = sample
+    # compile_forest only handles forests; model_fn must still serve any other estimator through the pipeline
+    pipeline = Pipeline([("scaler", StandardScaler()), ("model", DummyClassifier())]).fit(X, y)
+    joblib.dump(script.build_artifact(pipeline, script.feature_schema(X)), os.path.join(tmp_path, script.MODEL_FILE))
+    bundle = script.model_fn(str(tmp_path))
+    assert bundle.forest is None
+    np.testing.assert_array_equal(script.predict_fn(X.head(5), bundle), pipeline.predict(X.head(5)))
+
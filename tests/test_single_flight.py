@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import LocalFlightStore, SingleFlight
+
+
+def waiter(index):
+    return {"session_id": f"session-{index}", "request_id": f"request-{index}"}
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+class Recorder:
+    """deliver callback that remembers who each result was written for."""
+
+    def __init__(self):
+        self.delivered = []
+
+    def __call__(self, waiters, result):
+        self.delivered.extend(waiter["request_id"] for waiter in waiters)
+
+
+def test_concurrent_callers_race_for_one_lease():
+    store, deliver = LocalFlightStore(), Recorder()
+    flight = SingleFlight(store, deliver, wait_seconds=5)
+    release = threading.Event()
+    computed = []
+
+    def compute():
+        computed.append(1)
+        release.wait(5)
+        return {"instance_type": "t3.small"}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.run, "i-1", waiter(index), compute) for index in range(8)]
+        wait_until(lambda: len((store.get("i-1") or {}).get("waiters", [])) == 7)
+        release.set()
+        outcomes = [future.result() for future in futures]
+
+    assert len(computed) == 1
+    roles = [role for _, role in outcomes]
+    assert sorted(roles) == ["follower"] * 7 + ["leader"]
+    assert all(result == {"instance_type": "t3.small"} for result, _ in outcomes)
+
+    leader = f"request-{roles.index('leader')}"
+    assert sorted(deliver.delivered) == sorted(f"request-{index}" for index in range(8) if f"request-{index}" != leader)
+    assert store.get("i-1")["status"] == "done" and store.get("i-1")["delivered"] is True
+
+
+def test_follower_takes_over_when_leader_fails():
+    store, deliver = LocalFlightStore(), Recorder()
+    flight = SingleFlight(store, deliver, wait_seconds=5)
+    joined = threading.Event()
+
+    def failing_compute():
+        joined.wait(5)
+        raise RuntimeError("endpoint unavailable")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.run, "i-1", waiter(0), failing_compute)
+        wait_until(lambda: store.get("i-1") is not None)
+        follower = pool.submit(flight.run, "i-1", waiter(1), lambda: {"instance_type": "t3.medium"})
+        # The leader fails only once the follower is waiting on it
+        wait_until(lambda: len(store.get("i-1")["waiters"]) == 1)
+        joined.set()
+        with pytest.raises(RuntimeError, match="endpoint unavailable"):
+            leader.result()
+        result, role = follower.result()
+
+    assert (result, role) == ({"instance_type": "t3.medium"}, "leader")
+    assert flight.metrics["takeovers"] == 1
+    assert store.get("i-1")["leader"] == "request-1"
+
+
+def test_expired_leader_is_taken_over_with_its_waiters():
+    store, deliver = LocalFlightStore(), Recorder()
+    # A leader whose container died mid-computation, with a follower registered before it did
+    store.start("i-1", "request-dead", time.time() + 60)
+    store.join("i-1", waiter(1))
+    store.items["i-1"]["expires_at"] = time.time() - 1
+
+    flight = SingleFlight(store, deliver, wait_seconds=5)
+    result, role = flight.run("i-1", waiter(2), lambda: {"instance_type": "t3.large"})
+
+    assert (result, role) == ({"instance_type": "t3.large"}, "leader")
+    assert deliver.delivered == ["request-1"]
+    assert store.get("i-1")["leader"] == "request-2"
+
+
+def test_follower_computes_alone_after_its_wait():
+    store = LocalFlightStore()
+    # A live leader that will not finish in time
+    store.start("i-1", "request-slow", time.time() + 60)
+    flight = SingleFlight(store, Recorder(), wait_seconds=0.3)
+
+    started = time.time()
+    result, role = flight.run("i-1", waiter(1), lambda: {"instance_type": "t3.micro"})
+
+    assert (result, role) == ({"instance_type": "t3.micro"}, "solo")
+    assert time.time() - started >= 0.3
+    assert flight.metrics["solo"] == 1
+    assert store.get("i-1")["leader"] == "request-slow"
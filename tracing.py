@@ -0,0 +1,224 @@
+"""Per-invocation latency tracing for the Lambda handlers, emitted as CloudWatch Embedded Metric Format.
+
+Wrap a handler with @traced_handler("Name") and time its phases with `with phase("predict"):`.
+Every AWS call made through the shared session in aws_clients is timed by botocore hooks and
+attributed to the invocation that made it, including calls from worker threads started with
+submit_in_context(). When the handler returns, one EMF log line is printed:
+
+    {"_aws": {...}, "Function": "LambdaSagemakerInvocation", "request_id": "...",
+     "Duration": 212.4, "RequestAge": [1840], "Phase.predict": [31.2], "AwsCall.sagemaker-runtime.InvokeEndpoint": [30.9], ...}
+
+CloudWatch turns it into metrics under TRACE_NAMESPACE with the Function dimension; values are
+recorded as arrays, so p50/p99 statistics reflect every call. request_id and session_id stay as
+log properties for correlation in Logs Insights. RequestAge is the time since LexToSQSHandler minted
+the request ID (its millisecond prefix), so each stage reports how far into the request it is.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() not in ("0", "false", "no")
+TRACE_NAMESPACE = os.environ.get("TRACE_NAMESPACE", "CloudCostChatbot")
+
+# EMF accepts at most 100 values per metric per document
+MAX_VALUES_PER_METRIC = 100
+
+_current = contextvars.ContextVar("trace", default=None)
+
+# "service.Operation" per botocore OperationModel, and the serialized EMF definition per metric name and
+# unit; both sets are small and fixed, so the per-call and per-invocation work is a dict lookup
+_operation_names = {}
+_metric_definitions = {}
+
+
+class Trace:
+    """Timings for one handler invocation; shared by the worker threads it starts."""
+
+    def __init__(self, function_name, request_id=None, session_id=None):
+        self.function_name = function_name
+        self.request_ids = [request_id] if request_id else []
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.calls = {}
+        self.counters = {}
+        self.properties = {}
+        self._lock = threading.Lock()
+
+    def add_request_id(self, request_id):
+        with self._lock:
+            if request_id and request_id not in self.request_ids:
+                self.request_ids.append(request_id)
+
+    def add_phase(self, name, milliseconds):
+        with self._lock:
+            self.phases.setdefault(name, []).append(milliseconds)
+
+    def add_call(self, name, milliseconds):
+        with self._lock:
+            self.calls.setdefault(name, []).append(milliseconds)
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_emf_line(self, duration_ms, timestamp_ms=None):
+        """The EMF document as one JSON line; the metric definitions are spliced in from the cache."""
+        timestamp_ms = timestamp_ms or int(time.time() * 1000)
+        values = {"Duration": round(duration_ms, 3)}
+        ages = [timestamp_ms - minted for minted in map(request_minted_at, self.request_ids) if minted]
+        if ages:
+            values["RequestAge"] = ages[:MAX_VALUES_PER_METRIC]
+        with self._lock:
+            for name, timings in self.phases.items():
+                values["Phase." + name] = [round(ms, 3) for ms in timings[:MAX_VALUES_PER_METRIC]]
+            call_time, call_count = 0.0, 0
+            for name, timings in self.calls.items():
+                values["AwsCall." + name] = [round(ms, 3) for ms in timings[:MAX_VALUES_PER_METRIC]]
+                call_time += sum(timings)
+                call_count += len(timings)
+            counters = dict(self.counters)
+            properties = dict(self.properties)
+        if call_count:
+            values["AwsCallTime"] = round(call_time, 3)
+            counters["AwsCalls"] = call_count
+        values.update(counters)
+
+        metrics = ",".join(metric_definition(name, name in counters) for name in values)
+        document = {"Function": self.function_name}
+        if len(self.request_ids) == 1:
+            document["request_id"] = self.request_ids[0]
+        elif self.request_ids:
+            document["request_ids"] = self.request_ids
+        if self.session_id:
+            document["session_id"] = self.session_id
+        document.update(properties)
+        document.update(values)
+        body = json.dumps(document, separators=(",", ":"), default=str)
+        return (f'{{"_aws":{{"Timestamp":{timestamp_ms},"CloudWatchMetrics":[{{"Namespace":{json.dumps(TRACE_NAMESPACE)},'
+                f'"Dimensions":[["Function"]],"Metrics":[{metrics}]}}]}},{body[1:]}')
+
+
+def metric_definition(name, is_count):
+    """Serialized {"Name": ..., "Unit": ...} entry of the EMF Metrics list, built once per metric."""
+    key = (name, is_count)
+    definition = _metric_definitions.get(key)
+    if definition is None:
+        definition = json.dumps({"Name": name, "Unit": "Count" if is_count else "Milliseconds"}, separators=(",", ":"))
+        _metric_definitions[key] = definition
+    return definition
+
+
+def request_minted_at(request_id):
+    """Epoch milliseconds from a LexToSQSHandler request ID ("<13-digit ms>-<uuid>"), else None."""
+    prefix = str(request_id)[:13]
+    return int(prefix) if len(prefix) == 13 and prefix.isdigit() else None
+
+
+def set_request_id(request_id):
+    trace = _current.get()
+    if trace is not None:
+        trace.add_request_id(request_id)
+
+
+def count(name, value=1):
+    """Adds to a Count metric of the current invocation, e.g. cache hits."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_count(name, value)
+
+
+def set_property(name, value):
+    trace = _current.get()
+    if trace is not None:
+        trace.properties[name] = value
+
+
+class phase:
+    """Context manager timing one named phase of the current invocation."""
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = _current.get()
+        if trace is not None:
+            trace.add_phase(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+def submit_in_context(executor, fn, *args):
+    """executor.submit() that keeps the caller's trace, so calls on the worker thread are attributed to it."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def traced_handler(function_name):
+    """Decorator for lambda_handler: opens a trace, and prints it as one EMF line when the handler returns."""
+
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not TRACING_ENABLED:
+                return handler(event, context)
+
+            event_dict = event if isinstance(event, dict) else {}
+            trace = Trace(
+                function_name,
+                request_id=event_dict.get("request_id") or event_dict.get("requestId"),
+                session_id=event_dict.get("session_id") or event_dict.get("sessionId")
+            )
+            token = _current.set(trace)
+            status_code = None
+            try:
+                result = handler(event, context)
+                if isinstance(result, dict):
+                    status_code = result.get("statusCode")
+                return result
+            except Exception:
+                status_code = 500
+                raise
+            finally:
+                _current.reset(token)
+                if status_code is not None:
+                    trace.properties["status_code"] = status_code
+                duration_ms = (time.perf_counter() - trace.started) * 1000
+                print(trace.to_emf_line(duration_ms))
+
+        return wrapper
+
+    return decorate
+
+
+def _before_parameter_build(model, context, **kwargs):
+    if _current.get() is not None:
+        operation = _operation_names.get(model)
+        if operation is None:
+            operation = _operation_names[model] = f"{model.service_model.service_name}.{model.name}"
+        context["trace_call"] = (operation, time.perf_counter())
+
+
+def _after_call(context, **kwargs):
+    # after-call-error (connection errors, timeouts) passes no model, so the name comes from the context
+    call = context.get("trace_call")
+    trace = _current.get()
+    if call is not None and trace is not None:
+        trace.add_call(call[0], (time.perf_counter() - call[1]) * 1000)
+
+
+def instrument_session(session):
+    """Registers the AWS call timers on a boto3 session; clients built from it afterwards are timed."""
+    events = session.events
+    # Timed from parameter building, the first event of every call; a before-call handler that
+    # short-circuits the request (e.g. botocore's Stubber) can stop later before-call handlers
+    events.register("before-parameter-build", _before_parameter_build, unique_id="tracing-before-parameter-build")
+    events.register("after-call", _after_call, unique_id="tracing-after-call")
+    events.register("after-call-error", _after_call, unique_id="tracing-after-call-error")